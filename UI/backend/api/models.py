@@ -18,4 +18,24 @@ class NotificationConfig(BaseModel):
     cooldown_period: int = 300  # 5 minutes in seconds
     confidence_increase_threshold: float = 0.10
     best_image_window: int = 3  # 3 seconds window
-    api_endpoint: str = "http://localhost:8000/api/notifications" 
\ No newline at end of file
+    api_endpoint: str = "http://localhost:8000/api/notifications" 
+
+class DetectionRecord(BaseModel):
+    id: int
+    timestamp: str
+    camera_id: int
+    class_name: str
+    confidence: float
+    x1: Optional[int] = None
+    y1: Optional[int] = None
+    x2: Optional[int] = None
+    y2: Optional[int] = None
+
+class DetectionHistoryPage(BaseModel):
+    detections: List[DetectionRecord]
+    next_cursor: Optional[int] = None
+
+class ModelLoadRequest(BaseModel):
+    path: str  # Relative to MODEL_ROOT
+    imgsz: int = 0  # Warm-up size, 0 uses the size the model was trained at
+    shadow_rate: Optional[float] = None  # Defaults to MODEL_SHADOW_RATE
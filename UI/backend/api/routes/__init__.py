@@ -1,11 +1,30 @@
 # api/__init__.py
-from stream_utils import StreamManager, NotificationManager
-from config.settings import RTSP_URL, BASE_MODEL_PATH, POLICE_MODEL_PATH, WEAPON_MODEL_PATH, NOTIFICATION_ENDPOINT
-from ultralytics import YOLO
+from stream_utils import StreamManager, NotificationManager, ModelRegistry
+from stream_utils.frame_bus import FrameBusPublisher, FrameBusSubscriber
+from config.settings import (
+    RTSP_URL, BASE_MODEL_PATH, POLICE_MODEL_PATH, WEAPON_MODEL_PATH, NOTIFICATION_ENDPOINT,
+    INFERENCE_MODE, FRAME_BUS_PATH, FRAME_BUS_RAW_FRAMES,
+    BASE_MODEL_IMGSZ, POLICE_MODEL_IMGSZ, WEAPON_MODEL_IMGSZ, MODEL_WARMUP, MODEL_SHADOW_RATE
+)
+
+# Models load in parallel in the background once model_registry.start() is
+# called on startup; the proxies below wait for them on first use
+model_registry = ModelRegistry({
+    "base": (BASE_MODEL_PATH, BASE_MODEL_IMGSZ),
+    "police": (POLICE_MODEL_PATH, POLICE_MODEL_IMGSZ),
+    "weapon": (WEAPON_MODEL_PATH, WEAPON_MODEL_IMGSZ),
+}, warmup=MODEL_WARMUP, shadow_rate=MODEL_SHADOW_RATE)
 
 # Create shared instances that will be used across the API
-base_model = YOLO(BASE_MODEL_PATH)
-police_model = YOLO(POLICE_MODEL_PATH)
-weapon_model = YOLO(WEAPON_MODEL_PATH)
-stream_manager = StreamManager(RTSP_URL, base_model=base_model, police_model=police_model, weapon_model=weapon_model)
+base_model = model_registry.proxy("base")
+police_model = model_registry.proxy("police")
+weapon_model = model_registry.proxy("weapon")
+stream_manager = StreamManager(RTSP_URL, base_model=base_model, police_model=police_model, weapon_model=weapon_model,
+                               model_registry=model_registry)
+if INFERENCE_MODE == "daemon":
+    stream_manager.bus_publisher = FrameBusPublisher(FRAME_BUS_PATH)
+elif INFERENCE_MODE == "client":
+    stream_manager.bus_subscriber = FrameBusSubscriber(
+        FRAME_BUS_PATH, ["info", "detections", "frame"] + (["raw"] if FRAME_BUS_RAW_FRAMES else [])
+    )
 notification_manager = NotificationManager(NOTIFICATION_ENDPOINT)
\ No newline at end of file
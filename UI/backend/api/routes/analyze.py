@@ -0,0 +1,73 @@
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from typing import List, Optional
+import asyncio
+import cv2
+import numpy as np
+from api.utils import resolve_server_path
+from stream_utils.micro_batcher import MicroBatcher
+from stream_utils.yolo_process import process_frames_with_yolo_batch
+from stream_utils.detection import Detection, detections_to_dicts
+from config.settings import ANALYZE_MAX_BATCH, ANALYZE_MAX_WAIT_MS, ANALYZE_IMAGE_ROOT
+from api.routes import model_registry
+
+router = APIRouter()
+
+def _analyze_batch(frames: List[np.ndarray]) -> List[List[Detection]]:
+    # The live stream's model versions, pinned for the whole batch so a
+    # promotion in between does not mix versions, run on their own instances
+    # so batches never hold up live frames
+    with model_registry.acquire(["base", "weapon", "police"], lane="background") as models:
+        return process_frames_with_yolo_batch(frames, models["base"], models["weapon"], models["police"])
+
+# Shared across all callers so concurrent requests are batched together
+batcher = MicroBatcher(_analyze_batch, max_batch_size=ANALYZE_MAX_BATCH, max_wait_ms=ANALYZE_MAX_WAIT_MS)
+
+async def _analyze_one(source: str, image: Optional[np.ndarray]) -> dict:
+    if image is None:
+        return {"source": source, "error": "Could not decode image", "detections": []}
+    try:
+        detections = await batcher.submit(image)
+    except Exception as e:
+        return {"source": source, "error": str(e), "detections": []}
+    return {"source": source, "detections": detections_to_dicts(detections)}
+
+@router.post("/images")
+async def analyze_images(
+    files: Optional[List[UploadFile]] = File(None),
+    paths: Optional[List[str]] = Form(None),
+):
+    """
+    Run the police/weapon detection cascade on uploaded images and/or image
+    paths on the server. Images from all concurrent requests are grouped into
+    micro-batches for inference.
+    
+    Args:
+        files: Uploaded image files
+        paths: Image paths relative to ANALYZE_IMAGE_ROOT
+        
+    Returns:
+        Dictionary with one result (source and detections) per image, in request order
+    """
+    files = files or []
+    paths = paths or []
+    if not files and not paths:
+        raise HTTPException(status_code=400, detail="Provide at least one file or path")
+    
+    loop = asyncio.get_running_loop()
+    sources = []
+    decodes = []
+    for upload in files:
+        data = await upload.read()
+        sources.append(upload.filename)
+        decodes.append(loop.run_in_executor(
+            None, cv2.imdecode, np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR
+        ))
+    for path in paths:
+        sources.append(path)
+        decodes.append(loop.run_in_executor(None, cv2.imread, resolve_server_path(path, ANALYZE_IMAGE_ROOT, "ANALYZE_IMAGE_ROOT")))
+    
+    images = await asyncio.gather(*decodes)
+    results = await asyncio.gather(*(
+        _analyze_one(source, image) for source, image in zip(sources, images)
+    ))
+    return {"results": results}
@@ -0,0 +1,141 @@
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime
+import asyncio
+import time
+from api.models import DetectionRecord, DetectionHistoryPage
+from stream_utils.detection import detections_to_json
+from api.routes import stream_manager
+
+router = APIRouter()
+
+# Seconds between heartbeats on idle push connections
+HEARTBEAT_INTERVAL = 15
+# Seconds the stream keeps running after the last push client disconnects
+DISCONNECT_GRACE = 30
+
+def _current_detections_message():
+    return {
+        "type": "detections",
+        "timestamp": time.time(),
+        "detections": stream_manager.latest_detections
+    }
+
+def _message_json(message) -> str:
+    # Detections are only serialized here, at the API edge
+    return '{"type": "detections", "timestamp": %r, "detections": %s}' % (
+        message["timestamp"], detections_to_json(message["detections"])
+    )
+
+def _release_keep_alive():
+    # Give a reconnecting client time to come back before the stream stops
+    stream_manager.keep_alive_counter = max(stream_manager.keep_alive_counter, DISCONNECT_GRACE)
+
+@router.websocket("/ws")
+async def detections_websocket(websocket: WebSocket, frames: bool = False):
+    """
+    Push detection events (JSON text messages) and optionally annotated
+    JPEG frames (binary messages) as the stream produces them.
+    
+    A connected client keeps the stream alive. Slow clients only receive
+    the latest detections and frame instead of a backlog.
+    """
+    await websocket.accept()
+    await stream_manager.start_stream()
+    topics = ["detections", "frame"] if frames else ["detections"]
+    subscription = stream_manager.broadcaster.subscribe(topics)
+    try:
+        await websocket.send_text(_message_json(_current_detections_message()))
+        while True:
+            messages = await subscription.next(timeout=HEARTBEAT_INTERVAL)
+            if not messages:
+                await websocket.send_json({"type": "heartbeat", "timestamp": time.time()})
+                continue
+            if "detections" in messages:
+                await websocket.send_text(_message_json(messages["detections"]))
+            if "frame" in messages:
+                await websocket.send_bytes(messages["frame"])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream_manager.broadcaster.unsubscribe(subscription)
+        _release_keep_alive()
+
+@router.get("/events")
+async def detections_events():
+    """
+    Server-Sent Events fallback for clients that cannot use WebSockets.
+    Pushes detection events only.
+    """
+    await stream_manager.start_stream()
+    subscription = stream_manager.broadcaster.subscribe(["detections"])
+    
+    async def event_generator():
+        try:
+            yield f"event: detections\ndata: {_message_json(_current_detections_message())}\n\n"
+            while True:
+                messages = await subscription.next(timeout=HEARTBEAT_INTERVAL)
+                if not messages:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield f"event: detections\ndata: {_message_json(messages['detections'])}\n\n"
+        finally:
+            stream_manager.broadcaster.unsubscribe(subscription)
+            _release_keep_alive()
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/history", response_model=DetectionHistoryPage)
+async def detection_history(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    class_name: Optional[str] = None,
+    min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
+    camera_id: Optional[int] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Get past detections, newest first
+    
+    Args:
+        start: Only detections at or after this time
+        end: Only detections before this time
+        class_name: Only detections of this class
+        min_confidence: Only detections with at least this confidence
+        camera_id: Only detections from this camera
+        cursor: The next_cursor value from the previous page
+        limit: Maximum number of detections to return
+        
+    Returns:
+        A page of detections and the cursor for the next page
+    """
+    loop = asyncio.get_running_loop()
+    items, next_cursor = await loop.run_in_executor(
+        None,
+        lambda: stream_manager.detection_history.query(
+            start=start.timestamp() if start else None,
+            end=end.timestamp() if end else None,
+            class_name=class_name,
+            min_confidence=min_confidence,
+            camera_id=camera_id,
+            cursor=cursor,
+            limit=limit,
+        )
+    )
+    
+    return DetectionHistoryPage(
+        detections=[
+            DetectionRecord(
+                timestamp=datetime.fromtimestamp(item.pop("time")).isoformat(),
+                **item
+            )
+            for item in items
+        ],
+        next_cursor=next_cursor
+    )
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.responses import FileResponse
+from typing import Optional
+import os
+import shutil
+import asyncio
+from api.utils import resolve_server_path
+from stream_utils.video_jobs import VideoJobManager
+from config.settings import VIDEO_JOB_ROOT
+
+router = APIRouter()
+
+video_job_manager = VideoJobManager()
+
+@router.post("/video")
+async def create_video_job(
+    file: Optional[UploadFile] = File(None),
+    path: Optional[str] = Form(None),
+    sample_fps: float = Form(2.0),
+):
+    """
+    Queue a video file for analysis with the production detection cascade
+    
+    Args:
+        file: Uploaded video file
+        path: Or a video path relative to VIDEO_JOB_ROOT on the server
+        sample_fps: How many frames per second of video to analyze
+        
+    Returns:
+        Dictionary with the job id and its initial status
+    """
+    if (file is None) == (path is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of file or path")
+    if sample_fps <= 0:
+        raise HTTPException(status_code=400, detail="sample_fps must be positive")
+    
+    if file is not None:
+        video_path = video_job_manager.upload_path(file.filename or "")
+        loop = asyncio.get_running_loop()
+        
+        def store_upload():
+            with open(video_path, "wb") as out:
+                shutil.copyfileobj(file.file, out, length=1024 * 1024)
+        await loop.run_in_executor(None, store_upload)
+    else:
+        video_path = resolve_server_path(path, VIDEO_JOB_ROOT, "VIDEO_JOB_ROOT")
+        if not os.path.isfile(video_path):
+            raise HTTPException(status_code=404, detail=f"Video not found: {path}")
+    
+    job_id = video_job_manager.submit(video_path, sample_fps=sample_fps)
+    return video_job_manager.get(job_id)
+
+@router.get("/{job_id}")
+async def get_video_job(job_id: str):
+    """
+    Get a job's status and progress
+    
+    Args:
+        job_id: The job id
+        
+    Returns:
+        Dictionary with status, frames_done, frames_total, progress and detections_found
+    """
+    status = video_job_manager.get(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+@router.get("/{job_id}/results")
+async def get_video_job_results(job_id: str):
+    """
+    Get the per-frame detections written so far, as newline-delimited JSON
+    (one {"frame", "timestamp", "detections"} object per sampled frame)
+    
+    Args:
+        job_id: The job id
+    """
+    if video_job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    results_path = video_job_manager.results_path(job_id)
+    if not os.path.exists(results_path):
+        raise HTTPException(status_code=404, detail="No results yet")
+    return FileResponse(results_path, media_type="application/x-ndjson")
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, HTTPException
+import os
+from api.models import ModelLoadRequest
+from api.utils import resolve_server_path
+from config.settings import MODEL_ROOT
+from api.routes import model_registry
+
+router = APIRouter()
+
+def _check_name(name: str):
+    if name not in model_registry.status():
+        raise HTTPException(status_code=404, detail=f"Unknown model: {name}")
+
+@router.get("/")
+async def list_models():
+    """
+    Get the active version, candidate and shadow comparison of every model
+
+    Returns:
+        Dictionary of model name -> versions and timings
+    """
+    return model_registry.status()
+
+@router.post("/{name}/load", status_code=202)
+async def load_model(name: str, request: ModelLoadRequest):
+    """
+    Load a new version of a model next to the active one
+
+    The candidate is warmed up in the background and, if shadow_rate is
+    above 0, run on a sample of live frames for comparison. It only
+    replaces the active version once promoted.
+
+    Args:
+        name: "base", "police" or "weapon"
+        request: Weights path relative to MODEL_ROOT, warm-up size and shadow rate
+
+    Returns:
+        The candidate's state
+    """
+    _check_name(name)
+    path = resolve_server_path(request.path, MODEL_ROOT, "MODEL_ROOT")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"Model file not found: {request.path}")
+    if request.shadow_rate is not None and not 0 <= request.shadow_rate <= 1:
+        raise HTTPException(status_code=400, detail="shadow_rate must be between 0 and 1")
+
+    candidate = model_registry.load_candidate(name, path, imgsz=request.imgsz, shadow_rate=request.shadow_rate)
+    return candidate.to_dict()
+
+@router.post("/{name}/promote")
+async def promote_model(name: str):
+    """
+    Switch the live stream to the candidate version of a model
+
+    The switch happens between frames; the old version is freed once the
+    frames still using it are done.
+
+    Args:
+        name: "base", "police" or "weapon"
+
+    Returns:
+        The new active version's state
+    """
+    _check_name(name)
+    try:
+        return model_registry.promote(name).to_dict()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.delete("/{name}/candidate")
+async def discard_candidate(name: str):
+    """
+    Drop the candidate version of a model
+
+    Args:
+        name: "base", "police" or "weapon"
+    """
+    _check_name(name)
+    if not model_registry.discard_candidate(name):
+        raise HTTPException(status_code=404, detail=f"No candidate for the {name} model")
+    return {"status": "success", "message": f"Discarded the {name} candidate"}
@@ -3,7 +3,6 @@ import numpy as np
 import cv2
 import base64
 from datetime import datetime
-import aiohttp
 from api.models import NotificationConfig, NotificationPayload
 from stream_utils import save_image, NotificationManager
 from config.settings import NOTIFICATION_ENDPOINT, NOTIFICATION_COOLDOWN
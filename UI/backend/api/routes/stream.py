@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+import asyncio
+from datetime import datetime
 from stream_utils import process_rtsp_frame, StreamManager
-from ultralytics import YOLO
+from stream_utils.save_image import save_jpeg_async
+from stream_utils.snapshot_cache import SNAPSHOT_SIZES, SNAPSHOT_VARIANTS
 from config.settings import RTSP_URL
 from api.routes import stream_manager, weapon_model 
 
@@ -20,6 +23,77 @@ async def process_image(interval: int = 10):
     """
     return await process_rtsp_frame(RTSP_URL, weapon_model, interval, stream_manager)
 
+@router.get("/snapshot")
+async def snapshot(request: Request, variant: str = "annotated", size: str = "full"):
+    """
+    Get the most recent frame as a JPEG without re-running detection or saving it.
+    Supports conditional GET: the ETag changes with every new frame, so clients
+    sending If-None-Match get 304 Not Modified until a new frame arrives.
+    
+    Args:
+        variant: "annotated" (with detections drawn) or "raw"
+        size: "full" or "thumb" (320px wide)
+        
+    Returns:
+        The JPEG image
+    """
+    if variant not in SNAPSHOT_VARIANTS or size not in SNAPSHOT_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"variant must be one of {list(SNAPSHOT_VARIANTS)} and size one of {list(SNAPSHOT_SIZES)}"
+        )
+    
+    cache = stream_manager.snapshot_cache
+    etag = f'"{cache.seq}-{variant}-{size}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if cache.seq and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    loop = asyncio.get_running_loop()
+    seq, jpeg, _ = await loop.run_in_executor(None, cache.get, variant, size)
+    if jpeg is None:
+        raise HTTPException(status_code=404, detail="No frames available from stream")
+    headers["ETag"] = f'"{seq}-{variant}-{size}"'
+    return Response(content=jpeg, media_type="image/jpeg", headers=headers)
+
+@router.post("/snapshot/save")
+async def save_snapshot(variant: str = "annotated"):
+    """
+    Persist the most recent frame to the configured storage (local or S3)
+    
+    Args:
+        variant: "annotated" (with detections drawn) or "raw"
+        
+    Returns:
+        Dictionary with the saved image path, frame sequence number and detections
+    """
+    if variant not in SNAPSHOT_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"variant must be one of {list(SNAPSHOT_VARIANTS)}")
+    
+    loop = asyncio.get_running_loop()
+    seq, jpeg, detections = await loop.run_in_executor(None, stream_manager.snapshot_cache.get, variant, "full")
+    if jpeg is None:
+        raise HTTPException(status_code=404, detail="No frames available from stream")
+    
+    image_path = await save_jpeg_async(jpeg, detections=detections)
+    return {
+        "picture": image_path,
+        "frame_seq": seq,
+        "detection_event": [d.to_event() for d in detections],
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/stats")
+async def stats():
+    """
+    Get inference counters, such as the crop cache hit rate and the model
+    time it saved.
+    
+    Returns:
+        Dictionary of counters
+    """
+    return stream_manager.stats()
+
 # @router.get("/stream-status")
 # async def get_stream_status():
 #     """
@@ -1,7 +1,6 @@
 from fastapi import APIRouter, BackgroundTasks
 from fastapi.responses import StreamingResponse
 import asyncio
-from ultralytics import YOLO
 from api.routes import stream_manager
 
 router = APIRouter()
@@ -0,0 +1,22 @@
+import os
+from fastapi import HTTPException
+
+def resolve_server_path(path: str, root: str, setting_name: str) -> str:
+    """
+    Resolve a client-supplied server path, refusing anything outside root
+    
+    Args:
+        path: Path relative to root
+        root: The folder clients may read from, empty to disable server paths
+        setting_name: Name of the setting that configures root, for the error message
+        
+    Returns:
+        The resolved absolute path
+    """
+    if not root:
+        raise HTTPException(status_code=400, detail=f"Server paths are disabled, set {setting_name} to enable them")
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise HTTPException(status_code=400, detail=f"Path is outside {setting_name}: {path}")
+    return resolved
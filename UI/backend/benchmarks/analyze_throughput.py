@@ -0,0 +1,75 @@
+"""
+Compare image analysis throughput: looping process_frame_with_yolo versus
+the micro-batched cascade used by POST /analyze/images.
+
+Usage (from UI/backend):
+    python -m benchmarks.analyze_throughput /path/to/images --concurrency 32
+"""
+import argparse
+import asyncio
+import glob
+import os
+import time
+import cv2
+from ultralytics import YOLO
+from stream_utils.micro_batcher import MicroBatcher
+from stream_utils.yolo_process import process_frame_with_yolo, process_frames_with_yolo_batch
+from config.settings import BASE_MODEL_PATH, POLICE_MODEL_PATH, WEAPON_MODEL_PATH
+
+def load_images(folder, limit):
+    paths = sorted(glob.glob(os.path.join(folder, "*.jpg")) + glob.glob(os.path.join(folder, "*.png")))[:limit]
+    return [img for img in (cv2.imread(p) for p in paths) if img is not None]
+
+def bench_loop(images, base_model, weapon_model, police_model):
+    start = time.perf_counter()
+    for img in images:
+        process_frame_with_yolo(img, base_model, weapon_model, police_model, return_detections=True)
+    return len(images) / (time.perf_counter() - start)
+
+async def bench_batched(images, base_model, weapon_model, police_model, concurrency, max_batch, max_wait_ms):
+    batcher = MicroBatcher(
+        lambda frames: process_frames_with_yolo_batch(frames, base_model, weapon_model, police_model),
+        max_batch_size=max_batch, max_wait_ms=max_wait_ms
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(img):
+        async with semaphore:
+            return await batcher.submit(img)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(img) for img in images))
+    elapsed = time.perf_counter() - start
+    batcher.close()
+    return len(images) / elapsed, batcher.items_processed / max(batcher.batches_run, 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", help="Folder of .jpg/.png images")
+    parser.add_argument("--limit", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=32, help="Simultaneous callers")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    images = load_images(args.folder, args.limit)
+    if not images:
+        raise SystemExit(f"No images found in {args.folder}")
+    models = (YOLO(BASE_MODEL_PATH), YOLO(WEAPON_MODEL_PATH), YOLO(POLICE_MODEL_PATH))
+
+    # Warm up both paths so model initialization is not measured
+    bench_loop(images[:2], *models)
+    asyncio.run(bench_batched(images[:2], *models, 2, 2, args.max_wait_ms))
+
+    loop_rate = bench_loop(images, *models)
+    batched_rate, mean_batch = asyncio.run(
+        bench_batched(images, *models, args.concurrency, args.max_batch, args.max_wait_ms)
+    )
+    print(f"images:             {len(images)}")
+    print(f"per-frame loop:     {loop_rate:.1f} images/s")
+    print(f"micro-batched:      {batched_rate:.1f} images/s "
+          f"(concurrency {args.concurrency}, mean batch {mean_batch:.1f})")
+    print(f"speedup:            {batched_rate / loop_rate:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Measure decode CPU of the capture backends on a local H.264 file, decoding
+it as fast as possible and counting CPU time of all threads.
+
+  opencv           cv2.VideoCapture decodes and converts every frame at full
+                   size, then each frame is resized (the imutils path)
+  pyav             FFmpeg threaded decode, every frame scaled to the target
+                   width by swscale while converting to BGR
+  pyav every_n     decode every frame, convert only every Nth (what a slower
+                   consumer or the every_n idle mode costs)
+  pyav keyframes   decode keyframes only (the keyframes idle mode)
+
+"cores at N fps" is the CPU the backend would need to keep up with a live
+camera at the file's frame rate.
+
+Usage (from UI/backend):
+    python -m benchmarks.capture_decode /path/to/video.mp4 --width 680 --every-n 10
+"""
+import argparse
+import time
+import cv2
+import imutils
+
+def measure(fn):
+    wall, cpu = time.perf_counter(), time.process_time()
+    frames, delivered = fn()
+    return frames, delivered, time.process_time() - cpu, time.perf_counter() - wall
+
+def bench_opencv(path, width):
+    def run():
+        cap = cv2.VideoCapture(path)
+        frames = 0
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            imutils.resize(frame, width=width)
+            frames += 1
+        cap.release()
+        return frames, frames
+    return run
+
+def bench_pyav(path, width, every_n=1, keyframes=False):
+    def run():
+        import av
+        container = av.open(path)
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        if keyframes:
+            stream.codec_context.skip_frame = "NONKEY"
+        frames = delivered = 0
+        size = None
+        for frame in container.decode(stream):
+            frames += 1
+            if frames % every_n:
+                continue
+            if size is None:
+                size = (width, round(frame.height * width / frame.width))
+            frame.reformat(width=size[0], height=size[1], format="bgr24", interpolation="AREA").to_ndarray()
+            delivered += 1
+        container.close()
+        return frames, delivered
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="Local H.264 file")
+    parser.add_argument("--width", type=int, default=680)
+    parser.add_argument("--every-n", type=int, default=10)
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    source_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    cases = [
+        ("opencv", bench_opencv(args.video, args.width)),
+        ("pyav", bench_pyav(args.video, args.width)),
+        (f"pyav every_{args.every_n}", bench_pyav(args.video, args.width, every_n=args.every_n)),
+        ("pyav keyframes", bench_pyav(args.video, args.width, keyframes=True)),
+    ]
+    print(f"{args.video}: {source_frames} frames at {fps:.1f} fps, output width {args.width}")
+    for name, fn in cases:
+        frames, delivered, cpu, wall = measure(fn)
+        per_frame = cpu / max(1, source_frames)
+        print(f"  {name:18s} decoded {frames:6d}  delivered {delivered:6d}  cpu {cpu:7.2f}s  wall {wall:6.2f}s  "
+              f"cpu/source frame {per_frame * 1000:6.2f} ms  cores at {fps:.0f} fps {per_frame * fps:5.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Replay recorded footage (e.g. a classroom camera) through the detection
+cascade with and without the per-region crop cache, and report time per
+frame, cache hit rate, weapon model time saved and how often the cached
+run reported different weapons than the uncached one.
+
+The cache's refresh interval runs on video time, so results don't depend
+on how fast this machine replays the file.
+
+Usage (from UI/backend):
+    python -m benchmarks.crop_cache /path/to/classroom.mp4 --frames 1500
+"""
+import argparse
+import time
+import cv2
+import imutils
+from ultralytics import YOLO
+from stream_utils.crop_cache import CropResultCache
+from stream_utils.yolo_process import detect_frame
+from config.settings import (
+    BASE_MODEL_PATH, POLICE_MODEL_PATH, WEAPON_MODEL_PATH,
+    CROP_CACHE_MAX_DISTANCE, CROP_CACHE_REFRESH_INTERVAL,
+)
+
+def read_frames(path, limit, width):
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    frames = []
+    while len(frames) < limit:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(imutils.resize(frame, width=width))
+    cap.release()
+    return frames, fps
+
+def run(frames, fps, models, cache):
+    video_time = [0.0]
+    if cache is not None:
+        cache.clock = lambda: video_time[0]
+    results = []
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        video_time[0] = i / fps
+        _, weapons = detect_frame(frame, *models, crop_cache=cache)
+        results.append(sorted((d.class_name, d.x1, d.y1) for d in weapons))
+    return (time.perf_counter() - start) / len(frames) * 1000, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="Recorded footage to replay")
+    parser.add_argument("--frames", type=int, default=1500)
+    parser.add_argument("--width", type=int, default=680, help="Resize width, as in the live stream")
+    parser.add_argument("--max-distance", type=int, default=CROP_CACHE_MAX_DISTANCE)
+    parser.add_argument("--refresh-interval", type=float, default=CROP_CACHE_REFRESH_INTERVAL)
+    args = parser.parse_args()
+
+    frames, fps = read_frames(args.video, args.frames, args.width)
+    if not frames:
+        raise SystemExit(f"No frames read from {args.video}")
+    models = (YOLO(BASE_MODEL_PATH), YOLO(WEAPON_MODEL_PATH), YOLO(POLICE_MODEL_PATH))
+    # Warm up so the first run doesn't pay for initialization
+    detect_frame(frames[0], *models)
+
+    baseline_ms, baseline = run(frames, fps, models, None)
+    cache = CropResultCache(max_distance=args.max_distance, refresh_interval=args.refresh_interval)
+    cached_ms, cached = run(frames, fps, models, cache)
+    stats = cache.stats()
+    differing = sum(1 for a, b in zip(baseline, cached) if a != b)
+
+    print(f"{len(frames)} frames at {fps:.1f} fps, max distance {args.max_distance} bits, refresh {args.refresh_interval}s")
+    print(f"  no cache    {baseline_ms:7.2f} ms/frame")
+    print(f"  crop cache  {cached_ms:7.2f} ms/frame  hit rate {stats['hit_rate']:.1%}  "
+          f"weapon model time saved {stats['saved_seconds']:.2f}s")
+    print(f"  frames with different weapon results: {differing} ({differing / len(frames):.1%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compare per-frame cost of detection records: the old ad-hoc dicts versus
+the slotted Detection class, for allocation and for serialization.
+
+Usage (from UI/backend):
+    python -m benchmarks.detection_records --boxes 5 --frames 20000
+"""
+import argparse
+import json
+import random
+import timeit
+import tracemalloc
+from stream_utils.detection import Detection, detections_to_dicts, detections_to_json, pack_detections, unpack_detections
+
+def make_boxes(count):
+    return [
+        (random.choice(["gun", "knife"]), round(random.random(), 2), *sorted(random.sample(range(680), 2)), *sorted(random.sample(range(480), 2)))
+        for _ in range(count)
+    ]
+
+def as_dicts(boxes):
+    return [{"class_name": c, "confidence": conf, "x1": x1, "y1": y1, "x2": x2, "y2": y2} for c, conf, x1, x2, y1, y2 in boxes]
+
+def as_records(boxes):
+    return [Detection(c, conf, x1, y1, x2, y2) for c, conf, x1, x2, y1, y2 in boxes]
+
+def allocated_bytes(build, boxes, frames):
+    tracemalloc.start()
+    kept = [build(boxes) for _ in range(frames)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size / frames
+
+def per_frame_us(stmt, frames):
+    return min(timeit.repeat(stmt, number=frames, repeat=3)) / frames * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boxes", type=int, default=5, help="Detections per frame")
+    parser.add_argument("--frames", type=int, default=20000)
+    args = parser.parse_args()
+
+    boxes = make_boxes(args.boxes)
+    dicts, records = as_dicts(boxes), as_records(boxes)
+    packed = pack_detections(records)
+
+    print(f"{args.boxes} detections per frame")
+    print(f"  build      dicts {per_frame_us(lambda: as_dicts(boxes), args.frames):7.2f} us  "
+          f"records {per_frame_us(lambda: as_records(boxes), args.frames):7.2f} us")
+    print(f"  memory     dicts {allocated_bytes(as_dicts, boxes, args.frames):7.0f} B   "
+          f"records {allocated_bytes(as_records, boxes, args.frames):7.0f} B")
+    print(f"  to JSON    json.dumps(dicts) {per_frame_us(lambda: json.dumps(dicts), args.frames):7.2f} us  "
+          f"json.dumps(to_dicts) {per_frame_us(lambda: json.dumps(detections_to_dicts(records)), args.frames):7.2f} us  "
+          f"detections_to_json {per_frame_us(lambda: detections_to_json(records), args.frames):7.2f} us")
+    print(f"  binary     pack {per_frame_us(lambda: pack_detections(records), args.frames):7.2f} us  "
+          f"unpack {per_frame_us(lambda: unpack_detections(packed), args.frames):7.2f} us  "
+          f"({len(packed)} B vs {len(json.dumps(dicts))} B JSON)")
+
+if __name__ == "__main__":
+    main()
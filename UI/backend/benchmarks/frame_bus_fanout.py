@@ -0,0 +1,81 @@
+"""
+Measure how many API workers the frame bus can feed: one publisher sends
+synthetic JPEG frames at a fixed rate to N subscriber processes, each of
+which reports the frame rate and latency it received.
+
+Usage (from UI/backend):
+    python -m benchmarks.frame_bus_fanout --subscribers 1 4 16 --fps 30
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+from stream_utils.frame_bus import FrameBusPublisher, FrameBusSubscriber
+
+def run_subscriber(path, duration, results):
+    latencies = []
+
+    def on_message(topic, timestamp, seq, meta, data):
+        latencies.append(time.time() - timestamp)
+
+    async def main():
+        subscriber = FrameBusSubscriber(path, ["frame", "detections"], reconnect_delay=0.1)
+        try:
+            await asyncio.wait_for(subscriber.run(on_message), duration)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(main())
+    results.put((len(latencies), latencies))
+
+async def publish(path, fps, duration, frame):
+    publisher = FrameBusPublisher(path)
+    await publisher.start()
+    jpeg = cv2.imencode(".jpg", frame)[1].tobytes()
+    detections = [{"class_name": "gun", "confidence": 0.9, "x1": 10, "y1": 10, "x2": 50, "y2": 50}]
+    end = time.perf_counter() + duration
+    seq = 0
+    while time.perf_counter() < end:
+        seq += 1
+        publisher.publish("frame", {"detections": detections}, jpeg, time.time(), seq)
+        await asyncio.sleep(1 / fps)
+    await publisher.close()
+    return seq
+
+def measure(subscribers, fps, duration, frame):
+    path = os.path.join(tempfile.mkdtemp(), "bus.sock")
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=run_subscriber, args=(path, duration + 1, results)) for _ in range(subscribers)]
+    for p in procs:
+        p.start()
+    sent = asyncio.run(publish(path, fps, duration, frame))
+    received = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    latencies = sorted(lat for _, lats in received for lat in lats)
+    per_worker_fps = [count / duration for count, _ in received]
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else float("nan")
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else float("nan")
+    print(f"{subscribers:3d} workers: sent {sent / duration:.1f} fps, "
+          f"received min {min(per_worker_fps):.1f} fps per worker, latency p50 {p50:.2f} ms p99 {p99:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--width", type=int, default=680)
+    args = parser.parse_args()
+
+    # Noise compresses poorly, so frames are about as large as real camera frames
+    frame = np.random.randint(0, 256, (args.width * 9 // 16, args.width, 3), dtype=np.uint8)
+    for subscribers in args.subscribers:
+        measure(subscribers, args.fps, args.duration, frame)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Measure annotation cost per frame against box count: the previous per-box
+drawing (darken, paste each person crop back, reseed the RNG for every
+weapon color, draw each box) versus OverlayRenderer.
+
+Usage (from UI/backend):
+    python -m benchmarks.overlay_cost --boxes 0 1 5 20 50
+"""
+import argparse
+import random
+import timeit
+import cv2
+import numpy as np
+from stream_utils.detection import Detection
+from stream_utils.overlay import OverlayRenderer
+
+def legacy_render(frame, people, detections):
+    # The drawing code process_frame_with_yolo used before OverlayRenderer
+    def hash_color(key):
+        np.random.seed(abs(hash(key)) % (2**32))
+        return tuple(int(v) for v in np.random.randint(64, 256, 3))
+
+    def draw_box(img, xyxy, color, label, thickness=2):
+        x1, y1, x2, y2 = xyxy
+        cv2.rectangle(img, (x1, y1), (x2, y2), color, thickness)
+        cv2.putText(img, label, (x1, max(0, y1 - 4)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, thickness)
+
+    dark = cv2.convertScaleAbs(frame, alpha=1, beta=-75)
+    for p in people:
+        x1, y1, x2, y2 = p.box
+        dark[y1:y2, x1:x2] = frame[y1:y2, x1:x2].copy()
+        for d in detections:
+            draw_box(dark, d.box, hash_color(d.class_name), f"{d.class_name}:{d.confidence:.2f}")
+        color = (0, 255, 0) if p.class_name == "civilian" else (255, 0, 0)
+        draw_box(dark, p.box, color, f"{p.class_name}:{p.confidence:.2f}")
+    return dark
+
+def random_box(w, h, cls, min_size=20):
+    x1, y1 = random.randrange(w - min_size), random.randrange(h - min_size)
+    x2, y2 = random.randrange(x1 + min_size // 2, min(w, x1 + w // 3) + 1), random.randrange(y1 + min_size // 2, min(h, y1 + h // 2) + 1)
+    return Detection(cls, round(random.random(), 2), x1, y1, x2, y2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boxes", type=int, nargs="+", default=[0, 1, 5, 20, 50], help="Weapon boxes per frame")
+    parser.add_argument("--people", type=int, default=2)
+    parser.add_argument("--width", type=int, default=680)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    height = args.width * 9 // 16
+    frame = np.random.randint(0, 256, (height, args.width, 3), dtype=np.uint8)
+    renderer = OverlayRenderer()
+    out = np.empty_like(frame)
+    people = [random_box(args.width, height, random.choice(["civilian", "police"])) for _ in range(args.people)]
+    # The legacy path drew every weapon box once per person, spread them so the work is the same
+    for count in args.boxes:
+        detections = [random_box(args.width, height, random.choice(["gun", "knife", "rifle"])) for _ in range(count)]
+        per_person = [detections[i::max(1, len(people))] for i in range(len(people))]
+
+        def legacy():
+            for p, dets in zip(people, per_person):
+                legacy_render(frame, [p], dets)
+
+        legacy_ms = min(timeit.repeat(legacy, number=args.runs, repeat=3)) / args.runs * 1000
+        new_ms = min(timeit.repeat(lambda: renderer.render(frame, people, detections, out=out), number=args.runs, repeat=3)) / args.runs * 1000
+        print(f"{count:3d} boxes: legacy {legacy_ms:6.3f} ms/frame, OverlayRenderer {new_ms:6.3f} ms/frame")
+
+if __name__ == "__main__":
+    main()
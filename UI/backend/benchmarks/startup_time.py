@@ -0,0 +1,73 @@
+"""
+Measure server startup: time until the API answers, time until every model is
+loaded and warmed up (GET /ready returns 200), and time until the first
+stream frame has been processed.
+
+Usage (from UI/backend):
+    python -m benchmarks.startup_time --runs 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+def get(url):
+    """
+    Returns (status code, parsed JSON body), or (None, None) if the server is not up yet
+    """
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return None, None
+
+def measure(port, timeout):
+    env = dict(os.environ, API_PORT=str(port))
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env
+    )
+    timings = {"first_response": None, "ready": None, "first_frame": None}
+    try:
+        url = f"http://127.0.0.1:{port}/ready"
+        while time.perf_counter() - start < timeout:
+            status, body = get(url)
+            elapsed = round(time.perf_counter() - start, 3)
+            if status is not None and timings["first_response"] is None:
+                timings["first_response"] = elapsed
+            if status == 200 and timings["ready"] is None:
+                timings["ready"] = elapsed
+                timings["models"] = {name: {k: m["active"][k] for k in ("load_seconds", "warmup_seconds")}
+                                     for name, m in body["models"].items()}
+            if body and body.get("first_frame_seconds") is not None:
+                timings["first_frame"] = elapsed
+                break
+            time.sleep(0.05)
+    finally:
+        server.terminate()
+        server.wait()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Give up on a run after this many seconds")
+    args = parser.parse_args()
+
+    for run in range(1, args.runs + 1):
+        timings = measure(args.port, args.timeout)
+        print(f"run {run}: first response {timings['first_response']}s, "
+              f"ready {timings['ready']}s, first frame {timings['first_frame']}s")
+        for name, model in timings.get("models", {}).items():
+            print(f"    {name}: load {model['load_seconds']}s, warm-up {model['warmup_seconds']}s")
+
+if __name__ == "__main__":
+    main()
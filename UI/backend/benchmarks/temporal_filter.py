@@ -0,0 +1,74 @@
+"""
+Replay a synthetic detection stream (real weapons that persist but are
+sometimes missed, plus isolated single-frame misfires) and count how many
+alert episodes reach notification with and without the temporal
+confirmation filter, and what the filter costs per frame.
+
+An episode is a run of forwarded frames, the unit that opens a capture
+window and ends in a JPEG encode, upload and API call.
+
+Usage (from UI/backend):
+    python -m benchmarks.temporal_filter --frames 100000 --misfire-rate 0.02
+"""
+import argparse
+import random
+import time
+from stream_utils.detection import Detection
+from stream_utils.temporal_filter import TemporalConfirmationFilter
+
+def synthetic_stream(frames, misfire_rate, event_rate, recall, seed=0):
+    rng = random.Random(seed)
+    remaining, box, events = 0, None, 0
+    for _ in range(frames):
+        detections = []
+        if remaining == 0 and rng.random() < event_rate:
+            remaining = rng.randint(15, 90)
+            box = [rng.uniform(0, 600), rng.uniform(0, 400)]
+            events += 1
+        if remaining:
+            remaining -= 1
+            box[0] += rng.uniform(-3, 3)
+            box[1] += rng.uniform(-3, 3)
+            if rng.random() < recall:
+                detections.append(Detection("gun", round(rng.uniform(0.6, 0.95), 2), box[0], box[1], box[0] + 40, box[1] + 30))
+        if rng.random() < misfire_rate:
+            x, y = rng.uniform(0, 640), rng.uniform(0, 430)
+            detections.append(Detection(rng.choice(["gun", "knife"]), round(rng.uniform(0.6, 0.9), 2), x, y, x + 30, y + 20))
+        yield detections
+    yield events
+
+def count_episodes(forwarded, gap=30):
+    # Frames closer than the notification capture window belong to one episode
+    episodes, last = 0, None
+    for i, passed in enumerate(forwarded):
+        if passed:
+            if last is None or i - last > gap:
+                episodes += 1
+            last = i
+    return episodes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=100000)
+    parser.add_argument("--misfire-rate", type=float, default=0.02, help="Chance of a spurious detection per frame")
+    parser.add_argument("--event-rate", type=float, default=0.0005, help="Chance a real weapon appears per frame")
+    parser.add_argument("--recall", type=float, default=0.8, help="Chance a present weapon is detected per frame")
+    parser.add_argument("--confirm", type=int, default=3, help="K")
+    parser.add_argument("--window", type=int, default=5, help="N")
+    args = parser.parse_args()
+
+    *stream, events = synthetic_stream(args.frames, args.misfire_rate, args.event_rate, args.recall)
+    confirmation = TemporalConfirmationFilter(confirm_frames=args.confirm, window_frames=args.window)
+    start = time.perf_counter()
+    confirmed = [confirmation.update(d) for d in stream]
+    per_frame_us = (time.perf_counter() - start) / len(stream) * 1e6
+
+    raw_episodes = count_episodes(bool(d) for d in stream)
+    filtered_episodes = count_episodes(bool(c) for c in confirmed)
+    print(f"{args.frames} frames, {events} real weapon events, misfire rate {args.misfire_rate}")
+    print(f"  unfiltered   {sum(map(bool, stream)):7d} frames forwarded, {raw_episodes:5d} episodes")
+    print(f"  {args.confirm}-of-{args.window}       {sum(map(bool, confirmed)):7d} frames forwarded, {filtered_episodes:5d} episodes")
+    print(f"  filter cost  {per_frame_us:.2f} us/frame")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Compare weapon stage inference shapes on recorded footage: every civilian
+crop at the weapon model's default size ("fixed", the previous behavior)
+against stride-aligned sizes per crop and a few bucket configurations.
+
+The person and police stages run once per frame and their crops are reused,
+so only the weapon stage is timed. Accuracy is measured against the fixed
+size: a weapon counts as found when a detection of the same class overlaps
+it by IoU >= 0.5, and detections without such a match count as extra.
+
+Usage (from UI/backend):
+    python -m benchmarks.weapon_shapes /path/to/classroom.mp4 --frames 600 \\
+        --buckets 320,480,640 256,384,512,640 320,640
+"""
+import argparse
+import time
+import imutils
+import numpy as np
+import cv2
+from ultralytics import YOLO
+from stream_utils.detection import iou
+from stream_utils.inference_shapes import ShapeBuckets, parse_sizes
+from stream_utils.yolo_process import _expand_box, _is_civilian, _weapon_batches, _yolo_detections
+from config.settings import (
+    BASE_MODEL_PATH, POLICE_MODEL_PATH, WEAPON_MODEL_PATH,
+    WEAPON_SHAPE_BUCKETS, WEAPON_SHAPE_MIN, WEAPON_SHAPE_MAX,
+)
+
+def civilian_crops(path, limit, width, models, expand=0.3):
+    """Civilian person crops of each frame, as detect_frame would make them"""
+    base_model, _, police_model = models
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frame = imutils.resize(frame, width=width)
+        h, w = frame.shape[:2]
+        crops = []
+        for p in _yolo_detections(base_model, frame, 0.6):
+            if p.class_name != "person":
+                continue
+            x1, y1, x2, y2 = _expand_box(p.box, expand, w, h)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            crop = frame[y1:y2, x1:x2]
+            if _is_civilian(police_model, crop)[0]:
+                crops.append(crop)
+        frames.append(crops)
+    cap.release()
+    return frames
+
+def run(frames, weapon_model, shapes):
+    # Warm up on the first frames, so every size the config uses has been run once
+    for crops in frames[:5]:
+        _weapon_batches(weapon_model, crops, shapes)
+    results, latencies = [], []
+    for crops in frames:
+        start = time.perf_counter()
+        results.append(_weapon_batches(weapon_model, crops, shapes) if crops else [])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.array(latencies)
+
+def compare(reference, results):
+    """Weapons of the reference found, and extra detections, over all crops"""
+    found = total = extra = 0
+    for ref_frame, frame in zip(reference, results):
+        for ref, dets in zip(ref_frame, frame):
+            total += len(ref)
+            matched = set()
+            for r in ref:
+                for j, d in enumerate(dets):
+                    if j not in matched and d.class_name == r.class_name and iou(r, d) >= 0.5:
+                        matched.add(j)
+                        found += 1
+                        break
+            extra += len(dets) - len(matched)
+    return found, total, extra
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="Recorded footage to replay")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--width", type=int, default=680, help="Resize width, as in the live stream")
+    parser.add_argument("--buckets", nargs="*", default=[WEAPON_SHAPE_BUCKETS, "256,384,512,640", "320,640"],
+                        help="Bucket configurations to compare, each comma-separated")
+    parser.add_argument("--min-size", type=int, default=WEAPON_SHAPE_MIN)
+    parser.add_argument("--max-size", type=int, default=WEAPON_SHAPE_MAX)
+    args = parser.parse_args()
+
+    models = (YOLO(BASE_MODEL_PATH), YOLO(WEAPON_MODEL_PATH), YOLO(POLICE_MODEL_PATH))
+    frames = civilian_crops(args.video, args.frames, args.width, models)
+    crops = [c for f in frames for c in f]
+    if not crops:
+        raise SystemExit(f"No civilian crops found in {args.video}")
+    sides = np.array([max(c.shape[:2]) for c in crops])
+
+    configs = [("fixed", None), ("per crop", ShapeBuckets(min_size=args.min_size, max_size=args.max_size))]
+    configs += [(f"buckets {b}", ShapeBuckets(parse_sizes(b), min_size=args.min_size, max_size=args.max_size))
+                for b in args.buckets]
+
+    print(f"{len(frames)} frames, {len(crops)} civilian crops, longest side "
+          f"median {np.median(sides):.0f}px (p10 {np.percentile(sides, 10):.0f}, p90 {np.percentile(sides, 90):.0f})")
+    print(f"  {'config':28}{'ms/frame':>9}{'p95':>8}{'calls/frame':>12}  {'found':>16}{'extra':>7}")
+    reference = None
+    for name, shapes in configs:
+        results, latencies = run(frames, models[1], shapes)
+        if reference is None:
+            reference = results
+        calls = np.mean([len(shapes.group(f)) if shapes is not None else len(f) for f in frames])
+        found, total, extra = compare(reference, results)
+        recall = f"{found}/{total} ({found / total:.0%})" if total else "-"
+        print(f"  {name:28}{latencies.mean():9.2f}{np.percentile(latencies, 95):8.2f}{calls:12.2f}  {recall:>16}{extra:7}")
+
+if __name__ == "__main__":
+    main()
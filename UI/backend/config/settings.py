@@ -6,17 +6,95 @@ load_dotenv()
 
 # RTSP Configuration
 RTSP_URL = os.getenv("RTSP_URL", "Unset")
+STREAM_ALWAYS_ON = os.getenv("STREAM_ALWAYS_ON", "true").lower() in ("true", "1", "yes")
+
+# Capture Configuration
+CAPTURE_BACKEND = os.getenv("CAPTURE_BACKEND", "opencv").lower()  # "opencv" or "pyav"
+# pyav only: while nothing moves and nothing is detected, decode just keyframes or hand out every Nth frame
+CAPTURE_IDLE_MODE = os.getenv("CAPTURE_IDLE_MODE", "keyframes")  # "keyframes" or "every_n"
+CAPTURE_IDLE_EVERY_N = int(os.getenv("CAPTURE_IDLE_EVERY_N", "10"))
+CAPTURE_IDLE_AFTER = float(os.getenv("CAPTURE_IDLE_AFTER", "30"))  # seconds, 0 disables idle mode
 
 # API Configuration
 API_HOST = "0.0.0.0"
 API_PORT = 8000
 
+# Inference Process Configuration
+# "embedded": this process runs the stream and serves the API (single worker)
+# "daemon": like embedded, and also publishes frames/detections on the frame bus
+# "client": stateless API worker serving what the daemon publishes, no inference
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "embedded").lower()
+FRAME_BUS_PATH = os.getenv("FRAME_BUS_PATH", "/tmp/weapon-detection-bus.sock")
+FRAME_BUS_RAW_FRAMES = os.getenv("FRAME_BUS_RAW_FRAMES", "false").lower() in ("true", "1", "yes")  # Workers also receive raw frames
+
 # Model Configuration
 BASE_MODEL_PATH = os.getenv("BASE_MODEL_PATH", "yolo11n.pt")
 POLICE_MODEL_PATH = os.getenv("POLICE_MODEL_PATH", "police.pt")
 WEAPON_MODEL_PATH = os.getenv("WEAPON_MODEL_PATH", "weapon.pt")
+# Warm-up inference sizes, 0 uses the size each model was trained at
+BASE_MODEL_IMGSZ = int(os.getenv("BASE_MODEL_IMGSZ", "0"))
+POLICE_MODEL_IMGSZ = int(os.getenv("POLICE_MODEL_IMGSZ", "0"))
+WEAPON_MODEL_IMGSZ = int(os.getenv("WEAPON_MODEL_IMGSZ", "0"))
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() in ("true", "1", "yes")
+MODEL_ROOT = os.getenv("MODEL_ROOT", "")  # New model versions are only loaded from under this folder
+MODEL_SHADOW_RATE = float(os.getenv("MODEL_SHADOW_RATE", "0.1"))  # Fraction of frames also run on a candidate model
+# Reuse weapon results for person crops whose dHash has not changed. Off by default: a weapon drawn by a
+# person who otherwise stays still can go unseen until the next refresh
+CROP_CACHE_ENABLED = os.getenv("CROP_CACHE_ENABLED", "false").lower() in ("true", "1", "yes")
+CROP_CACHE_MAX_ENTRIES = int(os.getenv("CROP_CACHE_MAX_ENTRIES", "64"))
+CROP_CACHE_MAX_DISTANCE = int(os.getenv("CROP_CACHE_MAX_DISTANCE", "8"))  # Differing bits out of 256
+CROP_CACHE_REFRESH_INTERVAL = float(os.getenv("CROP_CACHE_REFRESH_INTERVAL", "2.0"))  # seconds
+# Weapon stage inference size per person crop: "fixed" (the model's default size for every crop),
+# "per_crop" (the crop's longest side rounded up to the stride) or "buckets" (rounded up further to one of
+# WEAPON_SHAPE_BUCKETS, crops of a size run as one batch), always between WEAPON_SHAPE_MIN and WEAPON_SHAPE_MAX
+# Stays "fixed" until benchmarks/weapon_shapes.py shows the same recall on recorded footage
+WEAPON_SHAPE_MODE = os.getenv("WEAPON_SHAPE_MODE", "fixed").lower()
+WEAPON_SHAPE_BUCKETS = os.getenv("WEAPON_SHAPE_BUCKETS", "320,480,640")
+WEAPON_SHAPE_MIN = int(os.getenv("WEAPON_SHAPE_MIN", "256"))
+WEAPON_SHAPE_MAX = int(os.getenv("WEAPON_SHAPE_MAX", "640"))
 
 # Notification Configuration
 NOTIFICATION_ENDPOINT = os.getenv("NOTIFICATION_ENDPOINT", "Unset")
 NOTIFICATION_COOLDOWN = int(os.getenv("NOTIFICATION_COOLDOWN", "300"))  # 5 minutes in seconds 
-TOKEN = os.getenv("TOKEN", "NOT FOUND")
\ No newline at end of file
+TOKEN = os.getenv("TOKEN", "NOT FOUND")
+# A weapon must be seen in the same region in K of the last N frames before it can trigger a notification
+CONFIRM_FRAMES = int(os.getenv("CONFIRM_FRAMES", "3"))  # K
+CONFIRM_WINDOW_FRAMES = int(os.getenv("CONFIRM_WINDOW_FRAMES", "5"))  # N
+CONFIRM_SMOOTHING = float(os.getenv("CONFIRM_SMOOTHING", "0.5"))  # Weight of the newest confidence
+
+# Image Storage Configuration
+SAVE_MODE = os.getenv("SAVE_MODE", "local")  # "local" or "s3"
+LOCAL_SAVE_DIR = os.getenv("LOCAL_SAVE_DIR", "saved_images")
+
+# S3 Configuration
+S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "")
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")  # e.g. a local MinIO/moto server for testing
+S3_UPLOAD_WORKERS = int(os.getenv("S3_UPLOAD_WORKERS", "4"))
+S3_MAX_PENDING_UPLOADS = int(os.getenv("S3_MAX_PENDING_UPLOADS", "32"))
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))  # 8 MB
+S3_SPOOL_DIR = os.getenv("S3_SPOOL_DIR", "s3_spool")
+S3_SPOOL_RETRY_INTERVAL = int(os.getenv("S3_SPOOL_RETRY_INTERVAL", "60"))  # seconds
+
+# Local Evidence Store Configuration
+EVIDENCE_INDEX_PATH = os.getenv("EVIDENCE_INDEX_PATH", os.path.join(LOCAL_SAVE_DIR, "evidence.sqlite3"))
+EVIDENCE_MAX_BYTES = int(os.getenv("EVIDENCE_MAX_BYTES", str(5 * 1024 ** 3)))  # 5 GB
+EVIDENCE_RETENTION_POLICY = os.getenv("EVIDENCE_RETENTION_POLICY", "oldest")  # "oldest" or "lowest_value"
+EVIDENCE_RETENTION_INTERVAL = int(os.getenv("EVIDENCE_RETENTION_INTERVAL", "300"))  # seconds
+
+# Detection History Configuration
+HISTORY_LOG_PATH = os.getenv("HISTORY_LOG_PATH", "detection_history.sqlite3")
+HISTORY_MAX_EVENTS = int(os.getenv("HISTORY_MAX_EVENTS", "10000"))  # In-memory ring size
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "30"))  # On-disk log retention
+
+# Batch Image Analysis Configuration
+ANALYZE_MAX_BATCH = int(os.getenv("ANALYZE_MAX_BATCH", "16"))
+ANALYZE_MAX_WAIT_MS = float(os.getenv("ANALYZE_MAX_WAIT_MS", "5"))
+ANALYZE_IMAGE_ROOT = os.getenv("ANALYZE_IMAGE_ROOT", "")  # Server paths are only accepted under this folder
+
+# Video File Analysis Jobs Configuration
+VIDEO_JOBS_DIR = os.getenv("VIDEO_JOBS_DIR", "video_jobs")
+VIDEO_JOB_ROOT = os.getenv("VIDEO_JOB_ROOT", "")  # Server paths are only accepted under this folder
+VIDEO_JOB_WORKERS = int(os.getenv("VIDEO_JOB_WORKERS", "1"))  # Worker processes
+VIDEO_JOB_THREADS = int(os.getenv("VIDEO_JOB_THREADS", "2"))  # CPU threads per worker process
+VIDEO_JOB_BATCH = int(os.getenv("VIDEO_JOB_BATCH", "8"))  # Frames per inference batch
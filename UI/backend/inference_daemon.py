@@ -0,0 +1,20 @@
+"""
+Run the single inference process that feeds any number of API workers.
+
+The daemon serves the full API on API_PORT and publishes frames and
+detection events on the frame bus (FRAME_BUS_PATH). Start stateless API
+workers for viewers next to it with:
+
+    INFERENCE_MODE=client uvicorn main:app --workers 4 --port 8001
+"""
+import os
+
+# Must be set before the app (and its settings) are imported
+os.environ["INFERENCE_MODE"] = "daemon"
+
+import uvicorn
+from main import app
+from config.settings import API_HOST, API_PORT
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=API_HOST, port=API_PORT)
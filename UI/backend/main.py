@@ -2,8 +2,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import logging
-from api.routes import notifications, stream, video
-from config.settings import API_HOST, API_PORT
+import asyncio
+import time
+from fastapi.responses import JSONResponse
+from api.routes import notifications, stream, video, detections, analyze, jobs, models, model_registry
+from stream_utils import get_s3_uploader, get_evidence_store
+from stream_utils.detection import detections_to_dicts
+from config.settings import INFERENCE_MODE, API_HOST, API_PORT, SAVE_MODE, S3_SPOOL_RETRY_INTERVAL, EVIDENCE_RETENTION_INTERVAL, STREAM_ALWAYS_ON
 
 
 # Disable YOLO inference logs
@@ -24,17 +29,55 @@ app.add_middleware(
 # Include routers
 app.include_router(video.router, prefix="/video", tags=["Video Processing"])
 app.include_router(stream.router, prefix="/stream", tags=["Stream Management"])
-app.include_router(notifications.router, prefix="/notifications", tags=["Notifications"])
+app.include_router(detections.router, prefix="/detections", tags=["Detections"])
+if INFERENCE_MODE != "client":
+    # These run or manage inference (notifications are sent by its stream loop),
+    # so they are served by the inference process only
+    app.include_router(notifications.router, prefix="/notifications", tags=["Notifications"])
+    app.include_router(analyze.router, prefix="/analyze", tags=["Image Analysis"])
+    app.include_router(jobs.router, prefix="/jobs", tags=["Video Jobs"])
+    app.include_router(models.router, prefix="/models", tags=["Models"])
+
+# Time the app object was created, used to report startup timings
+STARTED_AT = time.time()
 
 # Root endpoint for model information
 @app.get("/model-info")
 def model_info():
+    if INFERENCE_MODE == "client":
+        classes = stream.stream_manager.remote_info.get("classes")
+        if classes is None:
+            return JSONResponse(status_code=503, content={"detail": "Waiting for the inference daemon"})
+        return {"classes": classes}
+    if not model_registry.is_ready("weapon"):
+        return JSONResponse(status_code=503, content={"detail": "Weapon model is still loading"})
     return {"classes": stream.weapon_model.names}
 
+# Readiness endpoint, 503 until every model is loaded and warmed up
+@app.get("/ready")
+def ready():
+    first_frame_time = stream.stream_manager.first_frame_time
+    if INFERENCE_MODE == "client":
+        # Ready once connected to a daemon whose models are loaded
+        remote_info = stream.stream_manager.remote_info
+        is_ready = stream.stream_manager.bus_subscriber.connected and remote_info.get("ready", False)
+        models_status = remote_info.get("models", {})
+    else:
+        is_ready = model_registry.is_ready()
+        models_status = model_registry.status()
+    content = {
+        "ready": is_ready,
+        "mode": INFERENCE_MODE,
+        "models": models_status,
+        "uptime_seconds": round(time.time() - STARTED_AT, 3),
+        "first_frame_seconds": round(first_frame_time - STARTED_AT, 3) if first_frame_time else None,
+    }
+    return JSONResponse(status_code=200 if content["ready"] else 503, content=content)
+
 # Latest detections endpoint
 @app.get("/latest-detections")
 async def latest_detections():
-    return {"detections": stream.stream_manager.latest_detections}
+    return {"detections": detections_to_dicts(stream.stream_manager.latest_detections)}
 
 # Startup event handler
 @app.on_event("startup")
@@ -42,10 +85,33 @@ async def startup_event():
     """
     Start the stream automatically when the server starts
     """
+    if INFERENCE_MODE == "client":
+        # Serve what the inference daemon publishes, which also owns
+        # retention, upload retries and video jobs
+        stream.stream_manager.always_on = True
+        await stream.stream_manager.start_stream()
+        return
+    
+    # Load the models in the background so the API can answer right away
+    model_registry.start()
+    
+    if stream.stream_manager.bus_publisher is not None:
+        await stream.stream_manager.bus_publisher.start()
+    
     print("Starting stream on server startup...")
+    # Keep detecting even when no dashboard is connected
+    stream.stream_manager.always_on = STREAM_ALWAYS_ON
     await stream.stream_manager.start_stream()
-    # Set a high keep-alive counter to keep the stream running
-    stream.stream_manager.keep_alive_counter = 1000000  # A very large number
+    
+    # Retry uploads that were spooled locally while S3 was unreachable
+    if SAVE_MODE == "s3":
+        asyncio.create_task(get_s3_uploader().run_spool_retry(S3_SPOOL_RETRY_INTERVAL))
+    else:
+        # Keep the local evidence store under its disk budget
+        asyncio.create_task(get_evidence_store().run_retention(EVIDENCE_RETENTION_INTERVAL))
+    
+    # Pick up video jobs interrupted by the last shutdown
+    jobs.video_job_manager.resume_incomplete()
 
 # Shutdown event handler
 @app.on_event("shutdown")
@@ -53,6 +119,14 @@ async def shutdown_event():
     stream.stream_manager.active = False
     if stream.stream_manager.stream_task:
         stream.stream_manager.stream_task.cancel()
+    if stream.stream_manager.bus_publisher is not None:
+        await stream.stream_manager.bus_publisher.close()
+    jobs.video_job_manager.shutdown()
+    # Write detection events still queued for the history log
+    stream.stream_manager.detection_history.close()
+    if SAVE_MODE == "s3":
+        # Let queued uploads finish before exiting
+        get_s3_uploader().shutdown(wait=True)
 
 if __name__ == "__main__":
     uvicorn.run(app, host=API_HOST, port=API_PORT)
\ No newline at end of file
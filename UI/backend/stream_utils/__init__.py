@@ -1,12 +1,23 @@
 from .stream_manager import StreamManager
 from .notification_manager import NotificationManager
 from .yolo_process import process_frame_with_yolo
-from .save_image import process_rtsp_frame, save_image
+from .overlay import OverlayRenderer
+from .model_registry import ModelRegistry
+from .s3_uploader import S3Uploader
+from .evidence_store import EvidenceStore
+from .save_image import process_rtsp_frame, save_image, save_image_async, get_s3_uploader, get_evidence_store
 
 __all__ = [
     'StreamManager',
     'NotificationManager',
     'process_frame_with_yolo',
+    'OverlayRenderer',
+    'ModelRegistry',
+    'S3Uploader',
+    'EvidenceStore',
     'process_rtsp_frame',
-    'save_image'
-] 
\ No newline at end of file
+    'save_image',
+    'save_image_async',
+    'get_s3_uploader',
+    'get_evidence_store'
+]
\ No newline at end of file
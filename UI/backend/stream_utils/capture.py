@@ -0,0 +1,189 @@
+import time
+import logging
+import threading
+from typing import Optional
+import numpy as np
+from .crop_cache import dhash, hamming
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CAPTURE_BACKENDS = ("opencv", "pyav")
+IDLE_MODES = ("keyframes", "every_n")
+
+class PyAVVideoStream:
+    def __init__(
+        self,
+        src: str,
+        width: Optional[int] = None,
+        idle_mode: str = "keyframes",
+        idle_every_n: int = 10,
+        read_timeout: float = 10.0,
+        options: Optional[dict] = None,
+    ):
+        """
+        Drop-in replacement for imutils' VideoStream that decodes with FFmpeg
+        through PyAV
+
+        Decoding runs on a background thread with FFmpeg's own frame/slice
+        threading. Only the newest decoded frame is kept, and it is scaled and
+        converted to BGR by swscale when read() takes it, so frames that are
+        never read are never converted.
+
+        While idle (see set_idle()), either only keyframes are decoded, or only
+        every Nth decoded frame is handed out.
+
+        Args:
+            src: RTSP URL or file path
+            width: Output width, the height keeps the aspect ratio. None keeps the source size
+            idle_mode: "keyframes" or "every_n"
+            idle_every_n: N for the "every_n" idle mode
+            read_timeout: Seconds read() waits for a new frame before returning None
+            options: FFmpeg demuxer options, defaults to RTSP over TCP
+        """
+        if idle_mode not in IDLE_MODES:
+            raise ValueError(f"idle_mode must be one of {IDLE_MODES}")
+        self.src = src
+        self.width = width
+        self.idle_mode = idle_mode
+        self.idle_every_n = max(1, idle_every_n)
+        self.read_timeout = read_timeout
+        self.options = options if options is not None else {"rtsp_transport": "tcp"}
+        self.stopped = False
+        self.idle = False
+        self.frames_decoded = 0
+        self.error: Optional[Exception] = None
+        self._container = None
+        self._codec = None
+        self._latest = None  # Newest decoded av.VideoFrame not handed out yet
+        self._size = None  # Output (width, height)
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "PyAVVideoStream":
+        # Imported here, PyAV is only needed for this backend
+        import av
+        self._container = av.open(self.src, options=self.options, timeout=self.read_timeout)
+        stream = self._container.streams.video[0]
+        stream.thread_type = "AUTO"
+        self._codec = stream.codec_context
+        self._thread.start()
+        return self
+
+    def set_idle(self, idle: bool):
+        """
+        Switch between full decoding and the low-power idle mode
+        """
+        if idle == self.idle:
+            return
+        self.idle = idle
+        if self.idle_mode == "keyframes":
+            # Takes effect from the next packet
+            self._codec.skip_frame = "NONKEY" if idle else "DEFAULT"
+        logger.info(f"Capture {'idle, decoding ' + self.idle_mode if idle else 'active, decoding every frame'}")
+
+    def _run(self):
+        # Leaving keyframe-only mode, frames before the next keyframe would
+        # reference pictures that were never decoded
+        wait_for_key = False
+        count = 0
+        try:
+            for packet in self._container.demux(video=0):
+                if self.stopped:
+                    break
+                for frame in packet.decode():
+                    self.frames_decoded += 1
+                    if self.idle and self.idle_mode == "keyframes":
+                        wait_for_key = True
+                    elif wait_for_key:
+                        if not frame.key_frame:
+                            continue
+                        wait_for_key = False
+                    count += 1
+                    if self.idle and self.idle_mode == "every_n" and count % self.idle_every_n:
+                        continue
+                    with self._cond:
+                        self._latest = frame
+                        self._cond.notify_all()
+        except Exception as e:
+            if not self.stopped:
+                logger.error(f"Decoding {self.src} failed: {e}")
+                self.error = e
+        finally:
+            self.stopped = True
+            with self._cond:
+                self._cond.notify_all()
+            self._container.close()
+
+    def read(self) -> Optional[np.ndarray]:
+        """
+        Wait for a frame newer than the last one read
+
+        Returns:
+            BGR frame, or None on timeout or once the stream has ended
+        """
+        with self._cond:
+            if self._latest is None:
+                self._cond.wait_for(lambda: self._latest is not None or self.stopped, self.read_timeout)
+            frame, self._latest = self._latest, None
+        if frame is None:
+            return None
+        if self.width is None:
+            return frame.to_ndarray(format="bgr24")
+        if self._size is None:
+            self._size = (self.width, round(frame.height * self.width / frame.width))
+        width, height = self._size
+        return frame.reformat(width=width, height=height, format="bgr24", interpolation="AREA").to_ndarray()
+
+    def stop(self):
+        self.stopped = True
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.read_timeout)
+
+class IdleDetector:
+    def __init__(self, idle_after: float = 30.0, max_distance: int = 12):
+        """
+        Decide when the camera view is idle: no detections and no visible
+        change in the whole frame for idle_after seconds. Any change or
+        detection makes it active again immediately.
+
+        Args:
+            idle_after: Seconds without activity before going idle
+            max_distance: Differing dHash bits (out of 256) that count as a change
+        """
+        self.idle_after = idle_after
+        self.max_distance = max_distance
+        self._signature = None
+        self._active_at = time.monotonic()
+
+    def update(self, frame: np.ndarray, has_detections: bool) -> bool:
+        """
+        Returns:
+            True if the view is idle
+        """
+        now = time.monotonic()
+        signature = dhash(frame)
+        if has_detections or self._signature is None or hamming(signature, self._signature) > self.max_distance:
+            self._signature = signature
+            self._active_at = now
+        return now - self._active_at >= self.idle_after
+
+def open_capture(src: str, backend: str = "opencv", width: Optional[int] = None, **kwargs):
+    """
+    Start a capture on the configured backend
+
+    Args:
+        src: RTSP URL or file path
+        backend: "opencv" (imutils VideoStream over cv2.VideoCapture) or "pyav"
+        width: Decode-time output width, pyav only
+        **kwargs: Further PyAVVideoStream options
+
+    Returns:
+        A started stream with read() and stop()
+    """
+    if backend == "pyav":
+        return PyAVVideoStream(src, width=width, **kwargs).start()
+    if backend != "opencv":
+        raise ValueError(f"Unknown capture backend {backend!r}, expected one of {CAPTURE_BACKENDS}")
+    from imutils.video import VideoStream
+    return VideoStream(src).start()
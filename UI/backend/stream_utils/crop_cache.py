@@ -0,0 +1,174 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import cv2
+import numpy as np
+from .detection import Detection, iou
+
+def dhash(image: np.ndarray, hash_size: int = 16) -> int:
+    """
+    Difference hash of an image: one bit per horizontally adjacent pair of
+    cells in a (hash_size + 1) x hash_size grayscale thumbnail
+
+    Args:
+        image: BGR or grayscale image
+        hash_size: Thumbnail rows, the hash has hash_size**2 bits
+
+    Returns:
+        The hash as an int
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+class _Entry:
+    __slots__ = ("region", "signature", "detections", "refreshed_at")
+
+    def __init__(self, region: Detection, signature: int, detections: List[Detection], refreshed_at: float):
+        self.region = region
+        self.signature = signature
+        self.detections = detections  # Relative to the crop
+        self.refreshed_at = refreshed_at
+
+class CropResultCache:
+    def __init__(
+        self,
+        max_entries: int = 64,
+        max_distance: int = 8,
+        refresh_interval: float = 2.0,
+        min_overlap: float = 0.7,
+        hash_size: int = 16,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Reuse weapon detections for person crops that have not changed
+
+        Entries are keyed by person region: a crop matches an entry whose box
+        overlaps it and whose dHash is within max_distance bits. A match
+        older than refresh_interval is treated as a miss so the model still
+        sees every region regularly.
+
+        Args:
+            max_entries: Regions kept, least recently used are evicted first
+            max_distance: Maximum differing hash bits for a crop to count as unchanged
+            refresh_interval: Seconds after which a region is re-run regardless
+            min_overlap: Minimum IoU between a crop and a cached region
+            hash_size: dHash thumbnail size, the hash has hash_size**2 bits
+            clock: Time source for refresh_interval, e.g. video timestamps when replaying footage
+        """
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.refresh_interval = refresh_interval
+        self.min_overlap = min_overlap
+        self.hash_size = hash_size
+        self.clock = clock
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._next_key = 0
+        self._owner: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._inference_seconds = None  # Moving average of a weapon model call on a crop
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def bind(self, owner: Hashable):
+        """
+        Drop all entries when the results would come from a different model
+        (e.g. after a new weapon model version is promoted)
+        """
+        with self._lock:
+            if owner != self._owner:
+                self._entries.clear()
+                self._owner = owner
+
+    def signature(self, crop: np.ndarray) -> int:
+        return dhash(crop, self.hash_size)
+
+    def lookup(self, region: Detection, signature: int) -> Tuple[Optional[int], Optional[List[Detection]]]:
+        """
+        Find cached detections for a person crop
+
+        Args:
+            region: The crop's box in the frame
+            signature: The crop's signature()
+
+        Returns:
+            Tuple of (entry key, detections relative to the crop). Detections
+            are None on a miss; the key, if any, should be passed to store()
+            so the region's entry is refreshed rather than duplicated.
+        """
+        now = self.clock()
+        with self._lock:
+            key, best = None, self.min_overlap
+            for k, entry in self._entries.items():
+                overlap = iou(entry.region, region)
+                if overlap >= best:
+                    key, best = k, overlap
+            if key is None:
+                self.misses += 1
+                return None, None
+            entry = self._entries[key]
+            self._entries.move_to_end(key)
+            if now - entry.refreshed_at >= self.refresh_interval or hamming(entry.signature, signature) > self.max_distance:
+                self.misses += 1
+                return key, None
+            self.hits += 1
+            if self._inference_seconds is not None:
+                self.saved_seconds += self._inference_seconds
+            # Follow small movements of the person
+            entry.region = region
+            return key, entry.detections
+
+    def store(
+        self,
+        key: Optional[int],
+        region: Detection,
+        signature: int,
+        detections: List[Detection],
+        inference_seconds: Optional[float] = None,
+    ):
+        """
+        Record the weapon detections of a crop after running the model
+
+        Args:
+            key: The key returned by lookup(), None for a new region
+            region: The crop's box in the frame
+            signature: The crop's signature()
+            detections: Weapon detections relative to the crop
+            inference_seconds: How long the model call took, for the saved-time estimate
+        """
+        now = self.clock()
+        with self._lock:
+            if inference_seconds is not None:
+                avg = self._inference_seconds
+                self._inference_seconds = inference_seconds if avg is None else avg + 0.1 * (inference_seconds - avg)
+            if key is None or key not in self._entries:
+                key = self._next_key
+                self._next_key += 1
+            self._entries[key] = _Entry(region, signature, detections, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "avg_inference_ms": round(self._inference_seconds * 1000, 2) if self._inference_seconds is not None else None,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
@@ -0,0 +1,104 @@
+import json
+import struct
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List
+
+# confidence, x1, y1, x2, y2 after the length-prefixed class name
+_BOX = struct.Struct("!fffff")
+_COUNT = struct.Struct("!H")
+
+@dataclass
+class Detection:
+    """
+    One detected object, used from model output through notification,
+    history and the bus. Converted to a dict only at the API edge.
+
+    Coordinates are pixels in the frame the detection refers to (ints once
+    mapped to the full frame, raw model floats before that).
+    """
+    __slots__ = ("class_name", "confidence", "x1", "y1", "x2", "y2")
+    class_name: str
+    confidence: float
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+
+    @property
+    def box(self):
+        return self.x1, self.y1, self.x2, self.y2
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        The API representation, as returned by /latest-detections and pushed over WebSocket
+        """
+        return {
+            "class_name": self.class_name,
+            "confidence": self.confidence,
+            "x1": self.x1, "y1": self.y1, "x2": self.x2, "y2": self.y2,
+        }
+
+    def to_event(self) -> Dict[str, Any]:
+        """
+        The detection_event representation used by the notification API
+        """
+        return {"confidence": self.confidence, "classification": self.class_name}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Detection":
+        return cls(d["class_name"], d["confidence"], d.get("x1"), d.get("y1"), d.get("x2"), d.get("y2"))
+
+def iou(a: Detection, b: Detection) -> float:
+    """
+    Intersection over union of two detection boxes
+    """
+    w = min(a.x2, b.x2) - max(a.x1, b.x1)
+    h = min(a.y2, b.y2) - max(a.y1, b.y1)
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    union = (a.x2 - a.x1) * (a.y2 - a.y1) + (b.x2 - b.x1) * (b.y2 - b.y1) - inter
+    return inter / union if union > 0 else 0.0
+
+def detections_to_dicts(detections: Iterable[Detection]) -> List[Dict[str, Any]]:
+    return [d.to_dict() for d in detections]
+
+def detections_to_json(detections: Iterable[Detection]) -> str:
+    """
+    Serialize detections to the same JSON as json.dumps(detections_to_dicts(...)),
+    without building the intermediate dicts
+    """
+    return "[" + ", ".join(
+        '{"class_name": %s, "confidence": %r, "x1": %r, "y1": %r, "x2": %r, "y2": %r}'
+        % (json.dumps(d.class_name), d.confidence, d.x1, d.y1, d.x2, d.y2)
+        for d in detections
+    ) + "]"
+
+def pack_detections(detections: List[Detection]) -> bytes:
+    """
+    Compact binary form of one frame's detections, for the frame bus and storage
+    """
+    parts = [_COUNT.pack(len(detections))]
+    for d in detections:
+        name = d.class_name.encode()
+        parts.append(bytes((len(name),)))
+        parts.append(name)
+        parts.append(_BOX.pack(d.confidence, d.x1, d.y1, d.x2, d.y2))
+    return b"".join(parts)
+
+def unpack_detections(data: bytes) -> List[Detection]:
+    """
+    Inverse of pack_detections. Coordinates come back as ints and
+    confidences rounded to 2 decimals, as produced by the detection cascade.
+    """
+    (count,) = _COUNT.unpack_from(data)
+    offset = _COUNT.size
+    detections = []
+    for _ in range(count):
+        length = data[offset]
+        name = data[offset + 1:offset + 1 + length].decode()
+        offset += 1 + length
+        conf, x1, y1, x2, y2 = _BOX.unpack_from(data, offset)
+        offset += _BOX.size
+        detections.append(Detection(name, round(conf, 2), int(x1), int(y1), int(x2), int(y2)))
+    return detections
@@ -0,0 +1,252 @@
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple
+from .detection import Detection
+from config.settings import HISTORY_LOG_PATH, HISTORY_MAX_EVENTS, HISTORY_RETENTION_DAYS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    camera_id INTEGER NOT NULL,
+    class_name TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_detections_ts ON detections (ts);
+CREATE INDEX IF NOT EXISTS idx_detections_class_ts ON detections (class_name, ts);
+"""
+
+# How often (in appends) old rows are pruned from the on-disk log
+_PRUNE_EVERY = 1000
+
+class DetectionHistory:
+    def __init__(
+        self,
+        window_seconds: float = 3600,
+        max_events: int = HISTORY_MAX_EVENTS,
+        log_path: Optional[str] = HISTORY_LOG_PATH,
+        retention_days: int = HISTORY_RETENTION_DAYS,
+    ):
+        """
+        Time-ordered detection history: a bounded in-memory ring of recent
+        events plus an append-only SQLite log for longer retention
+
+        Rows are written to the log by a single background thread, so append()
+        never waits on the disk from the stream loop. Events that are still
+        queued do not show up in query() yet; flush() waits for them.
+
+        Args:
+            window_seconds: How long events stay in the in-memory ring
+            max_events: Maximum number of events kept in memory
+            log_path: Path of the on-disk log, or None to keep history in memory only
+            retention_days: How long rows are kept in the on-disk log
+        """
+        self.window_seconds = window_seconds
+        self.retention_seconds = retention_days * 86400
+        self._events = deque(maxlen=max_events)
+        self._appends = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        if log_path:
+            if os.path.dirname(log_path):
+                os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            self._db = sqlite3.connect(log_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+            self._queue = queue.Queue()
+            self._writer = threading.Thread(target=self._run_writer, name="history-writer", daemon=True)
+            self._writer.start()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __bool__(self) -> bool:
+        return bool(self._events)
+
+    @property
+    def last_time(self) -> Optional[float]:
+        """
+        Time of the most recent event, or None if the ring is empty
+        """
+        return self._events[-1]["time"] if self._events else None
+
+    def append(self, detections: List[Detection], timestamp: Optional[float] = None, camera_id: int = 1):
+        """
+        Record a detection event
+
+        Args:
+            detections: Detections that make up the event
+            timestamp: Event time, defaults to now
+            camera_id: The camera the event came from
+        """
+        ts = timestamp if timestamp is not None else time.time()
+        self._events.append({
+            "time": ts,
+            "camera_id": camera_id,
+            "count": len(detections),
+            "detections": detections,
+        })
+
+        if self._queue is not None:
+            self._queue.put([
+                (ts, camera_id, d.class_name, d.confidence, d.x1, d.y1, d.x2, d.y2)
+                for d in detections
+            ])
+
+    def _run_writer(self):
+        """
+        Write queued events to the log, everything queued so far in one transaction
+        """
+        while True:
+            batches = [self._queue.get()]
+            while True:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batches
+            rows = [row for batch in batches if batch is not None for row in batch]
+            try:
+                if rows:
+                    self._write(rows, sum(1 for batch in batches if batch is not None))
+            except sqlite3.Error as e:
+                logger.error(f"Error writing {len(rows)} detection(s) to the history log: {e}")
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, rows: List[tuple], events: int):
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO detections (ts, camera_id, class_name, confidence, x1, y1, x2, y2) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            previous, self._appends = self._appends, self._appends + events
+            if previous // _PRUNE_EVERY != self._appends // _PRUNE_EVERY:
+                cutoff = max(row[0] for row in rows) - self.retention_seconds
+                self._db.execute("DELETE FROM detections WHERE ts < ?", (cutoff,))
+
+    def flush(self):
+        """
+        Block until every event appended so far is in the on-disk log
+        """
+        if self._queue is not None:
+            self._queue.join()
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """
+        Drop events older than the in-memory window
+
+        Events are time-ordered, so only the expired head of the ring is touched.
+
+        Returns:
+            Number of events dropped
+        """
+        cutoff = (now if now is not None else time.time()) - self.window_seconds
+        dropped = 0
+        while self._events and self._events[0]["time"] < cutoff:
+            self._events.popleft()
+            dropped += 1
+        return dropped
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """
+        Get the events currently held in memory, oldest first
+        """
+        return list(self._events)
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        class_name: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        camera_id: Optional[int] = None,
+        cursor: Optional[int] = None,
+        limit: int = 100,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Query the on-disk log, newest first, with cursor pagination
+
+        Args:
+            start: Only detections at or after this UNIX time
+            end: Only detections before this UNIX time
+            class_name: Only detections of this class
+            min_confidence: Only detections with at least this confidence
+            camera_id: Only detections from this camera
+            cursor: Cursor returned by the previous page
+            limit: Page size
+
+        Returns:
+            Tuple of (detections, next_cursor), next_cursor is None on the last page
+        """
+        if self._db is None:
+            return [], None
+
+        sql = "SELECT id, ts, camera_id, class_name, confidence, x1, y1, x2, y2 FROM detections WHERE 1 = 1"
+        params: List[Any] = []
+        if cursor is not None:
+            sql += " AND id < ?"
+            params.append(cursor)
+        if start is not None:
+            sql += " AND ts >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND ts < ?"
+            params.append(end)
+        if class_name is not None:
+            sql += " AND class_name = ?"
+            params.append(class_name)
+        if min_confidence is not None:
+            sql += " AND confidence >= ?"
+            params.append(min_confidence)
+        if camera_id is not None:
+            sql += " AND camera_id = ?"
+            params.append(camera_id)
+        # Fetch one extra row to know whether there is a next page
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        items = [
+            {
+                "id": row[0],
+                "time": row[1],
+                "camera_id": row[2],
+                "class_name": row[3],
+                "confidence": row[4],
+                "x1": row[5], "y1": row[6], "x2": row[7], "y2": row[8],
+            }
+            for row in rows[:limit]
+        ]
+        return items, next_cursor
+
+    def close(self):
+        """
+        Write the events still queued and close the on-disk log
+        """
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+            self._queue = None
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
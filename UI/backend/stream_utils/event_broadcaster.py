@@ -0,0 +1,76 @@
+import asyncio
+from typing import Any, Dict, Iterable, Optional, Set
+
+class Subscription:
+    def __init__(self, topics: Iterable[str]):
+        """
+        A single client's mailbox of pending messages
+
+        Only the latest message per topic is kept, so a slow client skips
+        intermediate states instead of building up a backlog.
+
+        Args:
+            topics: The topics this client receives (e.g. "detections", "frame")
+        """
+        self.topics: Set[str] = set(topics)
+        self._pending: Dict[str, Any] = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, topic: str, message: Any):
+        """
+        Replace the pending message for a topic and wake up the client
+        """
+        if topic not in self.topics:
+            return
+        self._pending[topic] = message
+        self._ready.set()
+
+    async def next(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Wait for pending messages and take them
+
+        Args:
+            timeout: Maximum seconds to wait, returns an empty dict on timeout
+
+        Returns:
+            Dictionary of topic to latest message
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self._ready.clear()
+        pending, self._pending = self._pending, {}
+        return pending
+
+class EventBroadcaster:
+    def __init__(self):
+        """
+        Fan out stream events to connected clients
+        """
+        self._subscriptions: Set[Subscription] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def wants(self, topic: str) -> bool:
+        """
+        Check whether any client receives a topic, so producers can skip work
+        """
+        return any(topic in sub.topics for sub in self._subscriptions)
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        sub = Subscription(topics)
+        self._subscriptions.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        self._subscriptions.discard(sub)
+
+    def publish(self, topic: str, message: Any):
+        """
+        Hand a message to every subscribed client without waiting on any of them
+        """
+        for sub in self._subscriptions:
+            sub.offer(topic, message)
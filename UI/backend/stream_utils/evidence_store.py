@@ -0,0 +1,285 @@
+import os
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Union
+from .detection import Detection
+from config.settings import (
+    LOCAL_SAVE_DIR, EVIDENCE_INDEX_PATH, EVIDENCE_MAX_BYTES, EVIDENCE_RETENTION_POLICY
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evidence (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    camera_id INTEGER NOT NULL,
+    classes TEXT NOT NULL,
+    max_confidence REAL NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_evidence_ts ON evidence (ts);
+CREATE INDEX IF NOT EXISTS idx_evidence_camera_ts ON evidence (camera_id, ts);
+CREATE INDEX IF NOT EXISTS idx_evidence_value ON evidence (max_confidence, ts);
+CREATE TABLE IF NOT EXISTS evidence_classes (
+    evidence_id INTEGER NOT NULL REFERENCES evidence (id) ON DELETE CASCADE,
+    class_name TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_evidence_classes_class_ts ON evidence_classes (class_name, ts);
+CREATE INDEX IF NOT EXISTS idx_evidence_classes_evidence ON evidence_classes (evidence_id);
+"""
+
+# Eviction order for each retention policy
+_EVICTION_ORDER = {
+    "oldest": "ts ASC",
+    "lowest_value": "max_confidence ASC, ts ASC",
+}
+
+class EvidenceStore:
+    def __init__(
+        self,
+        root_dir: str = LOCAL_SAVE_DIR,
+        index_path: str = EVIDENCE_INDEX_PATH,
+        max_bytes: int = EVIDENCE_MAX_BYTES,
+        retention_policy: str = EVIDENCE_RETENTION_POLICY,
+    ):
+        """
+        Local store for detection images, sharded by date and camera and
+        indexed in SQLite
+
+        Files are laid out as <root>/YYYY/MM/DD/camera_<id>/<HHMMSS>_<usec>_<rand>.jpg
+
+        Args:
+            root_dir: Root directory for evidence files
+            index_path: Path of the SQLite index database
+            max_bytes: Disk budget for evidence files
+            retention_policy: "oldest" or "lowest_value", which items to evict first
+        """
+        if retention_policy not in _EVICTION_ORDER:
+            raise ValueError(f"Unknown retention policy: {retention_policy}")
+
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.retention_policy = retention_policy
+        os.makedirs(root_dir, exist_ok=True)
+        if os.path.dirname(index_path):
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(index_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM evidence").fetchone()[0]
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _new_path(self, ts: float, camera_id: int, ext: str) -> str:
+        """
+        Build a collision-free path in the shard for this time and camera
+        """
+        dt = datetime.fromtimestamp(ts)
+        shard = os.path.join(
+            self.root_dir, dt.strftime("%Y"), dt.strftime("%m"), dt.strftime("%d"), f"camera_{camera_id}"
+        )
+        os.makedirs(shard, exist_ok=True)
+        name = f"{dt.strftime('%H%M%S')}_{dt.microsecond:06d}_{uuid.uuid4().hex[:8]}{ext}"
+        return os.path.join(shard, name)
+
+    def add(
+        self,
+        data: Union[bytes, memoryview],
+        detections: Optional[List[Detection]] = None,
+        camera_id: int = 1,
+        timestamp: Optional[float] = None,
+        ext: str = ".jpg",
+    ) -> str:
+        """
+        Write an encoded image to the store and index it
+
+        Args:
+            data: The encoded image bytes
+            detections: Detections shown in the image
+            camera_id: The camera the image came from
+            timestamp: Capture time, defaults to now
+            ext: File extension
+
+        Returns:
+            The path where the image was saved
+        """
+        ts = timestamp if timestamp is not None else time.time()
+        detections = detections or []
+        classes = sorted({d.class_name for d in detections})
+        max_confidence = max((d.confidence for d in detections), default=0.0)
+
+        path = self._new_path(ts, camera_id, ext)
+        tmp_path = path + ".part"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        size = len(data)
+
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO evidence (ts, camera_id, classes, max_confidence, path, size) VALUES (?, ?, ?, ?, ?, ?)",
+                (ts, camera_id, ",".join(classes), max_confidence, path, size)
+            )
+            self._db.executemany(
+                "INSERT INTO evidence_classes (evidence_id, class_name, ts) VALUES (?, ?, ?)",
+                [(cursor.lastrowid, c, ts) for c in classes]
+            )
+            self._total_bytes += size
+        return path
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        class_name: Optional[str] = None,
+        camera_id: Optional[int] = None,
+        min_confidence: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Look up evidence through the index, newest first
+
+        Args:
+            start: Only items at or after this UNIX time
+            end: Only items before this UNIX time
+            class_name: Only items containing this class
+            camera_id: Only items from this camera
+            min_confidence: Only items whose best detection reaches this confidence
+            limit: Maximum number of items to return
+
+        Returns:
+            List of indexed items
+        """
+        if class_name is not None:
+            sql = ("SELECT e.id, e.ts, e.camera_id, e.classes, e.max_confidence, e.path, e.size "
+                   "FROM evidence_classes c JOIN evidence e ON e.id = c.evidence_id WHERE c.class_name = ?")
+            params: List[Any] = [class_name]
+            ts_col = "c.ts"
+        else:
+            sql = "SELECT e.id, e.ts, e.camera_id, e.classes, e.max_confidence, e.path, e.size FROM evidence e WHERE 1 = 1"
+            params = []
+            ts_col = "e.ts"
+
+        if start is not None:
+            sql += f" AND {ts_col} >= ?"
+            params.append(start)
+        if end is not None:
+            sql += f" AND {ts_col} < ?"
+            params.append(end)
+        if camera_id is not None:
+            sql += " AND e.camera_id = ?"
+            params.append(camera_id)
+        if min_confidence is not None:
+            sql += " AND e.max_confidence >= ?"
+            params.append(min_confidence)
+        sql += f" ORDER BY {ts_col} DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [
+            {
+                "id": row[0],
+                "timestamp": row[1],
+                "camera_id": row[2],
+                "classes": row[3].split(",") if row[3] else [],
+                "max_confidence": row[4],
+                "path": row[5],
+                "size": row[6],
+            }
+            for row in rows
+        ]
+
+    def enforce_budget(self, low_water: float = 0.9) -> int:
+        """
+        Evict items until the store is back under its disk budget
+
+        Eviction continues down to low_water * max_bytes so the job does not
+        run again for every new image once the budget is reached.
+
+        Returns:
+            Number of items evicted
+        """
+        if self._total_bytes <= self.max_bytes:
+            return 0
+
+        target = int(self.max_bytes * low_water)
+        order = _EVICTION_ORDER[self.retention_policy]
+        evicted = 0
+        while self._total_bytes > target:
+            with self._lock:
+                rows = self._db.execute(
+                    f"SELECT id, path, size FROM evidence ORDER BY {order} LIMIT 100"
+                ).fetchall()
+            if not rows:
+                break
+
+            removed = []
+            remaining = self._total_bytes
+            for evidence_id, path, size in rows:
+                if remaining <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.error(f"Error removing evidence file {path}: {e}")
+                    continue
+                self._remove_empty_shards(os.path.dirname(path))
+                removed.append((evidence_id, size))
+                remaining -= size
+            if not removed:
+                break
+
+            with self._lock, self._db:
+                self._db.executemany("DELETE FROM evidence WHERE id = ?", [(r[0],) for r in removed])
+                self._total_bytes -= sum(r[1] for r in removed)
+            evicted += len(removed)
+
+        logger.info(f"Evicted {evicted} evidence item(s), store now uses {self._total_bytes} bytes")
+        return evicted
+
+    def _remove_empty_shards(self, shard_dir: str):
+        """
+        Remove empty shard directories up to (not including) the root
+        """
+        root = os.path.abspath(self.root_dir)
+        current = os.path.abspath(shard_dir)
+        while current.startswith(root) and current != root:
+            try:
+                os.rmdir(current)
+            except OSError:
+                break
+            current = os.path.dirname(current)
+
+    async def run_retention(self, interval: float):
+        """
+        Periodically enforce the disk budget in the background
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.enforce_budget)
+            except Exception as e:
+                logger.error(f"Error enforcing evidence retention: {e}")
+            await asyncio.sleep(interval)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import struct
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from .event_broadcaster import EventBroadcaster
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# topic code, timestamp, frame sequence number, metadata length, data length
+_HEADER = struct.Struct("!BdQII")
+BUS_TOPICS = ("info", "detections", "frame", "raw")
+_TOPIC_CODES = {topic: code for code, topic in enumerate(BUS_TOPICS)}
+# Topics whose latest message is replayed to new subscribers
+_STICKY_TOPICS = ("info", "detections")
+
+def encode_message(topic: str, meta: Any = None, data: bytes = b"", timestamp: Optional[float] = None, seq: int = 0) -> bytes:
+    """
+    Frame one bus message: fixed header, JSON metadata, then raw data (e.g. a JPEG)
+    """
+    meta_bytes = json.dumps(meta).encode() if meta is not None else b""
+    header = _HEADER.pack(
+        _TOPIC_CODES[topic], timestamp if timestamp is not None else time.time(), seq, len(meta_bytes), len(data)
+    )
+    return header + meta_bytes + bytes(data)
+
+async def read_message(reader: asyncio.StreamReader) -> Tuple[str, float, int, Any, bytes]:
+    """
+    Read one message written by encode_message
+
+    Returns:
+        Tuple of (topic, timestamp, seq, metadata, data)
+
+    Raises:
+        asyncio.IncompleteReadError: If the connection closed
+    """
+    code, timestamp, seq, meta_len, data_len = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    meta = json.loads(await reader.readexactly(meta_len)) if meta_len else None
+    data = await reader.readexactly(data_len) if data_len else b""
+    return BUS_TOPICS[code], timestamp, seq, meta, data
+
+class FrameBusPublisher:
+    def __init__(self, path: str):
+        """
+        Serve frames and detection events from the inference process to any
+        number of local API workers over a Unix-domain socket
+
+        Each subscriber only gets the latest message per topic, so a slow
+        worker skips frames instead of slowing down inference or the others.
+
+        Args:
+            path: Path of the Unix socket to listen on
+        """
+        self.path = path
+        self._broadcaster = EventBroadcaster()
+        self._latest: Dict[str, bytes] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        # A socket file left by a crashed daemon would make bind fail
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        logger.info(f"Frame bus listening on {self.path}")
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._broadcaster.subscriber_count
+
+    def wants(self, topic: str) -> bool:
+        """
+        Check whether any worker receives a topic, so the producer can skip work
+        """
+        return self._broadcaster.wants(topic)
+
+    def publish(self, topic: str, meta: Any = None, data: bytes = b"", timestamp: Optional[float] = None, seq: int = 0):
+        """
+        Hand a message to every subscribed worker without waiting on any of them
+        """
+        if topic not in _STICKY_TOPICS and not self._broadcaster.wants(topic):
+            return
+        message = encode_message(topic, meta, data, timestamp, seq)
+        if topic in _STICKY_TOPICS:
+            self._latest[topic] = message
+        self._broadcaster.publish(topic, message)
+
+    async def _read_topics(self, reader: asyncio.StreamReader, subscription):
+        # Workers send a JSON line with the topics they want, and may change it later
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            topics = set(json.loads(line).get("topics", [])) & set(BUS_TOPICS)
+            added = topics - subscription.topics
+            subscription.topics = topics
+            for topic in _STICKY_TOPICS:
+                if topic in added and topic in self._latest:
+                    subscription.offer(topic, self._latest[topic])
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscription = self._broadcaster.subscribe([])
+        topics_task = asyncio.create_task(self._read_topics(reader, subscription))
+        logger.info(f"Frame bus subscriber connected ({self.subscriber_count} total)")
+        try:
+            while not topics_task.done():
+                messages = await subscription.next(timeout=1.0)
+                for topic in BUS_TOPICS:
+                    if topic in messages:
+                        writer.write(messages[topic])
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        except asyncio.CancelledError:
+            # Server shutting down, end the connection quietly
+            pass
+        finally:
+            self._broadcaster.unsubscribe(subscription)
+            topics_task.cancel()
+            writer.close()
+            logger.info(f"Frame bus subscriber disconnected ({self.subscriber_count} left)")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+class FrameBusSubscriber:
+    def __init__(self, path: str, topics: Iterable[str], reconnect_delay: float = 1.0):
+        """
+        Receive frames and detection events from the inference daemon
+
+        Args:
+            path: Path of the daemon's Unix socket
+            topics: Topics to receive, any of BUS_TOPICS
+            reconnect_delay: Seconds to wait before reconnecting after the daemon went away
+        """
+        self.path = path
+        self.topics = list(topics)
+        self.reconnect_delay = reconnect_delay
+        self.connected = False
+
+    async def run(self, on_message: Callable[[str, float, int, Any, bytes], None]):
+        """
+        Deliver messages to on_message until cancelled, reconnecting as needed
+
+        Args:
+            on_message: Called with (topic, timestamp, seq, metadata, data) for each message
+        """
+        warned = False
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError as e:
+                if not warned:
+                    logger.warning(f"Waiting for the inference daemon on {self.path}: {e}")
+                    warned = True
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            warned = False
+            self.connected = True
+            logger.info(f"Connected to the frame bus on {self.path}")
+            try:
+                writer.write((json.dumps({"topics": self.topics}) + "\n").encode())
+                await writer.drain()
+                while True:
+                    message = await read_message(reader)
+                    try:
+                        on_message(*message)
+                    except Exception as e:
+                        logger.error(f"Error handling {message[0]} message from the frame bus: {e}")
+            except (asyncio.IncompleteReadError, ConnectionError, OSError):
+                logger.warning("Lost connection to the inference daemon, reconnecting...")
+            finally:
+                self.connected = False
+                writer.close()
+            await asyncio.sleep(self.reconnect_delay)
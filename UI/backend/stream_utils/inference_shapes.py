@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+def align(size: float, stride: int) -> int:
+    """Round a size up to a multiple of the model stride"""
+    return int(-(-size // stride) * stride)
+
+class ShapeBuckets:
+    def __init__(
+        self,
+        sizes: Sequence[int] = (),
+        stride: int = 32,
+        min_size: int = 256,
+        max_size: int = 640,
+    ):
+        """
+        Pick the inference size for person crops in the weapon stage
+
+        By default every crop is letterboxed up to the model's full input
+        size, so a small crop of a distant person spends most of the compute
+        on padding and upsampling. Instead, a crop is run at its own longest
+        side rounded up to the stride, between min_size and max_size. With
+        sizes, that is rounded up further to the next of a few fixed sizes,
+        so crops of a frame share shapes and run as one batch per size.
+
+        Args:
+            sizes: Bucket sizes, empty to use the stride-aligned size of each crop
+            stride: Model stride, every size is a multiple of it
+            min_size: Smallest inference size, smaller crops are upsampled to it
+            max_size: Largest inference size, larger crops are downsampled to it
+        """
+        self.stride = stride
+        self.min_size = align(min_size, stride)
+        self.max_size = max(self.min_size, align(max_size, stride))
+        self.sizes = sorted({min(self.max_size, max(self.min_size, align(s, stride))) for s in sizes})
+
+    @property
+    def name(self) -> str:
+        if self.sizes:
+            return "buckets " + "/".join(map(str, self.sizes))
+        return f"per crop {self.min_size}-{self.max_size}"
+
+    def size_for(self, crop_shape: Tuple[int, ...]) -> int:
+        """
+        Args:
+            crop_shape: The crop's (height, width[, channels])
+
+        Returns:
+            Inference size (longest side) for the crop
+        """
+        size = min(self.max_size, max(self.min_size, align(max(crop_shape[:2]), self.stride)))
+        for bucket in self.sizes:
+            if bucket >= size:
+                return bucket
+        return self.sizes[-1] if self.sizes else size
+
+    def group(self, crops: List[np.ndarray]) -> Dict[int, List[int]]:
+        """
+        Returns:
+            Inference size -> indices of the crops to run at it, smallest size first
+        """
+        groups: Dict[int, List[int]] = {}
+        for i, crop in enumerate(crops):
+            groups.setdefault(self.size_for(crop.shape), []).append(i)
+        return OrderedDict(sorted(groups.items()))
+
+def parse_sizes(value: str) -> List[int]:
+    """Bucket sizes from a comma-separated setting, e.g. "320,480,640" """
+    return [int(s) for s in value.replace(" ", "").split(",") if s]
+
+def shape_buckets_from_settings(mode: str, sizes: str, min_size: int, max_size: int) -> Optional[ShapeBuckets]:
+    """
+    Args:
+        mode: "fixed" for the model's default size, "per_crop" or "buckets"
+
+    Returns:
+        The ShapeBuckets to pass to detect_frame, None for "fixed"
+    """
+    if mode == "fixed":
+        return None
+    if mode not in ("per_crop", "buckets"):
+        raise ValueError(f"Unknown weapon inference shape mode {mode!r}, use 'fixed', 'per_crop' or 'buckets'")
+    return ShapeBuckets(parse_sizes(sizes) if mode == "buckets" else (), min_size=min_size, max_size=max_size)
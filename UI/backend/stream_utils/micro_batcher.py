@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+    ):
+        """
+        Collect items submitted by concurrent callers into batches
+
+        A batch is dispatched when it is full or max_wait_ms after its first
+        item arrived, whichever comes first. While one batch runs, the next
+        one is already being collected, and it is dispatched as soon as the
+        running one is done.
+
+        Args:
+            process_batch: Blocking function mapping a list of items to a list
+                of results in the same order
+            max_batch_size: Maximum items per batch
+            max_wait_ms: Maximum time to hold the first item of a batch
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Single thread: batches run one at a time on the models
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="micro-batch")
+        self.batches_run = 0
+        self.items_processed = 0
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue an item and wait for its result
+
+        Returns:
+            The result for this item
+        """
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> List[Any]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        running: Optional[asyncio.Task] = None
+        while True:
+            # Collect the next batch while the previous one runs
+            batch = await self._collect()
+            if running is not None:
+                await running
+                # Take in what arrived while waiting for it, up to a full batch
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+            # Skip items whose caller went away
+            batch = [(item, future) for item, future in batch if not future.done()]
+            running = asyncio.create_task(self._process(batch)) if batch else None
+
+    async def _process(self, batch: List[Tuple[Any, asyncio.Future]]):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self._executor, self.process_batch, [item for item, _ in batch]
+            )
+        except Exception as e:
+            logger.error(f"Error processing batch of {len(batch)}: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.items_processed += len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+        self._executor.shutdown(wait=False)
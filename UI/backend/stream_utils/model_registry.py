@@ -0,0 +1,497 @@
+import gc
+import os
+import sys
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from .detection import Detection
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ModelState:
+    def __init__(self, name: str, path: str, imgsz: int = 0, version: int = 1):
+        """
+        Load state and timings of one version of a model
+
+        Args:
+            name: Registry name (e.g. "weapon")
+            path: Path of the weights file
+            imgsz: Inference size used for warm-up, 0 to use the size the model was trained at
+            version: Version number within this registry, counting up from 1
+        """
+        self.name = name
+        self.path = path
+        self.imgsz = imgsz
+        self.version = version
+        self.sha256: Optional[str] = None
+        self.status = "pending"  # pending -> loading -> ready | failed, ready -> retired
+        self.model = None
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+        self.loaded = threading.Event()
+        # YOLO predictors keep per-call state and are not safe to share across
+        # threads. The live stream has the loaded instance to itself, other
+        # users get their own instance of the same weights per lane.
+        self.lane_models: Dict[str, Any] = {}
+        self._lane_locks: Dict[Optional[str], threading.Lock] = {None: threading.Lock()}
+        self._lock = threading.Lock()
+        self.inference_count = 0
+        self.inference_seconds = 0.0
+        self.refs = 0  # Frames currently running on this version
+        self.retiring = False  # Replaced, freed once refs drops to 0
+
+    def record_inference(self, seconds: float):
+        with self._lock:
+            self.inference_count += 1
+            self.inference_seconds += seconds
+
+    def instance(self, lane: Optional[str] = None) -> Tuple[Any, threading.Lock]:
+        """
+        Get the model instance of a lane and the lock its calls take
+
+        Args:
+            lane: None for the loaded instance (the live stream), any other
+                name for a separate instance, loaded from the same weights on first use
+        """
+        if lane is None:
+            return self.model, self._lane_locks[None]
+        with self._lock:
+            lock = self._lane_locks.setdefault(lane, threading.Lock())
+        with lock:
+            if lane not in self.lane_models:
+                from ultralytics import YOLO
+                self.lane_models[lane] = YOLO(self.path)
+                logger.info(f"Loaded {self.name} model v{self.version} for {lane}")
+        return self.lane_models[lane], lock
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "sha256": self.sha256,
+            "status": self.status,
+            "imgsz": self.imgsz,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "loaded_at": self.loaded_at,
+            "inference_count": self.inference_count,
+            "avg_inference_ms": round(1000 * self.inference_seconds / self.inference_count, 2) if self.inference_count else None,
+            "error": self.error,
+        }
+
+class ShadowStats:
+    def __init__(self):
+        """
+        Comparison of a candidate against the active version on the same frames
+
+        Latencies only count the compared model's own calls, not the rest of
+        the pipeline or time spent waiting for a model.
+        """
+        self.frames = 0
+        self.matching_frames = 0  # Frames where both found the same classes
+        self.active_seconds = 0.0
+        self.candidate_seconds = 0.0
+        self.active_detections = 0
+        self.candidate_detections = 0
+
+    def record(self, active_seconds: float, candidate_seconds: float,
+               active_detections: List[Detection], candidate_detections: List[Detection]):
+        self.frames += 1
+        self.active_seconds += active_seconds
+        self.candidate_seconds += candidate_seconds
+        self.active_detections += len(active_detections)
+        self.candidate_detections += len(candidate_detections)
+        if sorted(d.class_name for d in active_detections) == sorted(d.class_name for d in candidate_detections):
+            self.matching_frames += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        frames = self.frames or 1
+        return {
+            "frames": self.frames,
+            "agreement": round(self.matching_frames / frames, 4) if self.frames else None,
+            "active_model_ms": round(1000 * self.active_seconds / frames, 2) if self.frames else None,
+            "candidate_model_ms": round(1000 * self.candidate_seconds / frames, 2) if self.frames else None,
+            "active_detections": self.active_detections,
+            "candidate_detections": self.candidate_detections,
+        }
+
+class TimedModel:
+    def __init__(self, state: ModelState, lane: Optional[str] = None):
+        """
+        A specific loaded version of a model that records its inference times
+
+        Args:
+            state: The version to run
+            lane: Instance to run on, see ModelState.instance()
+        """
+        self._state = state
+        self._lane = lane
+        self.seconds = 0.0  # Time spent in this model's calls, without waiting for its lock
+
+    @property
+    def version(self) -> int:
+        return self._state.version
+
+    def __call__(self, *args, **kwargs):
+        model, lock = self._state.instance(self._lane)
+        with lock:
+            start = time.perf_counter()
+            try:
+                return model(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                self.seconds += seconds
+                self._state.record_inference(seconds)
+
+    def __getattr__(self, attr):
+        return getattr(self._state.model, attr)
+
+class LazyModel:
+    def __init__(self, registry: "ModelRegistry", name: str):
+        """
+        Stand-in for the active version of a model, which may still be loading
+        or be swapped at any time. Calls and attribute access wait for the
+        real model.
+        """
+        self._registry = registry
+        self._name = name
+
+    def __call__(self, *args, **kwargs):
+        with self._registry.acquire([self._name]) as models:
+            return models[self._name](*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self._registry.get(self._name), attr)
+
+class ModelRegistry:
+    def __init__(self, specs: Dict[str, Tuple[str, int]], warmup: bool = True, shadow_rate: float = 0.0):
+        """
+        Load several YOLO models in parallel in the background, and swap any
+        of them for a new version while they are in use
+
+        Args:
+            specs: Model name -> (weights path, warm-up inference size)
+            warmup: Run a dummy inference after loading so the first real
+                frame does not pay for lazy initialization
+            shadow_rate: Default fraction of live frames also run on a
+                candidate version for comparison
+        """
+        self.warmup = warmup
+        self.shadow_rate = shadow_rate
+        self._states = {name: ModelState(name, path, imgsz) for name, (path, imgsz) in specs.items()}
+        self._candidates: Dict[str, ModelState] = {}
+        self._shadow: Dict[str, ShadowStats] = {}
+        self._shadow_rates: Dict[str, float] = {}
+        self._shadow_busy = False
+        self._versions = {name: 1 for name in specs}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self):
+        """
+        Start loading every model, returns immediately. Safe to call more than once.
+        """
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=len(self._states), thread_name_prefix="model-load")
+            for name, state in self._states.items():
+                self._futures[name] = self._executor.submit(self._load, state)
+
+    def _load(self, state: ModelState):
+        state.status = "loading"
+        try:
+            # Imported here so the API can come up before torch is loaded
+            from ultralytics import YOLO
+            start = time.perf_counter()
+            model = YOLO(state.path)
+            state.load_seconds = round(time.perf_counter() - start, 3)
+            # Hashed after loading since ultralytics may download the weights
+            if os.path.isfile(state.path):
+                state.sha256 = _file_sha256(state.path)
+
+            if self.warmup:
+                if not state.imgsz:
+                    state.imgsz = int(model.overrides.get("imgsz") or 640)
+                start = time.perf_counter()
+                model(np.zeros((state.imgsz, state.imgsz, 3), dtype=np.uint8), imgsz=state.imgsz, verbose=False)
+                state.warmup_seconds = round(time.perf_counter() - start, 3)
+
+            if state.retiring:
+                # Replaced or discarded while loading
+                state.status = "retired"
+                return
+
+            state.model = model
+            state.loaded_at = time.time()
+            state.status = "ready"
+            logger.info(f"Loaded {state.name} model v{state.version} from {state.path} in {state.load_seconds}s "
+                        f"(warm-up {state.warmup_seconds}s)")
+        except Exception as e:
+            state.status = "failed"
+            state.error = str(e)
+            logger.error(f"Failed to load {state.name} model v{state.version} from {state.path}: {e}")
+        finally:
+            state.loaded.set()
+
+    def get(self, name: str, timeout: Optional[float] = None):
+        """
+        Get the active version of a model, waiting for it if needed
+
+        Raises:
+            RuntimeError: If the model failed to load or did not load in time
+        """
+        self.start()
+        state = self._states[name]
+        if not state.loaded.wait(timeout):
+            raise RuntimeError(f"Timed out waiting for the {name} model to load")
+        if state.model is None:
+            raise RuntimeError(f"The {name} model failed to load: {state.error}")
+        return state.model
+
+    def proxy(self, name: str) -> LazyModel:
+        """
+        Get a stand-in for the active version of a model, usable before it
+        has loaded and across promotions
+
+        Raises:
+            KeyError: If there is no model of that name
+        """
+        if name not in self._states:
+            raise KeyError(name)
+        return LazyModel(self, name)
+
+    @contextmanager
+    def acquire(self, names: Optional[List[str]] = None, candidate: Optional[str] = None, lane: Optional[str] = None):
+        """
+        Pin the current versions of the models for the duration of one frame
+
+        A promotion during the frame only takes effect for the next one, and
+        the version being replaced is kept in memory until released here.
+
+        Args:
+            names: Models to pin, all by default
+            candidate: Use the candidate version of this model instead of the active one
+            lane: Run the active versions on separate instances of this lane
+                instead of the live stream's (see ModelState.instance()), so
+                work off the hot path never waits on or delays live frames
+
+        Yields:
+            Dictionary of model name -> callable model
+        """
+        names = names if names is not None else list(self._states)
+        for name in names:
+            self.get(name)
+        with self._lock:
+            states = [self._states[name] for name in names]
+            candidate_state = None
+            if candidate is not None:
+                candidate_state = self._candidates.get(candidate)
+                if candidate_state is None or candidate_state.status != "ready":
+                    raise RuntimeError(f"No ready candidate for the {candidate} model")
+                states[names.index(candidate)] = candidate_state
+            for state in states:
+                state.refs += 1
+        try:
+            # A candidate only runs in shadow runs, its loaded instance is free
+            yield {state.name: TimedModel(state, None if state is candidate_state else lane) for state in states}
+        finally:
+            with self._lock:
+                freed = []
+                for state in states:
+                    state.refs -= 1
+                    if state.retiring and state.refs == 0:
+                        freed.append(state)
+            for state in freed:
+                self._free(state)
+
+    def _free(self, state: ModelState):
+        """
+        Drop a replaced version and give its memory back
+        """
+        state.model = None
+        state.lane_models.clear()
+        state.status = "retired"
+        gc.collect()
+        # Only touch torch if it was already imported by the models
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        logger.info(f"Freed {state.name} model v{state.version}")
+
+    def _retire(self, state: ModelState):
+        with self._lock:
+            state.retiring = True
+            free_now = state.refs == 0
+        if free_now:
+            self._free(state)
+
+    def load_candidate(self, name: str, path: str, imgsz: int = 0, shadow_rate: Optional[float] = None) -> ModelState:
+        """
+        Load and warm up a new version of a model next to the active one
+
+        Replaces any previous candidate. Returns immediately, the candidate is
+        ready for promotion once its status is "ready".
+
+        Args:
+            name: The model to replace
+            path: Path of the new weights file
+            imgsz: Warm-up inference size, 0 to use the size the model was trained at
+            shadow_rate: Fraction of live frames to also run on the candidate,
+                defaults to the registry's shadow_rate
+
+        Returns:
+            The candidate's state
+        """
+        if name not in self._states:
+            raise KeyError(name)
+        self.start()
+        with self._lock:
+            self._versions[name] += 1
+            state = ModelState(name, path, imgsz, version=self._versions[name])
+            previous = self._candidates.get(name)
+            self._candidates[name] = state
+            self._shadow[name] = ShadowStats()
+            self._shadow_rates[name] = self.shadow_rate if shadow_rate is None else shadow_rate
+        if previous is not None:
+            self._retire(previous)
+        self._executor.submit(self._load, state)
+        return state
+
+    def promote(self, name: str) -> ModelState:
+        """
+        Make the candidate the active version of a model
+
+        Frames already running finish on the old version, which is freed
+        once the last of them is done.
+
+        Raises:
+            RuntimeError: If there is no ready candidate
+        """
+        with self._lock:
+            candidate = self._candidates.get(name)
+            if candidate is None or candidate.status != "ready":
+                raise RuntimeError(f"No ready candidate for the {name} model")
+            previous = self._states[name]
+            self._states[name] = candidate
+            del self._candidates[name]
+            self._shadow.pop(name, None)
+            self._shadow_rates.pop(name, None)
+        logger.info(f"Promoted {name} model v{candidate.version} (was v{previous.version})")
+        self._retire(previous)
+        return candidate
+
+    def discard_candidate(self, name: str) -> bool:
+        """
+        Drop the candidate of a model
+
+        Returns:
+            False if there was no candidate
+        """
+        with self._lock:
+            candidate = self._candidates.pop(name, None)
+            self._shadow.pop(name, None)
+            self._shadow_rates.pop(name, None)
+        if candidate is None:
+            return False
+        self._retire(candidate)
+        return True
+
+    def shadow_candidate(self) -> Optional[str]:
+        """
+        Decide whether the current frame should also be run on a candidate
+
+        At most one shadow run is in flight at a time so comparisons never
+        queue up behind the live stream.
+
+        Returns:
+            The name of the model whose candidate to run, or None
+        """
+        if self._shadow_busy:
+            return None
+        with self._lock:
+            ready = [name for name, state in self._candidates.items()
+                     if state.status == "ready" and random.random() < self._shadow_rates.get(name, 0.0)]
+            if not ready:
+                return None
+            self._shadow_busy = True
+            return ready[0]
+
+    def skip_shadow(self):
+        """
+        Give up the shadow run granted by shadow_candidate() without running it
+        """
+        self._shadow_busy = False
+
+    def run_shadow(self, name: str, run: Callable[[Dict[str, Any]], List[Detection]],
+                   active_detections: List[Detection], active_seconds: float):
+        """
+        Run a frame on the candidate of a model and compare with the active result
+
+        Args:
+            name: The model returned by shadow_candidate()
+            run: Runs the detection pipeline with the given models, returns its detections
+            active_detections: What the active versions found on the same frame
+            active_seconds: Time spent in the active version of this model's
+                calls on the frame
+        """
+        try:
+            # The other models run on the background lane, not the live stream's instances
+            with self.acquire(candidate=name, lane="background") as models:
+                detections = run(models)
+                candidate_seconds = models[name].seconds
+            with self._lock:
+                stats = self._shadow.get(name)
+                if stats is not None:
+                    stats.record(active_seconds, candidate_seconds, active_detections, detections)
+        except Exception as e:
+            logger.warning(f"Shadow run of the {name} candidate failed: {e}")
+        finally:
+            self._shadow_busy = False
+
+    def is_ready(self, name: Optional[str] = None) -> bool:
+        """
+        Check whether one model (or every model if name is None) is loaded
+        """
+        names = [name] if name is not None else list(self._states)
+        return all(self._states[n].status == "ready" for n in names)
+
+    async def wait_ready(self):
+        """
+        Wait until every model has finished loading (or failed)
+        """
+        self.start()
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in self._futures.values()))
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Active version, candidate and shadow comparison of every model
+        """
+        with self._lock:
+            return {
+                name: {
+                    "active": state.to_dict(),
+                    "candidate": self._candidates[name].to_dict() if name in self._candidates else None,
+                    "shadow_rate": self._shadow_rates.get(name),
+                    "shadow": self._shadow[name].to_dict() if name in self._shadow else None,
+                }
+                for name, state in self._states.items()
+            }
@@ -1,13 +1,14 @@
 import asyncio
 import time
 import json
-import aiohttp
 import base64
+import traceback
 import cv2
 import numpy as np
-from typing import Dict, List, Any, Optional, Tuple
+from typing import List, Optional, Tuple
 from datetime import datetime
 from config.settings import TOKEN
+from stream_utils.detection import Detection
 class NotificationManager:
     def __init__(self, api_endpoint: str):
         """
@@ -31,7 +32,7 @@ class NotificationManager:
         self.last_detection_count = 0
         self.last_detection_confidence = 0.0
         
-    async def process_detection(self, frame: np.ndarray, detections: List[Dict[str, Any]]) -> bool:
+    async def process_detection(self, frame: np.ndarray, detections: List[Detection]) -> bool:
         """
         Process a detection and determine if a notification should be sent
         
@@ -48,7 +49,7 @@ class NotificationManager:
         # Filter detections to only include weapons with confidence above threshold
         weapon_detections = [
             d for d in detections 
-            if d["confidence"] >= self.confidence_threshold
+            if d.confidence >= self.confidence_threshold
         ]
         
         if not weapon_detections:
@@ -57,11 +58,11 @@ class NotificationManager:
             return False
         
         # Get the highest confidence detection
-        highest_conf_detection = max(weapon_detections, key=lambda x: x["confidence"])
-        highest_conf = highest_conf_detection["confidence"]
+        highest_conf_detection = max(weapon_detections, key=lambda x: x.confidence)
+        highest_conf = highest_conf_detection.confidence
         
         # Count unique weapon types
-        weapon_types = set(d["class_name"] for d in weapon_detections)
+        weapon_types = set(d.class_name for d in weapon_detections)
         weapon_count = len(weapon_types)
         
         print(highest_conf_detection)
@@ -147,7 +148,7 @@ class NotificationManager:
             return True
         
         # Get the highest confidence from the best detections
-        best_conf = max(d["confidence"] for d in self.best_detections) if self.best_detections else 0
+        best_conf = max(d.confidence for d in self.best_detections) if self.best_detections else 0
         
         # If confidence is higher, this is better
         if confidence > best_conf:
@@ -182,6 +183,9 @@ class NotificationManager:
                 'Authorization': 'Bearer '+ TOKEN
             }
 
+            # Imported here to keep server startup fast
+            import aiohttp
+            
             # Prepare the form data
             form_data = aiohttp.FormData()
             
@@ -200,11 +204,11 @@ class NotificationManager:
             # Add detection events
             if self.best_detections:
                 for i, detection in enumerate(self.best_detections):
-                    print(detection["confidence"], detection["class_name"])
+                    print(detection.confidence, detection.class_name)
                     i = str(i)
-                    form_data.add_field(f'detectionEvent[{i}][confidence]', str(detection["confidence"]))
-                    if (detection["class_name"] in ["gun", "knife"]): 
-                        form_data.add_field(f'detectionEvent[{i}][classification]', detection["class_name"])
+                    form_data.add_field(f'detectionEvent[{i}][confidence]', str(detection.confidence))
+                    if (detection.class_name in ["gun", "knife"]): 
+                        form_data.add_field(f'detectionEvent[{i}][classification]', detection.class_name)
         
             # TODO: Test send notification - delete when done
             else: 
@@ -228,9 +232,9 @@ class NotificationManager:
                         
                         # Update state after successful notification
                         self.last_notification_time = time.time()
-                        self.last_detection_category = self.best_detections[0]["class_name"] if self.best_detections else None
+                        self.last_detection_category = self.best_detections[0].class_name if self.best_detections else None
                         self.last_detection_count = len(self.best_detections)
-                        self.last_detection_confidence = max(d["confidence"] for d in self.best_detections) if self.best_detections else 0
+                        self.last_detection_confidence = max(d.confidence for d in self.best_detections) if self.best_detections else 0
                         
                         # Clear the best image
                         self.best_image = None
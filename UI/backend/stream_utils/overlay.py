@@ -0,0 +1,111 @@
+import zlib
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import cv2
+import numpy as np
+from .detection import Detection
+
+Color = Tuple[int, int, int]  # BGR
+
+# Fixed colors of the person classification boxes
+PERSON_COLORS: Dict[str, Color] = {"civilian": (0, 255, 0), "police": (255, 0, 0)}
+
+@lru_cache(maxsize=256)
+def class_color(class_name: str) -> Color:
+    """
+    Deterministic color for a class, stable across processes and restarts
+
+    Unlike hash(), crc32 is not randomized per process. Channels stay in
+    64..255 so boxes remain visible on the dimmed background.
+    """
+    digest = zlib.crc32(class_name.encode())
+    return tuple(64 + ((digest >> shift) & 0xFF) % 192 for shift in (0, 8, 16))
+
+@lru_cache(maxsize=4096)
+def _text_size(label: str, font_scale: float, thickness: int) -> Tuple[int, int]:
+    (width, height), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+    return width, height
+
+class OverlayRenderer:
+    def __init__(self, dim: int = 75, thickness: int = 2, font_scale: float = 0.5):
+        """
+        Draw detection results onto a frame, independently of running detection
+
+        Everything outside the person regions is dimmed with one mask
+        composite, then all boxes are drawn grouped by color and all labels
+        in a single pass.
+
+        Args:
+            dim: How much to darken the frame outside person regions (0-255)
+            thickness: Box and label stroke thickness
+            font_scale: Label font scale
+        """
+        self.dim = dim
+        self.thickness = thickness
+        self.font_scale = font_scale
+
+    def _label_origin(self, label: str, x1: int, y1: int) -> Tuple[int, int]:
+        # Above the box, or just inside it when there is no room above
+        _, height = _text_size(label, self.font_scale, self.thickness)
+        y = y1 - 4
+        if y - height < 0:
+            y = y1 + height + 4
+        return x1, y
+
+    def render(
+        self,
+        frame: np.ndarray,
+        people: Iterable[Detection] = (),
+        detections: Iterable[Detection] = (),
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Build the annotated frame
+
+        Args:
+            frame: The original frame, left untouched unless passed as out
+            people: Person regions, labelled "civilian" or "police", kept at
+                full brightness and boxed in their fixed color
+            detections: Weapon detections, boxed in their class color
+            out: Optional buffer of the same shape to draw into
+
+        Returns:
+            The annotated frame
+        """
+        people = list(people)
+        detections = list(detections)
+        if out is None:
+            out = np.empty_like(frame)
+
+        # Spotlight: dim the whole frame, then copy the person regions back through one mask
+        cv2.subtract(frame, (self.dim, self.dim, self.dim, 0), dst=out)
+        if people:
+            mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+            for p in people:
+                mask[int(p.y1):int(p.y2), int(p.x1):int(p.x2)] = 1
+            cv2.copyTo(frame, mask, out)
+
+        # Boxes: one polylines call per color
+        boxes: Dict[Color, List[np.ndarray]] = defaultdict(list)
+        labels: List[Tuple[str, int, int, Color]] = []
+        for d in detections:
+            color = class_color(d.class_name)
+            boxes[color].append(self._corners(d))
+            labels.append((f"{d.class_name}:{d.confidence:.2f}", int(d.x1), int(d.y1), color))
+        for p in people:
+            color = PERSON_COLORS.get(p.class_name) or class_color(p.class_name)
+            boxes[color].append(self._corners(p))
+            labels.append((f"{p.class_name}:{p.confidence:.2f}", int(p.x1), int(p.y1), color))
+        for color, corners in boxes.items():
+            cv2.polylines(out, corners, True, color, self.thickness)
+
+        for label, x1, y1, color in labels:
+            cv2.putText(out, label, self._label_origin(label, x1, y1), cv2.FONT_HERSHEY_SIMPLEX,
+                        self.font_scale, color, self.thickness)
+        return out
+
+    @staticmethod
+    def _corners(d: Detection) -> np.ndarray:
+        x1, y1, x2, y2 = int(d.x1), int(d.y1), int(d.x2), int(d.y2)
+        return np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.int32)
@@ -0,0 +1,208 @@
+import os
+import io
+import asyncio
+import logging
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Union
+from config.settings import (
+    S3_BUCKET_NAME, S3_REGION, S3_ENDPOINT_URL, S3_UPLOAD_WORKERS,
+    S3_MAX_PENDING_UPLOADS, S3_MULTIPART_THRESHOLD, S3_SPOOL_DIR
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class S3Uploader:
+    def __init__(
+        self,
+        bucket: str = S3_BUCKET_NAME,
+        region: str = S3_REGION,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL or None,
+        max_workers: int = S3_UPLOAD_WORKERS,
+        max_pending: int = S3_MAX_PENDING_UPLOADS,
+        multipart_threshold: int = S3_MULTIPART_THRESHOLD,
+        spool_dir: str = S3_SPOOL_DIR,
+    ):
+        """
+        Upload service that shares a single S3 client across a bounded thread pool
+
+        Args:
+            bucket: The S3 bucket to upload to
+            region: The AWS region of the bucket
+            endpoint_url: Optional custom endpoint (e.g. a local S3 stand-in)
+            max_workers: Number of upload threads
+            max_pending: Maximum number of queued plus running uploads before
+                new uploads go straight to the spool
+            multipart_threshold: Size in bytes above which multipart upload is used
+            spool_dir: Local directory where failed uploads are kept for retry
+        """
+        self.bucket = bucket
+        self.region = region
+        self.endpoint_url = endpoint_url
+        self.spool_dir = spool_dir
+        self.multipart_threshold = multipart_threshold
+        self.transfer_config = None
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-upload")
+
+    @property
+    def client(self):
+        """
+        The shared boto3 client, created on first use (boto3 clients are thread-safe)
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    # Imported here so boto3 only loads when S3 is actually used
+                    import boto3
+                    from boto3.s3.transfer import TransferConfig
+                    self.transfer_config = TransferConfig(
+                        multipart_threshold=self.multipart_threshold,
+                        multipart_chunksize=self.multipart_threshold,
+                        use_threads=False,  # Concurrency comes from our own pool
+                    )
+                    self._client = boto3.client(
+                        's3', region_name=self.region, endpoint_url=self.endpoint_url
+                    )
+        return self._client
+
+    def url_for(self, key: str) -> str:
+        """
+        Build the public URL of an object key
+        """
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket}/{key}"
+        return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{key}"
+
+    def upload_bytes(self, data: Union[bytes, memoryview], key: str, content_type: Optional[str] = None) -> str:
+        """
+        Upload an in-memory buffer synchronously, spooling it locally on failure
+
+        Args:
+            data: The object contents (e.g. the buffer returned by cv2.imencode)
+            key: The S3 object key
+            content_type: Optional content type, guessed from the key if not given
+
+        Returns:
+            The S3 URL of the object
+        """
+        from botocore.exceptions import BotoCoreError, ClientError
+        if not self.bucket:
+            raise ValueError("S3_BUCKET_NAME environment variable is not set")
+
+        extra_args = {"ContentType": content_type or mimetypes.guess_type(key)[0] or "application/octet-stream"}
+        try:
+            self.client.upload_fileobj(
+                io.BytesIO(data), self.bucket, key,
+                ExtraArgs=extra_args, Config=self.transfer_config
+            )
+        except (BotoCoreError, ClientError) as e:
+            logger.error(f"Error uploading {key} to S3, spooling for retry: {e}")
+            self._spool(data, key)
+        return self.url_for(key)
+
+    def submit(self, data: Union[bytes, memoryview], key: str, content_type: Optional[str] = None) -> Future:
+        """
+        Queue an upload on the thread pool without waiting for it
+
+        If too many uploads are already pending, the data is spooled instead of
+        queued so memory stays bounded when S3 is slow or unreachable.
+
+        Returns:
+            A future resolving to the S3 URL of the object
+        """
+        if not self._slots.acquire(blocking=False):
+            logger.warning(f"Upload queue full, spooling {key}")
+            self._spool(data, key)
+            future = Future()
+            future.set_result(self.url_for(key))
+            return future
+
+        # Copy so the caller can safely reuse its buffer
+        data = bytes(data)
+        future = self._executor.submit(self.upload_bytes, data, key, content_type)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def upload(self, data: Union[bytes, memoryview], key: str, content_type: Optional[str] = None) -> str:
+        """
+        Upload from async code without blocking the event loop
+
+        Returns:
+            The S3 URL of the object
+        """
+        return await asyncio.wrap_future(self.submit(data, key, content_type))
+
+    def _spool(self, data: Union[bytes, memoryview], key: str):
+        """
+        Keep a failed upload on local disk under its object key
+        """
+        path = os.path.join(self.spool_dir, *key.split("/"))
+        try:
+            with self._spool_lock:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + ".part"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error spooling {key}: {e}")
+
+    def retry_spooled(self) -> int:
+        """
+        Try to upload every spooled file, removing the ones that succeed
+
+        Returns:
+            Number of files uploaded
+        """
+        from botocore.exceptions import BotoCoreError, ClientError
+        if not os.path.isdir(self.spool_dir):
+            return 0
+
+        uploaded = 0
+        for dirpath, _, filenames in os.walk(self.spool_dir):
+            for name in filenames:
+                if name.endswith(".part"):
+                    continue
+                path = os.path.join(dirpath, name)
+                key = os.path.relpath(path, self.spool_dir).replace(os.sep, "/")
+                try:
+                    with open(path, "rb") as f:
+                        self.client.upload_fileobj(
+                            f, self.bucket, key,
+                            ExtraArgs={"ContentType": mimetypes.guess_type(key)[0] or "application/octet-stream"},
+                            Config=self.transfer_config
+                        )
+                except (BotoCoreError, ClientError, OSError) as e:
+                    logger.warning(f"Spooled upload of {key} failed again: {e}")
+                    # S3 is most likely still unreachable, try again next round
+                    return uploaded
+                os.remove(path)
+                uploaded += 1
+
+        if uploaded:
+            logger.info(f"Uploaded {uploaded} spooled file(s) to S3")
+        return uploaded
+
+    async def run_spool_retry(self, interval: float):
+        """
+        Periodically retry spooled uploads in the background
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(self._executor, self.retry_spooled)
+            except Exception as e:
+                logger.error(f"Error retrying spooled uploads: {e}")
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop accepting uploads and optionally wait for pending ones
+        """
+        self._executor.shutdown(wait=wait)
@@ -1,112 +1,184 @@
-import os
 import cv2
 import time
 import asyncio
 import numpy as np
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple, Union
-import boto3
-from botocore.exceptions import ClientError
-from dotenv import load_dotenv
 import logging
 from .stream_manager import StreamManager
+from .s3_uploader import S3Uploader
+from .evidence_store import EvidenceStore
+from .detection import Detection
+from .overlay import class_color
+from config.settings import SAVE_MODE
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# Shared uploader so every save reuses the same S3 client and thread pool
+_s3_uploader: Optional[S3Uploader] = None
+_evidence_store: Optional[EvidenceStore] = None
 
-# S3 configuration
-S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "")
-S3_REGION = os.getenv("S3_REGION", "us-east-1")
-SAVE_MODE = os.getenv("SAVE_MODE", "local")  # "local" or "s3"
-LOCAL_SAVE_DIR = os.getenv("LOCAL_SAVE_DIR", "saved_images")
+def get_s3_uploader() -> S3Uploader:
+    """
+    Get the shared S3 uploader, creating it on first use
+    """
+    global _s3_uploader
+    if _s3_uploader is None:
+        _s3_uploader = S3Uploader()
+    return _s3_uploader
+
+def get_evidence_store() -> EvidenceStore:
+    """
+    Get the shared local evidence store, creating it on first use
+    """
+    global _evidence_store
+    if _evidence_store is None:
+        _evidence_store = EvidenceStore()
+    return _evidence_store
+
+def _default_filename() -> str:
+    """
+    Generate a detection filename that does not collide within the same second
+    """
+    return f"detection_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jpg"
+
+def encode_image(image: np.ndarray) -> np.ndarray:
+    """
+    Encode an image as JPEG in memory
+    
+    Args:
+        image: The image to encode
+        
+    Returns:
+        The encoded JPEG buffer
+    """
+    flag, buffer = cv2.imencode(".jpg", image)
+    if not flag:
+        raise ValueError("Failed to encode image as JPEG")
+    return buffer
 
-# Ensure local save directory exists
-if SAVE_MODE == "local" and not os.path.exists(LOCAL_SAVE_DIR):
-    os.makedirs(LOCAL_SAVE_DIR)
+def _s3_key(filename: str) -> str:
+    """
+    Create S3 key with hierarchical path structure (detections/YYYY/MM/DD/filename)
+    """
+    now = datetime.now()
+    return f"detections/{now.strftime('%Y')}/{now.strftime('%m')}/{now.strftime('%d')}/{filename}"
 
-def save_image_local(image: np.ndarray, filename: str) -> str:
+def save_image_local(image: np.ndarray, detections: Optional[List[Detection]] = None, camera_id: int = 1) -> str:
     """
-    Save image to local filesystem
+    Save image to the local evidence store
     
     Args:
         image: The image to save
-        filename: The filename to save as
+        detections: Detections shown in the image, used for the index
+        camera_id: The camera the image came from
         
     Returns:
         The path where the image was saved
     """
-    filepath = os.path.join(LOCAL_SAVE_DIR, filename)
-    cv2.imwrite(filepath, image)
-    return filepath
+    return get_evidence_store().add(encode_image(image), detections, camera_id)
 
 def save_image_s3(image: np.ndarray, filename: str) -> str:
     """
-    Save image to S3 bucket with hierarchical path structure
+    Queue an image for upload to S3 with hierarchical path structure
+    
+    The image is encoded in memory and uploaded in the background; uploads
+    that fail are spooled locally and retried later.
     
     Args:
         image: The image to save
         filename: The filename to save as
         
     Returns:
-        The S3 URL where the image was saved
+        The S3 URL where the image will be saved
     """
-    if not S3_BUCKET_NAME:
-        raise ValueError("S3_BUCKET_NAME environment variable is not set")
-    
-    # Initialize S3 client
-    s3_client = boto3.client('s3', region_name=S3_REGION)
-    
-    # Create hierarchical path structure for S3
-    now = datetime.now()
-    year = now.strftime("%Y")
-    month = now.strftime("%m")
-    day = now.strftime("%d")
-    
-    # Create S3 key with hierarchical path
-    s3_key = f"detections/{year}/{month}/{day}/{filename}"
-    
-    # Save image to temporary file
-    temp_filepath = f"/tmp/{filename}"
-    cv2.imwrite(temp_filepath, image)
+    uploader = get_s3_uploader()
+    s3_key = _s3_key(filename)
+    future = uploader.submit(encode_image(image), s3_key, content_type="image/jpeg")
+    future.add_done_callback(lambda f: _log_upload_error(f, s3_key))
+    return uploader.url_for(s3_key)
+
+def _log_upload_error(future, s3_key: str) -> None:
+    """
+    Log an upload that failed outright, e.g. because no bucket is configured
+    """
+    if future.cancelled():
+        logger.warning(f"S3 upload of {s3_key} was cancelled")
+    elif future.exception() is not None:
+        logger.error(f"S3 upload of {s3_key} failed: {future.exception()}")
+
+def save_image(
+    image: np.ndarray,
+    filename: Optional[str] = None,
+    detections: Optional[List[Detection]] = None,
+    camera_id: int = 1,
+) -> str:
+    """
+    Save image based on configured mode (local or S3)
     
-    # Upload to S3
-    try:
-        s3_client.upload_file(temp_filepath, S3_BUCKET_NAME, s3_key)
-        s3_url = f"https://{S3_BUCKET_NAME}.s3.{S3_REGION}.amazonaws.com/{s3_key}"
-        
-        # Clean up temporary file
-        os.remove(temp_filepath)
+    Args:
+        image: The image to save
+        filename: Optional S3 filename, will generate one if not provided
+            (the local store always names files itself)
+        detections: Detections shown in the image
+        camera_id: The camera the image came from
         
-        return s3_url
-    except ClientError as e:
-        logger.error(f"Error uploading to S3: {e}")
-        # If S3 upload fails, fall back to local save
-        return save_image_local(image, filename)
+    Returns:
+        The path or URL where the image was saved
+    """
+    if SAVE_MODE == "s3":
+        return save_image_s3(image, filename or _default_filename())
+    else:
+        return save_image_local(image, detections, camera_id)
 
-def save_image(image: np.ndarray, filename: Optional[str] = None) -> str:
+async def save_image_async(
+    image: np.ndarray,
+    filename: Optional[str] = None,
+    detections: Optional[List[Detection]] = None,
+    camera_id: int = 1,
+) -> str:
     """
-    Save image based on configured mode (local or S3)
+    Save image based on configured mode without blocking the event loop
     
     Args:
         image: The image to save
-        filename: Optional filename, will generate one if not provided
+        filename: Optional S3 filename, will generate one if not provided
+        detections: Detections shown in the image
+        camera_id: The camera the image came from
         
     Returns:
         The path or URL where the image was saved
     """
-    if filename is None:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"detection_{timestamp}.jpg"
+    loop = asyncio.get_running_loop()
+    buffer = await loop.run_in_executor(None, encode_image, image)
+    return await save_jpeg_async(buffer, filename, detections, camera_id)
+
+async def save_jpeg_async(
+    data: Union[bytes, np.ndarray],
+    filename: Optional[str] = None,
+    detections: Optional[List[Detection]] = None,
+    camera_id: int = 1,
+) -> str:
+    """
+    Save an already encoded JPEG based on configured mode without blocking the event loop
     
+    Args:
+        data: The encoded JPEG
+        filename: Optional S3 filename, will generate one if not provided
+        detections: Detections shown in the image
+        camera_id: The camera the image came from
+        
+    Returns:
+        The path or URL where the image was saved
+    """
     if SAVE_MODE == "s3":
-        return save_image_s3(image, filename)
+        return await get_s3_uploader().upload(data, _s3_key(filename or _default_filename()), content_type="image/jpeg")
     else:
-        return save_image_local(image, filename)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, get_evidence_store().add, data, detections, camera_id)
 
-def get_detections(frame: np.ndarray, model: Any) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+def get_detections(frame: np.ndarray, model: Any) -> Tuple[np.ndarray, List[Detection]]:
     """
     Run YOLO detection on a frame and return the annotated frame and detections
     
@@ -141,8 +213,8 @@ def get_detections(frame: np.ndarray, model: Any) -> Tuple[np.ndarray, List[Dict
             class_name = result.names[class_id]
             conf = float(box.conf[0])
             
-            # Generate color for class
-            color = (hash(class_name) % 256, hash(class_name * 2) % 256, hash(class_name * 3) % 256)
+            # Same color for the class as in the stream overlay
+            color = class_color(class_name)
             
             # Draw bounding box
             cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
@@ -152,14 +224,7 @@ def get_detections(frame: np.ndarray, model: Any) -> Tuple[np.ndarray, List[Dict
             cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
             
             # Add to detection list
-            detection_list.append({
-                "class_name": class_name,
-                "confidence": conf,
-                "x1": x1,
-                "y1": y1,
-                "x2": x2,
-                "y2": y2
-            })
+            detection_list.append(Detection(class_name, conf, x1, y1, x2, y2))
     
     return frame, detection_list
 
@@ -179,8 +244,10 @@ async def process_rtsp_frame(url_rtsp: str, model: Any, interval: int = 10, stre
     try:
         # If stream_manager is provided, use its latest processed frame
         if stream_manager is not None:
-            frame, detections = await stream_manager.get_latest_processed_frame()
-            if frame is None:
+            # Reuse the JPEG the stream already encoded for this frame
+            loop = asyncio.get_running_loop()
+            _, jpeg, detections = await loop.run_in_executor(None, stream_manager.snapshot_cache.get, "annotated", "full")
+            if jpeg is None:
                 logger.error("No processed frame available from stream manager")
                 return {
                     "error": "No processed frame available",
@@ -188,17 +255,10 @@ async def process_rtsp_frame(url_rtsp: str, model: Any, interval: int = 10, stre
                 }
             
             # Save the annotated image
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"detection_{timestamp}.jpg"
-            image_path = save_image(frame, filename)
+            image_path = await save_jpeg_async(jpeg, detections=detections)
             
             # Format detections for API response
-            formatted_detections = []
-            for detection in detections:
-                formatted_detections.append({
-                    "confidence": detection["confidence"],
-                    "classification": detection["class_name"]
-                })
+            formatted_detections = [detection.to_event() for detection in detections]
             
             # Prepare API response
             response = {
@@ -253,17 +313,10 @@ async def process_rtsp_frame(url_rtsp: str, model: Any, interval: int = 10, stre
                 }
             
             # Save the annotated image
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"detection_{timestamp}.jpg"
-            image_path = save_image(annotated_frame, filename)
+            image_path = await save_image_async(annotated_frame, detections=detections)
             
             # Format detections for API response
-            formatted_detections = []
-            for detection in detections:
-                formatted_detections.append({
-                    "confidence": detection["confidence"],
-                    "classification": detection["class_name"]
-                })
+            formatted_detections = [detection.to_event() for detection in detections]
             
             # Prepare API response
             response = {
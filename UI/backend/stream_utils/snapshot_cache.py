@@ -0,0 +1,115 @@
+import time
+import threading
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Union
+from .detection import Detection
+
+# Rendition sizes by name, None keeps the original width
+SNAPSHOT_SIZES = {"full": None, "thumb": 320}
+SNAPSHOT_VARIANTS = ("annotated", "raw")
+
+class SnapshotCache:
+    def __init__(self, jpeg_quality: int = 90):
+        """
+        Holds the latest frame and lazily encoded renditions of it
+
+        Each rendition is encoded at most once per frame and only when
+        someone asks for it.
+
+        Args:
+            jpeg_quality: JPEG quality for renditions encoded here
+        """
+        self.jpeg_quality = jpeg_quality
+        self.seq = 0
+        self.timestamp: Optional[float] = None
+        self._frames: Dict[str, Union[np.ndarray, bytes]] = {}
+        self._detections: List[Detection] = []
+        self._renditions: Dict[Tuple[str, str], bytes] = {}
+        self._lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+
+    def update(
+        self,
+        raw: Optional[Union[np.ndarray, bytes]],
+        annotated: Union[np.ndarray, bytes],
+        detections: List[Detection],
+        annotated_jpeg: Optional[bytes] = None,
+        timestamp: Optional[float] = None,
+        seq: Optional[int] = None,
+    ) -> int:
+        """
+        Store a new frame, dropping the renditions of the previous one
+
+        Args:
+            raw: The frame before annotation, or its JPEG, or None if unavailable
+            annotated: The frame with detections drawn, or its JPEG
+            detections: The detections found in the frame
+            annotated_jpeg: The already encoded full-size annotated frame, if available
+            timestamp: Capture time, defaults to now
+            seq: Sequence number assigned by the producer, defaults to the next one
+
+        Returns:
+            The sequence number of the new frame
+        """
+        with self._lock:
+            self.seq = seq if seq is not None else self.seq + 1
+            self.timestamp = timestamp if timestamp is not None else time.time()
+            self._frames = {"raw": raw, "annotated": annotated}
+            self._detections = detections
+            self._renditions = {}
+            if annotated_jpeg is not None:
+                self._renditions[("annotated", "full")] = annotated_jpeg
+            return self.seq
+
+    def add_encoded(self, seq: int, variant: str, jpeg: bytes):
+        """
+        Attach the full-size JPEG of a variant to the current frame, ignored
+        if a newer frame has arrived since
+        """
+        with self._lock:
+            if self.seq == seq:
+                self._frames[variant] = jpeg
+                self._renditions[(variant, "full")] = jpeg
+
+    def get(self, variant: str = "annotated", size: str = "full") -> Tuple[int, Optional[bytes], List[Detection]]:
+        """
+        Get a JPEG rendition of the latest frame
+
+        Args:
+            variant: "annotated" or "raw"
+            size: A key of SNAPSHOT_SIZES
+
+        Returns:
+            Tuple of (sequence number, JPEG bytes, detections) for the same frame,
+            bytes are None if no frame is available
+        """
+        if variant not in SNAPSHOT_VARIANTS or size not in SNAPSHOT_SIZES:
+            raise ValueError(f"Unknown rendition {variant}/{size}")
+
+        # Serialize encoding so concurrent requests never encode the same rendition twice
+        with self._encode_lock:
+            with self._lock:
+                seq = self.seq
+                cached = self._renditions.get((variant, size))
+                frame = self._frames.get(variant)
+                detections = self._detections
+            if cached is not None or frame is None:
+                return seq, cached, detections
+
+            if isinstance(frame, bytes):
+                frame = cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR)
+            width = SNAPSHOT_SIZES[size]
+            if width is not None and frame.shape[1] > width:
+                height = int(frame.shape[0] * width / frame.shape[1])
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            flag, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not flag:
+                return seq, None, detections
+            data = buffer.tobytes()
+
+            with self._lock:
+                # Only cache if no newer frame arrived while encoding
+                if self.seq == seq:
+                    self._renditions[(variant, size)] = data
+        return seq, data, detections
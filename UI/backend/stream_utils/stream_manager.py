@@ -1,12 +1,26 @@
 import asyncio
 import cv2
 import imutils
-from imutils.video import VideoStream
 from stream_utils.yolo_process import process_frame_with_yolo
 import time
 from stream_utils.notification_manager import NotificationManager
+from stream_utils.detection_history import DetectionHistory
+from stream_utils.event_broadcaster import EventBroadcaster
+from stream_utils.snapshot_cache import SnapshotCache
+from stream_utils.temporal_filter import TemporalConfirmationFilter
+from stream_utils.crop_cache import CropResultCache
+from stream_utils.inference_shapes import shape_buckets_from_settings
+from stream_utils.capture import IdleDetector, open_capture
+from stream_utils.model_registry import TimedModel
+from stream_utils.detection import Detection, detections_to_dicts, pack_detections, unpack_detections
 import os
 from dotenv import load_dotenv
+from config.settings import (
+    CONFIRM_FRAMES, CONFIRM_WINDOW_FRAMES, CONFIRM_SMOOTHING,
+    CROP_CACHE_ENABLED, CROP_CACHE_MAX_ENTRIES, CROP_CACHE_MAX_DISTANCE, CROP_CACHE_REFRESH_INTERVAL,
+    WEAPON_SHAPE_MODE, WEAPON_SHAPE_BUCKETS, WEAPON_SHAPE_MIN, WEAPON_SHAPE_MAX,
+    CAPTURE_BACKEND, CAPTURE_IDLE_MODE, CAPTURE_IDLE_EVERY_N, CAPTURE_IDLE_AFTER,
+)
 import logging
 import numpy as np
 from typing import Tuple, List, Dict, Any
@@ -20,86 +34,205 @@ load_dotenv()
 
 # Shared state management
 class StreamManager:
-    def __init__(self, url_rtsp, base_model, police_model, weapon_model):
+    def __init__(self, url_rtsp, base_model, police_model, weapon_model, model_registry=None):
         self.active = False
         self.url_rtsp = url_rtsp
         self.base_model = base_model
         self.police_model = police_model
         self.weapon_model = weapon_model
+        self.model_registry = model_registry  # Models still loading in the background, if any
+        self.first_frame_time = None  # When the first frame was processed
         self.frame_queue = asyncio.Queue(maxsize=1000)
         self.keep_alive_counter = 0
+        self.always_on = False  # Keep running even without viewers
         self.stream_task = None
         self.latest_detections = []
         self.last_detection_time = None
         self.detection_timeout = 2.0  # Seconds to wait before considering a detection as disappeared
-        self.detection_history = []  # List to store detection history
         self.history_timeout = 3600  # 1 hour in seconds
+        self.detection_history = DetectionHistory(window_seconds=self.history_timeout)
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 5
         self.reconnect_delay = 5  # seconds
+        self.frame_width = 680
+        
+        # Decode less while the view is static (backends with set_idle() only)
+        self.idle_detector = IdleDetector(idle_after=CAPTURE_IDLE_AFTER) if CAPTURE_IDLE_AFTER > 0 else None
         
         # Store the latest processed frame and detections
         self.latest_processed_frame = None
         self.latest_processed_detections = []
         self.frame_lock = asyncio.Lock()
         
+        # Latest frame and its encoded renditions for snapshot requests
+        self.snapshot_cache = SnapshotCache()
+        
+        # Push detections and frames to WebSocket/SSE clients
+        self.broadcaster = EventBroadcaster()
+        
+        # Frame bus between the inference daemon and API workers: the daemon
+        # sets bus_publisher, workers set bus_subscriber and run no inference
+        self.bus_publisher = None
+        self.bus_subscriber = None
+        self.remote_info = {}  # Latest model/readiness info from the daemon
+        self._info_published_at = 0.0
+        
         # Initialize notification manager
         api_endpoint = os.getenv("NOTIFICATION_API_ENDPOINT", "https://learnsecure-api.d.vaultinnovation.com/api/v1/public/threats")
         self.notification_manager = NotificationManager(api_endpoint)
+        
+        # Reuse weapon results for people who haven't moved
+        self.crop_cache = CropResultCache(
+            max_entries=CROP_CACHE_MAX_ENTRIES,
+            max_distance=CROP_CACHE_MAX_DISTANCE,
+            refresh_interval=CROP_CACHE_REFRESH_INTERVAL,
+        ) if CROP_CACHE_ENABLED else None
+        
+        # Run person crops at a size that fits them instead of the weapon model's full input size
+        self.weapon_shapes = shape_buckets_from_settings(
+            WEAPON_SHAPE_MODE, WEAPON_SHAPE_BUCKETS, WEAPON_SHAPE_MIN, WEAPON_SHAPE_MAX,
+        )
+        
+        # Only detections that persist across frames reach the notification manager
+        self.confirmation_filter = TemporalConfirmationFilter(
+            confirm_frames=CONFIRM_FRAMES,
+            window_frames=CONFIRM_WINDOW_FRAMES,
+            smoothing=CONFIRM_SMOOTHING,
+        )
     
-    async def get_latest_processed_frame(self) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    async def get_latest_processed_frame(self) -> Tuple[np.ndarray, List[Detection]]:
         """
         Get the latest processed frame and its detections
         
         Returns:
             Tuple of (frame, detections) or (None, []) if no frame is available
         """
+        if self.bus_subscriber is not None:
+            # Workers only hold the JPEG published by the daemon
+            _, jpeg, detections = self.snapshot_cache.get("annotated", "full")
+            if jpeg is None:
+                return None, []
+            return cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR), list(detections)
+        
         async with self.frame_lock:
             if self.latest_processed_frame is None:
                 return None, []
             return self.latest_processed_frame.copy(), self.latest_processed_detections.copy()
     
+    def detect(self, frame: np.ndarray, models: Dict[str, Any] = None, use_cache: bool = True) -> Tuple[np.ndarray, List[Detection]]:
+        """
+        Run the detection cascade on one frame (blocking)
+        
+        With a model registry, every model version is pinned for the whole
+        frame so a hot swap only takes effect between frames.
+        
+        Args:
+            frame: The frame to process, left untouched
+            models: Specific model versions to use, as yielded by ModelRegistry.acquire()
+            use_cache: Reuse weapon results of unchanged person crops (off for shadow runs)
+            
+        Returns:
+            Tuple of (annotated frame, detections)
+        """
+        if models is None and self.model_registry is not None:
+            with self.model_registry.acquire() as models:
+                return self.detect(frame, models, use_cache)
+        if models is None:
+            models = {"base": self.base_model, "weapon": self.weapon_model, "police": self.police_model}
+        crop_cache = self.crop_cache if use_cache else None
+        if crop_cache is not None:
+            # Cached results are only valid for the weapon model version that produced them
+            weapon = models["weapon"]
+            crop_cache.bind(weapon.version if isinstance(weapon, TimedModel) else id(weapon))
+        return process_frame_with_yolo(
+            frame,
+            base_model=models["base"],
+            weapon_model=models["weapon"],
+            police_model=models["police"],
+            return_detections=True,
+            crop_cache=crop_cache,
+            shapes=self.weapon_shapes
+        )
+    
+    def _detect_live(self, frame: np.ndarray, use_cache: bool = True):
+        """
+        detect() for the stream loop, also returning the time spent in each
+        model's calls (empty without a model registry)
+        """
+        if self.model_registry is None:
+            return (*self.detect(frame, use_cache=use_cache), {})
+        with self.model_registry.acquire() as models:
+            processed_frame, detections = self.detect(frame, models, use_cache)
+            return processed_frame, detections, {name: model.seconds for name, model in models.items()}
+    
     async def start_stream(self):
         if not self.active:
             logger.info("Starting stream...")
             self.active = True
-            self.stream_task = asyncio.create_task(self.process_stream())
+            if self.bus_subscriber is not None:
+                self.stream_task = asyncio.create_task(self.consume_bus())
+            else:
+                self.stream_task = asyncio.create_task(self.process_stream())
             asyncio.create_task(self.monitor_activity())
     
     async def process_stream(self):
+        if self.model_registry is not None:
+            # Don't hold the event loop while the models load
+            await self.model_registry.wait_ready()
+        self.publish_info()
+        
+        vs = None
         while self.active:
             try:
                 # Start video stream in a thread pool to not block the event loop
                 loop = asyncio.get_running_loop()
-                logger.info(f"Connecting to RTSP stream: {self.url_rtsp}")
-                vs = VideoStream(self.url_rtsp).start()
+                logger.info(f"Connecting to RTSP stream: {self.url_rtsp} ({CAPTURE_BACKEND})")
+                vs = await loop.run_in_executor(None, lambda: open_capture(
+                    self.url_rtsp, CAPTURE_BACKEND, width=self.frame_width,
+                    idle_mode=CAPTURE_IDLE_MODE, idle_every_n=CAPTURE_IDLE_EVERY_N,
+                ))
                 await asyncio.sleep(1)  # Give time for camera to initialize
                 
                 self.reconnect_attempts = 0  # Reset reconnect attempts on successful connection
+                self.confirmation_filter.reset()  # Tracks don't carry over a gap in the stream
+                if self.crop_cache is not None:
+                    self.crop_cache.clear()
                 
                 while self.active:
                     try:
                         # Get frame in thread pool executor
                         frame = await loop.run_in_executor(None, vs.read)
                         if frame is None:
+                            if getattr(vs, "stopped", False):
+                                break
                             logger.warning("Received empty frame, retrying...")
                             await asyncio.sleep(0.1)
                             continue
                         
-                        # Resize frame
-                        frame = imutils.resize(frame, width=680)
+                        # Resize frame, unless the backend already scaled it while decoding
+                        if frame.shape[1] != self.frame_width:
+                            frame = imutils.resize(frame, width=self.frame_width)
+                        
+                        # Compare a candidate model version on a sample of frames, off the hot path.
+                        # Those frames skip the crop cache, so both versions run on every crop.
+                        shadow_name = self.model_registry.shadow_candidate() if self.model_registry is not None else None
                         
                         # Process with YOLO in thread pool executor
-                        processed_frame, detections = await loop.run_in_executor(
-                            None, 
-                            lambda f: process_frame_with_yolo(
-                                f,
-                                base_model=self.base_model, 
-                                weapon_model=self.weapon_model,
-                                police_model=self.police_model,
-                                return_detections=True), 
-                                frame.copy()
-                        )
+                        try:
+                            processed_frame, detections, model_seconds = await loop.run_in_executor(
+                                None, self._detect_live, frame.copy(), shadow_name is None
+                            )
+                        except BaseException:
+                            if shadow_name is not None:
+                                self.model_registry.skip_shadow()
+                            raise
+                        
+                        if shadow_name is not None:
+                            loop.run_in_executor(
+                                None, self.model_registry.run_shadow, shadow_name,
+                                lambda models, f=frame: self.detect(f, models, use_cache=False)[1],
+                                detections, model_seconds[shadow_name]
+                            )
                         
                         # print("Detections: ", detections)
                         if processed_frame is None:
@@ -113,6 +246,9 @@ class StreamManager:
                             self.latest_processed_detections = detections
                         
                         current_time = time.time()
+                        if self.first_frame_time is None:
+                            self.first_frame_time = current_time
+                            logger.info("First frame processed")
                         
                         # Update latest detections if any were found
                         if detections:
@@ -120,27 +256,30 @@ class StreamManager:
                             self.last_detection_time = current_time
                             
                             # Add to history if these are new detections
-                            if not self.detection_history or (current_time - self.detection_history[-1]['time']) > self.detection_timeout:
-                                self.detection_history.append({
-                                    'time': current_time,
-                                    'count': len(detections),
-                                    'detections': detections
-                                })
+                            last_event_time = self.detection_history.last_time
+                            if last_event_time is None or (current_time - last_event_time) > self.detection_timeout:
+                                self.detection_history.append(detections, current_time)
                             
-                            print("Sent to process detection")
-                            # Process detections for notification
-                            await self.notification_manager.process_detection(processed_frame, detections)
+                            self.publish_detections(current_time)
                         else:
                             # Check if detections have disappeared for too long
                             if self.last_detection_time and (current_time - self.last_detection_time) > self.detection_timeout:
                                 self.latest_detections = []
                                 self.last_detection_time = None
+                                self.publish_detections(current_time)
+                        
+                        if self.idle_detector is not None and hasattr(vs, "set_idle"):
+                            vs.set_idle(self.idle_detector.update(frame, bool(detections)))
+                        
+                        # Every frame ages the tracks, empty ones included
+                        confirmed = self.confirmation_filter.update(detections)
+                        if confirmed:
+                            logger.debug(f"Sending {len(confirmed)} confirmed detection(s) to notification processing")
+                            # Process detections for notification
+                            await self.notification_manager.process_detection(processed_frame, confirmed)
                         
                         # Clean up old history entries
-                        self.detection_history = [
-                            entry for entry in self.detection_history 
-                            if current_time - entry['time'] <= self.history_timeout
-                        ]
+                        self.detection_history.expire(current_time)
                         
                         # Encode frame in thread pool executor
                         encode_result = await loop.run_in_executor(
@@ -153,6 +292,19 @@ class StreamManager:
                             await asyncio.sleep(0.1)
                             continue
                         
+                        jpeg_bytes = encoded_image.tobytes()
+                        seq = self.snapshot_cache.update(frame, processed_frame, detections, jpeg_bytes, current_time)
+                        
+                        if self.bus_publisher is not None:
+                            # Detections travel packed in front of the JPEG
+                            packed = pack_detections(detections)
+                            self.bus_publisher.publish("frame", {"detections_size": len(packed)}, packed + jpeg_bytes, current_time, seq)
+                            if self.bus_publisher.wants("raw"):
+                                # Encoded once and shared with local snapshot requests
+                                _, raw_jpeg, _ = await loop.run_in_executor(None, self.snapshot_cache.get, "raw", "full")
+                                if raw_jpeg is not None:
+                                    self.bus_publisher.publish("raw", None, raw_jpeg, current_time, seq)
+                        
                         # If queue is full, remove oldest frame to prevent backlog
                         if self.frame_queue.full():
                             try:
@@ -162,6 +314,8 @@ class StreamManager:
                         
                         # Add new frame to queue
                         await self.frame_queue.put(encoded_image)
+                        if self.broadcaster.wants("frame"):
+                            self.broadcaster.publish("frame", jpeg_bytes)
                         await asyncio.sleep(0.01)  # Small sleep to yield control
                         
                     except Exception as e:
@@ -169,9 +323,14 @@ class StreamManager:
                         await asyncio.sleep(0.1)
                         continue
                 
+                vs.stop()
+                if self.active:
+                    raise RuntimeError("Capture ended")
+                
             except Exception as e:
                 logger.error(f"Stream error: {str(e)}")
-                vs.stop()
+                if vs is not None:
+                    vs.stop()
                 
                 # Handle reconnection
                 if self.reconnect_attempts < self.max_reconnect_attempts:
@@ -184,9 +343,93 @@ class StreamManager:
                     self.active = False
                     break
     
+    def publish_detections(self, timestamp: float):
+        """
+        Push the current detection state to connected clients
+        
+        Args:
+            timestamp: Time of the frame the detections belong to
+        """
+        message = {
+            "type": "detections",
+            "timestamp": timestamp,
+            "detections": self.latest_detections
+        }
+        self.broadcaster.publish("detections", message)
+        if self.bus_publisher is not None:
+            self.bus_publisher.publish(
+                "detections", dict(message, detections=detections_to_dicts(self.latest_detections)), timestamp=timestamp
+            )
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Inference counters, from the daemon when running as an API worker
+        """
+        if self.bus_subscriber is not None:
+            return self.remote_info.get("stats", {})
+        return {"crop_cache": self.crop_cache.stats() if self.crop_cache is not None else None}
+    
+    def publish_info(self):
+        """
+        Tell API workers whether inference is ready and which classes it detects
+        """
+        if self.bus_publisher is None:
+            return
+        ready = self.model_registry is None or self.model_registry.is_ready()
+        info = {"ready": ready, "first_frame_time": self.first_frame_time}
+        if ready:
+            info["classes"] = self.weapon_model.names
+        if self.model_registry is not None:
+            info["models"] = self.model_registry.status()
+        info["stats"] = self.stats()
+        self.bus_publisher.publish("info", info)
+        self._info_published_at = time.time()
+    
+    async def consume_bus(self):
+        """
+        Serve frames and detections produced by the inference daemon instead
+        of running the stream in this process
+        """
+        logger.info(f"Receiving frames from the inference daemon on {self.bus_subscriber.path}")
+        await self.bus_subscriber.run(self._on_bus_message)
+    
+    def _on_bus_message(self, topic: str, timestamp: float, seq: int, meta: Any, data: bytes):
+        if topic == "info":
+            self.remote_info = meta
+        elif topic == "detections":
+            self.latest_detections = [Detection.from_dict(d) for d in meta["detections"]]
+            self.last_detection_time = timestamp if self.latest_detections else None
+            self.broadcaster.publish("detections", dict(meta, detections=self.latest_detections))
+        elif topic == "frame":
+            if self.first_frame_time is None:
+                self.first_frame_time = time.time()
+            size = meta["detections_size"]
+            detections, data = unpack_detections(data[:size]), data[size:]
+            # Frames are only decoded here if a resized rendition is requested
+            self.snapshot_cache.update(None, data, detections, data, timestamp, seq)
+            if self.frame_queue.full():
+                try:
+                    self.frame_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            self.frame_queue.put_nowait(data)
+            if self.broadcaster.wants("frame"):
+                self.broadcaster.publish("frame", data)
+        elif topic == "raw":
+            self.snapshot_cache.add_encoded(seq, "raw", data)
+    
     async def monitor_activity(self):
         while self.active:
             await asyncio.sleep(1)
+            # Refresh what API workers know about the models
+            if self.bus_publisher is not None and time.time() - self._info_published_at > 10:
+                self.publish_info()
+            # Connected WebSocket/SSE clients keep the stream alive
+            if self.always_on or self.broadcaster.subscriber_count > 0:
+                continue
+            # So do API workers connected to the frame bus
+            if self.bus_publisher is not None and self.bus_publisher.subscriber_count > 0:
+                continue
             self.keep_alive_counter -= 1
             if self.keep_alive_counter <= 0:
                 logger.info("Keep-alive counter expired, stopping stream")
@@ -0,0 +1,116 @@
+from typing import List, Optional
+from .detection import Detection, iou
+
+class _Track:
+    __slots__ = ("class_name", "box", "hits", "confidence", "seen")
+
+    def __init__(self, detection: Detection):
+        self.class_name = detection.class_name
+        self.box = detection
+        self.hits = 0  # Bit i set: matched i frames ago
+        self.confidence = detection.confidence
+        self.seen = False  # Matched in the current frame
+
+class TemporalConfirmationFilter:
+    def __init__(
+        self,
+        confirm_frames: int = 3,
+        window_frames: int = 5,
+        smoothing: float = 0.5,
+        iou_threshold: float = 0.2,
+        region_margin: float = 0.5,
+        max_tracks: int = 64,
+    ):
+        """
+        Suppress single-frame misfires: a detection is only confirmed once the
+        same class has been seen in the same region in K of the last N frames
+
+        Each track keeps its last box, a bitmask of the last N frames and an
+        exponentially smoothed confidence over the frames it was seen in, so
+        memory stays constant per track. Tracks no longer seen in any of the
+        last N frames are dropped.
+
+        Args:
+            confirm_frames: K, frames within the window a detection must appear in
+            window_frames: N, the sliding window length in frames
+            smoothing: Weight of the newest confidence in the moving average (0-1]
+            iou_threshold: Minimum box overlap to associate a detection with a track
+            region_margin: A detection whose center falls inside a track's box grown
+                by this fraction of its size also matches, for small moving objects
+            max_tracks: Upper bound on tracks, the least confident are dropped first
+        """
+        if not 1 <= confirm_frames <= window_frames:
+            raise ValueError("confirm_frames must be between 1 and window_frames")
+        self.confirm_frames = confirm_frames
+        self.window_frames = window_frames
+        self.smoothing = smoothing
+        self.iou_threshold = iou_threshold
+        self.region_margin = region_margin
+        self.max_tracks = max_tracks
+        self._window_mask = (1 << window_frames) - 1
+        self._tracks: List[_Track] = []
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def reset(self):
+        self._tracks = []
+
+    def _matches(self, track: _Track, d: Detection) -> bool:
+        if track.class_name != d.class_name:
+            return False
+        box = track.box
+        if iou(box, d) >= self.iou_threshold:
+            return True
+        mx = (box.x2 - box.x1) * self.region_margin
+        my = (box.y2 - box.y1) * self.region_margin
+        cx, cy = (d.x1 + d.x2) / 2, (d.y1 + d.y2) / 2
+        return box.x1 - mx <= cx <= box.x2 + mx and box.y1 - my <= cy <= box.y2 + my
+
+    def _find(self, d: Detection) -> Optional[_Track]:
+        best, best_overlap = None, -1.0
+        for track in self._tracks:
+            if not track.seen and self._matches(track, d):
+                overlap = iou(track.box, d)
+                if overlap > best_overlap:
+                    best, best_overlap = track, overlap
+        return best
+
+    def update(self, detections: List[Detection]) -> List[Detection]:
+        """
+        Feed one frame's detections, including empty frames so tracks age
+
+        Args:
+            detections: Detections of the current frame
+
+        Returns:
+            Confirmed detections seen in this frame, with their box from this
+            frame and the smoothed confidence
+        """
+        for track in self._tracks:
+            track.hits = (track.hits << 1) & self._window_mask
+            track.seen = False
+
+        # Most confident first, so they claim the best-matching tracks
+        for d in sorted(detections, key=lambda d: d.confidence, reverse=True):
+            track = self._find(d)
+            if track is None:
+                track = _Track(d)
+                self._tracks.append(track)
+            else:
+                track.confidence += self.smoothing * (d.confidence - track.confidence)
+                track.box = d
+            track.hits |= 1
+            track.seen = True
+
+        confirmed = []
+        for track in self._tracks:
+            if track.seen and bin(track.hits).count("1") >= self.confirm_frames:
+                box = track.box
+                confirmed.append(Detection(track.class_name, round(track.confidence, 2), box.x1, box.y1, box.x2, box.y2))
+
+        self._tracks = [t for t in self._tracks if t.hits]
+        if len(self._tracks) > self.max_tracks:
+            self._tracks.sort(key=lambda t: t.confidence, reverse=True)
+            del self._tracks[self.max_tracks:]
+        return confirmed
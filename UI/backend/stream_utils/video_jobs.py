@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import cv2
+from .yolo_process import process_frames_with_yolo_batch
+from .detection import detections_to_json
+from config.settings import (
+    BASE_MODEL_PATH, POLICE_MODEL_PATH, WEAPON_MODEL_PATH,
+    VIDEO_JOBS_DIR, VIDEO_JOB_WORKERS, VIDEO_JOB_THREADS, VIDEO_JOB_BATCH
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Statuses of jobs that still have work to do ("cancelled" jobs were still
+# waiting in the pool at shutdown)
+_INCOMPLETE = ("queued", "running", "cancelled")
+
+# Models loaded once per worker process
+_worker_models = None
+
+def _write_json_atomic(path: str, data: Dict[str, Any]):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _init_worker(model_paths: List[str], threads: int):
+    """
+    Process pool initializer: cap CPU threads and load the models once
+    """
+    global _worker_models
+    import torch
+    from ultralytics import YOLO
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+    _worker_models = tuple(YOLO(p) for p in model_paths)
+
+def _resume_point(results_path: str) -> Tuple[int, int]:
+    """
+    Find the frame after the last one fully written to a results file
+
+    A partially written last line (from a crash mid-write) is truncated away.
+
+    Returns:
+        Tuple of (next frame index, detections already written)
+    """
+    if not os.path.exists(results_path):
+        return 0, 0
+    next_frame = 0
+    found = 0
+    good_size = 0
+    with open(results_path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            next_frame = record["frame"] + 1
+            found += len(record["detections"])
+            good_size += len(line)
+    if good_size != os.path.getsize(results_path):
+        with open(results_path, "r+b") as f:
+            f.truncate(good_size)
+    return next_frame, found
+
+def _run_video_job(jobs_dir: str, job_id: str, batch_size: int) -> str:
+    """
+    Analyze one video in a worker process, appending per-frame detections to
+    <job_id>.jsonl and progress to <job_id>.json. Resumes after the last
+    frame already in the results file.
+    """
+    status_path = os.path.join(jobs_dir, f"{job_id}.json")
+    results_path = os.path.join(jobs_dir, f"{job_id}.jsonl")
+    with open(status_path) as f:
+        status = json.load(f)
+
+    base_model, weapon_model, police_model = _worker_models
+    cap = cv2.VideoCapture(status["path"])
+    if not cap.isOpened():
+        status.update(status="failed", error="Could not open video", finished_at=time.time())
+        _write_json_atomic(status_path, status)
+        return "failed"
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        sample_every = max(1, round(fps / status["sample_fps"]))
+        start, found = _resume_point(results_path)
+        # Resume on the sampling grid
+        start = -(-start // sample_every) * sample_every
+        if start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+        status.update(status="running", frames_total=total, fps=fps, sample_every=sample_every, frames_done=start, detections_found=found)
+        _write_json_atomic(status_path, status)
+
+        with open(results_path, "a") as results:
+            index = start
+            batch_frames, batch_indices = [], []
+            while True:
+                # grab() skips decoding frames that are not sampled
+                if not cap.grab():
+                    break
+                if index % sample_every == 0:
+                    ok, frame = cap.retrieve()
+                    if ok:
+                        batch_frames.append(frame)
+                        batch_indices.append(index)
+                index += 1
+
+                if len(batch_frames) >= batch_size:
+                    found = _flush_batch(results, batch_frames, batch_indices, fps, base_model, weapon_model, police_model)
+                    status.update(frames_done=index, detections_found=status["detections_found"] + found)
+                    _write_json_atomic(status_path, status)
+                    batch_frames, batch_indices = [], []
+
+            if batch_frames:
+                found = _flush_batch(results, batch_frames, batch_indices, fps, base_model, weapon_model, police_model)
+                status["detections_found"] += found
+
+        status.update(status="done", frames_done=index, finished_at=time.time())
+        _write_json_atomic(status_path, status)
+        return "done"
+    except Exception as e:
+        status.update(status="failed", error=str(e), finished_at=time.time())
+        _write_json_atomic(status_path, status)
+        return "failed"
+    finally:
+        cap.release()
+
+def _flush_batch(results, frames, indices, fps, base_model, weapon_model, police_model) -> int:
+    """
+    Run one batch of sampled frames and durably append its results
+
+    Returns:
+        Number of detections found
+    """
+    detections = process_frames_with_yolo_batch(frames, base_model, weapon_model, police_model)
+    for index, dets in zip(indices, detections):
+        results.write('{"frame": %d, "timestamp": %r, "detections": %s}\n' % (index, round(index / fps, 3), detections_to_json(dets)))
+    results.flush()
+    os.fsync(results.fileno())
+    return sum(len(dets) for dets in detections)
+
+class VideoJobManager:
+    def __init__(
+        self,
+        jobs_dir: str = VIDEO_JOBS_DIR,
+        max_workers: int = VIDEO_JOB_WORKERS,
+        threads_per_worker: int = VIDEO_JOB_THREADS,
+        batch_size: int = VIDEO_JOB_BATCH,
+    ):
+        """
+        Queue video files for offline analysis in a separate process pool
+
+        The pool size and per-process thread count cap how much CPU jobs can
+        take from the live streams.
+
+        Args:
+            jobs_dir: Folder for job status, results and uploaded videos
+            max_workers: Number of worker processes
+            threads_per_worker: CPU threads each worker may use for inference and decoding
+            batch_size: Sampled frames per inference batch
+        """
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers
+        self.threads_per_worker = threads_per_worker
+        self.batch_size = batch_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that already runs torch threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=([BASE_MODEL_PATH, WEAPON_MODEL_PATH, POLICE_MODEL_PATH], self.threads_per_worker),
+                )
+            return self._executor
+
+    def _status_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def results_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.jsonl")
+
+    def upload_path(self, filename: str) -> str:
+        """
+        Where to store an uploaded video before submitting it
+        """
+        ext = os.path.splitext(filename)[1].lower() or ".mp4"
+        return os.path.join(self.jobs_dir, f"upload_{uuid.uuid4().hex}{ext}")
+
+    def submit(self, path: str, sample_fps: float = 2.0) -> str:
+        """
+        Queue a video for analysis
+
+        Args:
+            path: Path of the video file
+            sample_fps: How many frames per second of video to analyze
+
+        Returns:
+            The job id
+        """
+        job_id = uuid.uuid4().hex
+        _write_json_atomic(self._status_path(job_id), {
+            "id": job_id,
+            "path": path,
+            "sample_fps": sample_fps,
+            "status": "queued",
+            "frames_done": 0,
+            "frames_total": None,
+            "detections_found": 0,
+            "created_at": time.time(),
+        })
+        self._schedule(job_id)
+        return job_id
+
+    def _schedule(self, job_id: str):
+        future = self._pool().submit(_run_video_job, self.jobs_dir, job_id, self.batch_size)
+
+        def on_done(f):
+            if f.cancelled():
+                # Still queued when the pool shut down
+                status = self.get(job_id) or {}
+                status.update(status="cancelled")
+                _write_json_atomic(self._status_path(job_id), status)
+            # A crashed worker cannot update its own status
+            elif f.exception() is not None:
+                logger.error(f"Video job {job_id} crashed: {f.exception()}")
+                status = self.get(job_id) or {}
+                status.update(status="failed", error=str(f.exception()), finished_at=time.time())
+                _write_json_atomic(self._status_path(job_id), status)
+        future.add_done_callback(on_done)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job's status and progress, or None if it does not exist
+        """
+        try:
+            with open(self._status_path(job_id)) as f:
+                status = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if status.get("frames_total"):
+            status["progress"] = round(min(1.0, status["frames_done"] / status["frames_total"]), 4)
+        return status
+
+    def resume_incomplete(self) -> int:
+        """
+        Requeue jobs that were queued or running when the server stopped
+
+        Returns:
+            Number of jobs requeued
+        """
+        resumed = 0
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith(".json"):
+                continue
+            job_id = name[:-len(".json")]
+            status = self.get(job_id)
+            if status and status.get("status") in _INCOMPLETE:
+                logger.info(f"Resuming video job {job_id}")
+                self._schedule(job_id)
+                resumed += 1
+        return resumed
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
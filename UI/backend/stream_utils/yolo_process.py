@@ -1,6 +1,10 @@
-import cv2
+import time
 import numpy as np
-from ultralytics import YOLO
+from typing import Optional
+from .detection import Detection
+from .overlay import OverlayRenderer
+from .crop_cache import CropResultCache
+from .inference_shapes import ShapeBuckets
 
 # ---------------------------------------------------------------------------
 # Helper utils --------------------------------------------------------------
@@ -17,32 +21,43 @@ def _expand_box(box: list[float], scale: float, max_w: int, max_h: int) -> list[
     ]
 
 
-def _hash_color(key: str) -> tuple[int, int, int]:
-    np.random.seed(abs(hash(key)) % (2**32))
-    return tuple(int(v) for v in np.random.randint(64, 256, 3))  # BGR
+def _result_detections(r, conf_thresh: float) -> list[Detection]:
+    names = r.names
+    dets: list[Detection] = []
+    for b in r.boxes:
+        conf = float(b.conf.item())
+        if conf < conf_thresh:
+            continue
+        x1, y1, x2, y2 = map(float, b.xyxy[0].cpu().numpy())
+        dets.append(Detection(names[int(b.cls.item())], conf, x1, y1, x2, y2))
+    return dets
 
 
-def _draw_box(img: np.ndarray, xyxy: tuple[int, int, int, int], color: tuple[int, int, int], label: str, thickness: int = 2):
-    x1, y1, x2, y2 = xyxy
-    cv2.rectangle(img, (x1, y1), (x2, y2), color, thickness)
-    cv2.putText(img, label, (x1, max(0, y1 - 4)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, thickness)
+def _offset_detection(d: Detection, dx: int, dy: int) -> Detection:
+    # Map a detection on a crop back to the full frame
+    return Detection(
+        d.class_name, round(d.confidence, 2),
+        int(d.x1 + dx), int(d.y1 + dy), int(d.x2 + dx), int(d.y2 + dy),
+    )
 
 
-def _yolo_detections(model, img: np.ndarray, conf_thresh: float = 0.5) -> list[dict]:
+def _yolo_detections(model, img: np.ndarray, conf_thresh: float = 0.5) -> list[Detection]:
     results = model(img, stream=False, verbose=False)
-    dets: list[dict] = []
+    dets: list[Detection] = []
     for r in results:
-        names = r.names
-        for b in r.boxes:
-            conf = float(b.conf.item())
-            if conf < conf_thresh:
-                continue
-            cls = names[int(b.cls.item())]
-            dets.append({
-                "class": cls,
-                "conf": conf,
-                "box": list(map(float, b.xyxy[0].cpu().numpy())),
-            })
+        dets.extend(_result_detections(r, conf_thresh))
+    return dets
+
+
+def _yolo_detections_batch(
+    model, imgs: list[np.ndarray], conf_thresh: float = 0.5, max_batch: int = 32, imgsz: Optional[int] = None,
+) -> list[list[Detection]]:
+    # A list input is letterboxed to a common shape and run as one padded batch
+    kwargs = {"imgsz": imgsz} if imgsz else {}
+    dets: list[list[Detection]] = []
+    for i in range(0, len(imgs), max_batch):
+        results = model(imgs[i:i + max_batch], stream=False, verbose=False, **kwargs)
+        dets.extend(_result_detections(r, conf_thresh) for r in results)
     return dets
 
 
@@ -50,10 +65,108 @@ def _is_civilian(police_model, crop: np.ndarray) -> tuple[bool, float]:
     probs = police_model(crop, stream=False, verbose=False)[0].probs.data.cpu().numpy()
     return probs.argmax() == 1, float(probs.max())
 
+
+def _is_civilian_batch(police_model, crops: list[np.ndarray], max_batch: int = 32) -> list[bool]:
+    civilians: list[bool] = []
+    for i in range(0, len(crops), max_batch):
+        for r in police_model(crops[i:i + max_batch], stream=False, verbose=False):
+            civilians.append(bool(r.probs.data.cpu().numpy().argmax() == 1))
+    return civilians
+
 # ---------------------------------------------------------------------------
 # process_frame_with_yolo  --------------------------------------------------
 # ---------------------------------------------------------------------------
 
+_default_renderer = OverlayRenderer()
+
+
+def _weapon_batches(weapon_model, crops: list[np.ndarray], shapes: Optional[ShapeBuckets]) -> list[list[Detection]]:
+    if shapes is None:
+        return [_yolo_detections(weapon_model, crop, 0.6) for crop in crops]
+    dets: list[list[Detection]] = [[] for _ in crops]
+    for imgsz, indices in shapes.group(crops).items():
+        for i, d in zip(indices, _yolo_detections_batch(weapon_model, [crops[i] for i in indices], 0.6, imgsz=imgsz)):
+            dets[i] = d
+    return dets
+
+
+def _crop_weapons(
+    weapon_model,
+    crops: list[np.ndarray],
+    regions: list[Detection],
+    crop_cache: Optional[CropResultCache],
+    shapes: Optional[ShapeBuckets] = None,
+) -> list[list[Detection]]:
+    # Look every crop up first, so the misses can run together
+    results: list[Optional[list[Detection]]] = [None] * len(crops)
+    misses: list[tuple[int, Optional[int], Optional[int]]] = []  # (crop index, cache key, signature)
+    for i, (crop, region) in enumerate(zip(crops, regions)):
+        if crop_cache is None:
+            misses.append((i, None, None))
+            continue
+        signature = crop_cache.signature(crop)
+        key, cached = crop_cache.lookup(region, signature)
+        if cached is not None:
+            results[i] = cached
+        else:
+            misses.append((i, key, signature))
+    if misses:
+        start = time.perf_counter()
+        dets = _weapon_batches(weapon_model, [crops[i] for i, _, _ in misses], shapes)
+        per_crop = (time.perf_counter() - start) / len(misses)
+        for (i, key, signature), d in zip(misses, dets):
+            results[i] = d
+            if crop_cache is not None:
+                crop_cache.store(key, regions[i], signature, d, per_crop)
+    return results
+
+
+def detect_frame(
+    frame: np.ndarray,
+    base_model,
+    weapon_model,
+    police_model,
+    expand: float = 0.3,
+    crop_cache: Optional[CropResultCache] = None,
+    shapes: Optional[ShapeBuckets] = None,
+) -> tuple[list[Detection], list[Detection]]:
+    """
+    Run the person -> police -> weapon cascade on one frame without drawing.
+
+    With a crop_cache, weapon detections of a civilian crop that has not
+    changed since it was last run are reused instead of calling weapon_model.
+    With shapes, the remaining civilian crops run at a size picked for each
+    crop (and batched per size) instead of the weapon model's default size.
+
+    Returns:
+        Tuple of (person regions labelled "civilian" or "police", weapon
+        detections). Pass both to OverlayRenderer.render() to annotate.
+    """
+    h, w = frame.shape[:2]
+    people: list[Detection] = []
+    civilian_crops: list[np.ndarray] = []
+    civilian_regions: list[Detection] = []
+
+    persons = [d for d in _yolo_detections(base_model, frame, 0.6) if d.class_name == "person"]
+
+    for p in persons:
+        x1, y1, x2, y2 = _expand_box(p.box, expand, w, h)
+        isolated = frame[y1:y2, x1:x2]
+
+        civilian, _ = _is_civilian(police_model, isolated)
+        people.append(Detection("civilian" if civilian else "police", p.confidence, x1, y1, x2, y2))
+
+        if civilian:
+            civilian_crops.append(isolated)
+            civilian_regions.append(people[-1])
+
+    weapon_detections: list[Detection] = []
+    for region, dets in zip(civilian_regions, _crop_weapons(weapon_model, civilian_crops, civilian_regions, crop_cache, shapes)):
+        weapon_detections.extend(_offset_detection(w_det, int(region.x1), int(region.y1)) for w_det in dets)
+
+    return people, weapon_detections
+
+
 def process_frame_with_yolo(
     frame: np.ndarray,
     base_model,
@@ -61,37 +174,70 @@ def process_frame_with_yolo(
     police_model,
     return_detections: bool = False,
     expand: float = 0.3,
+    renderer: Optional[OverlayRenderer] = None,
+    crop_cache: Optional[CropResultCache] = None,
+    shapes: Optional[ShapeBuckets] = None,
 ):
     if frame is None:
         return (None, []) if return_detections else None
 
-    h, w = frame.shape[:2]
-    dark = cv2.convertScaleAbs(frame, alpha=1, beta=-75)
-    weapon_detections: list[dict] = []
+    people, weapon_detections = detect_frame(frame, base_model, weapon_model, police_model, expand, crop_cache, shapes)
+    annotated = (renderer or _default_renderer).render(frame, people, weapon_detections)
 
-    persons = [d for d in _yolo_detections(base_model, frame, 0.6) if d["class"] == "person"]
+    return (annotated, weapon_detections) if return_detections else annotated
 
-    for p in persons:
-        x1, y1, x2, y2 = _expand_box(p["box"], expand, w, h)
-        isolated = frame[y1:y2, x1:x2].copy()
-        dark[y1:y2, x1:x2] = isolated
 
-        civilian, _ = _is_civilian(police_model, isolated)
-        label = "civilian" if civilian else "police"
-        color = (0, 255, 0) if civilian else (255, 0, 0)
+# ---------------------------------------------------------------------------
+# process_frames_with_yolo_batch  -------------------------------------------
+# ---------------------------------------------------------------------------
 
-        if civilian:
-            for w_det in _yolo_detections(weapon_model, isolated, 0.6):
-                wx1, wy1, wx2, wy2 = [int(w_det["box"][i] + (x1 if i % 2 == 0 else y1)) for i in range(4)]
-                w_color = _hash_color(w_det["class"])
-                _draw_box(dark, (wx1, wy1, wx2, wy2), w_color, f"{w_det['class']}:{w_det['conf']:.2f}")
-                if return_detections:
-                    weapon_detections.append({
-                        "class_name": w_det["class"],
-                        "confidence": round(w_det["conf"], 2),
-                        "x1": wx1, "y1": wy1, "x2": wx2, "y2": wy2,
-                    })
-
-        _draw_box(dark, (x1, y1, x2, y2), color, f"{label}:{p['conf']:.2f}")
-
-    return (dark, weapon_detections) if return_detections else dark
\ No newline at end of file
+def process_frames_with_yolo_batch(
+    frames: list[np.ndarray],
+    base_model,
+    weapon_model,
+    police_model,
+    expand: float = 0.3,
+) -> list[list[Detection]]:
+    """
+    Run the person -> police -> weapon cascade over many frames at once.
+
+    Each stage runs as batched inference across all frames (and all person
+    crops), instead of one model call per frame and per crop. No annotation
+    is drawn.
+
+    Returns:
+        One list of weapon detections per frame, in the same schema as
+        process_frame_with_yolo(..., return_detections=True)
+    """
+    results: list[list[Detection]] = [[] for _ in frames]
+    valid = [i for i, f in enumerate(frames) if f is not None]
+    if not valid:
+        return results
+
+    # Stage 1: people in every frame
+    person_dets = _yolo_detections_batch(base_model, [frames[i] for i in valid], 0.6)
+
+    crops: list[np.ndarray] = []
+    owners: list[tuple[int, int, int]] = []  # (frame index, crop x1, crop y1)
+    for i, dets in zip(valid, person_dets):
+        h, w = frames[i].shape[:2]
+        for p in dets:
+            if p.class_name != "person":
+                continue
+            x1, y1, x2, y2 = _expand_box(p.box, expand, w, h)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            crops.append(frames[i][y1:y2, x1:x2])
+            owners.append((i, x1, y1))
+    if not crops:
+        return results
+
+    # Stage 2: police vs civilian for every person crop
+    civilian = _is_civilian_batch(police_model, crops)
+    civ_crops = [c for c, is_civ in zip(crops, civilian) if is_civ]
+    civ_owners = [o for o, is_civ in zip(owners, civilian) if is_civ]
+
+    # Stage 3: weapons on every civilian crop
+    for (i, x1, y1), dets in zip(civ_owners, _yolo_detections_batch(weapon_model, civ_crops, 0.6)):
+        results[i].extend(_offset_detection(w_det, x1, y1) for w_det in dets)
+    return results
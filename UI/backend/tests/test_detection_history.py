@@ -0,0 +1,55 @@
+import time
+from stream_utils.detection import Detection
+from stream_utils.detection_history import DetectionHistory
+
+def make_history(tmp_path, **kwargs):
+    return DetectionHistory(log_path=str(tmp_path / "history.sqlite3"), **kwargs)
+
+def test_append_is_written_in_background(tmp_path):
+    history = make_history(tmp_path)
+    history.append([Detection("gun", 0.9, 1, 2, 3, 4)], 1000.0, camera_id=2)
+    history.append([Detection("knife", 0.7, 5, 6, 7, 8)], 1001.0)
+    assert len(history) == 2
+
+    history.flush()
+    items, cursor = history.query()
+    assert [(i["class_name"], i["camera_id"], i["time"]) for i in items] == [("knife", 1, 1001.0), ("gun", 2, 1000.0)]
+    assert cursor is None
+    history.close()
+
+def test_append_does_not_wait_for_the_disk(tmp_path):
+    history = make_history(tmp_path)
+    history._lock.acquire()  # Stall the writer, as a slow disk would
+    try:
+        start = time.perf_counter()
+        for i in range(50):
+            history.append([Detection("gun", 0.9, 0, 0, 1, 1)], 1000.0 + i)
+        assert time.perf_counter() - start < 0.5
+    finally:
+        history._lock.release()
+    history.flush()
+    assert len(history.query(limit=100)[0]) == 50
+    history.close()
+
+def test_close_writes_queued_events(tmp_path):
+    history = make_history(tmp_path)
+    for i in range(10):
+        history.append([Detection("gun", 0.9, 0, 0, 1, 1)], 1000.0 + i)
+    history.close()
+
+    reopened = make_history(tmp_path)
+    assert len(reopened.query(limit=100)[0]) == 10
+    reopened.close()
+
+def test_old_rows_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr("stream_utils.detection_history._PRUNE_EVERY", 5)
+    history = make_history(tmp_path, retention_days=1)
+    history.append([Detection("gun", 0.9, 0, 0, 1, 1)], 0.0)
+    history.flush()
+    for i in range(5):
+        history.append([Detection("gun", 0.9, 0, 0, 1, 1)], 2 * 86400.0 + i)
+    history.close()
+
+    reopened = make_history(tmp_path)
+    assert [i["time"] for i in reopened.query()[0]][-1] == 2 * 86400.0
+    reopened.close()
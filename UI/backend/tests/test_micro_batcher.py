@@ -0,0 +1,56 @@
+import time
+import asyncio
+from stream_utils.micro_batcher import MicroBatcher
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_results_in_order():
+    async def main():
+        batcher = MicroBatcher(lambda items: [i * 2 for i in items], max_batch_size=4, max_wait_ms=5)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        batcher.close()
+        return results, batcher.batches_run
+
+    results, batches = run(main())
+    assert results == [i * 2 for i in range(10)]
+    assert batches == 3
+
+def test_next_batch_collected_while_one_runs():
+    batches = []
+
+    def process(items):
+        batches.append(list(items))
+        time.sleep(0.2)
+        return items
+
+    async def main():
+        batcher = MicroBatcher(process, max_batch_size=8, max_wait_ms=5)
+        first = asyncio.ensure_future(batcher.submit(0))
+        await asyncio.sleep(0.05)  # The first batch is running
+        start = time.perf_counter()
+        rest = await asyncio.gather(*(batcher.submit(i) for i in range(1, 4)))
+        elapsed = time.perf_counter() - start
+        await first
+        batcher.close()
+        return rest, elapsed
+
+    rest, elapsed = run(main())
+    assert rest == [1, 2, 3]
+    assert batches == [[0], [1, 2, 3]]
+    # Waited for the rest of the first batch and then its own, not more
+    assert elapsed < 0.4
+
+def test_batch_error_reaches_every_caller():
+    def process(items):
+        raise RuntimeError("model failed")
+
+    async def main():
+        batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=5)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+        # The worker keeps going after a failed batch
+        again = await asyncio.gather(batcher.submit(3), return_exceptions=True)
+        batcher.close()
+        return results + again
+
+    assert all(isinstance(r, RuntimeError) for r in run(main()))
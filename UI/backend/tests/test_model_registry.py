@@ -0,0 +1,62 @@
+import sys
+import time
+import types
+import threading
+import pytest
+from stream_utils.model_registry import ModelRegistry
+
+class FakeYOLO:
+    delay = 0.05
+
+    def __init__(self, path):
+        self.path = path
+        self.names = {0: "gun"}
+
+    def __call__(self, *args, **kwargs):
+        time.sleep(self.delay)
+        return []
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setitem(sys.modules, "ultralytics", types.SimpleNamespace(YOLO=FakeYOLO))
+    registry = ModelRegistry({name: (f"{name}.pt", 0) for name in ("base", "police", "weapon")}, warmup=False)
+    registry.start()
+    for name in ("base", "police", "weapon"):
+        registry.get(name, timeout=5)
+    return registry
+
+def test_background_lane_has_its_own_instances(registry):
+    with registry.acquire(lane="background") as background:
+        background["weapon"]()
+        state = registry._states["weapon"]
+        assert state.lane_models["background"] is not state.model
+        assert state.lane_models["background"].path == "weapon.pt"
+
+        # A long background call does not hold up the live stream
+        _, background_lock = state.instance("background")
+        with background_lock:
+            with registry.acquire() as live:
+                start = time.perf_counter()
+                live["weapon"]()
+                assert time.perf_counter() - start < 0.2
+    assert registry.status()["weapon"]["active"]["inference_count"] == 2
+
+def test_shadow_times_only_the_candidate_calls(registry):
+    registry.load_candidate("weapon", "weapon2.pt", shadow_rate=1.0)
+    candidate = registry._candidates["weapon"]
+    assert candidate.loaded.wait(5)
+
+    def run(models):
+        models["base"]()
+        models["weapon"]()
+        return []
+
+    # Another background user holds the base model while the shadow run starts
+    _, base_lock = registry._states["base"].instance("background")
+    base_lock.acquire()
+    threading.Timer(0.3, base_lock.release).start()
+    registry.run_shadow("weapon", run, [], 0.05)
+
+    shadow = registry.status()["weapon"]["shadow"]
+    assert shadow["frames"] == 1
+    assert shadow["candidate_model_ms"] < 200
@@ -0,0 +1,151 @@
+"""
+S3Uploader and save_image_s3 against a local S3 stand-in.
+
+By default S3 is mocked in-process with moto. To run against a real server
+such as MinIO instead, point S3_TEST_ENDPOINT_URL at it (credentials come
+from the usual AWS_* environment variables):
+
+    S3_TEST_ENDPOINT_URL=http://localhost:9000 python -m pytest tests/test_s3_uploader.py
+"""
+import os
+import uuid
+import logging
+import importlib
+import contextlib
+import numpy as np
+import pytest
+import boto3
+
+from stream_utils.s3_uploader import S3Uploader
+
+# The package re-exports the save_image function under the module's name
+save_image = importlib.import_module("stream_utils.save_image")
+
+ENDPOINT_URL = os.getenv("S3_TEST_ENDPOINT_URL") or None
+REGION = "us-east-1"
+
+@pytest.fixture
+def s3():
+    """An S3 client on the stand-in, with AWS credentials that never reach AWS"""
+    if ENDPOINT_URL:
+        context = contextlib.nullcontext()
+    else:
+        moto = pytest.importorskip("moto")
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        context = moto.mock_aws()
+    with context:
+        yield boto3.client("s3", region_name=REGION, endpoint_url=ENDPOINT_URL)
+
+@pytest.fixture
+def bucket(s3):
+    name = f"test-{uuid.uuid4().hex[:12]}"
+    s3.create_bucket(Bucket=name)
+    yield name
+    for obj in s3.list_objects_v2(Bucket=name).get("Contents", []):
+        s3.delete_object(Bucket=name, Key=obj["Key"])
+    s3.delete_bucket(Bucket=name)
+
+def make_uploader(bucket, tmp_path, **kwargs):
+    return S3Uploader(
+        bucket=bucket, region=REGION, endpoint_url=ENDPOINT_URL,
+        spool_dir=str(tmp_path / "spool"), **kwargs
+    )
+
+def spooled(tmp_path):
+    spool = tmp_path / "spool"
+    return sorted(p.relative_to(spool).as_posix() for p in spool.rglob("*") if p.is_file())
+
+def test_upload_bytes(s3, bucket, tmp_path):
+    uploader = make_uploader(bucket, tmp_path)
+    url = uploader.upload_bytes(b"jpeg data", "detections/a.jpg")
+
+    obj = s3.get_object(Bucket=bucket, Key="detections/a.jpg")
+    assert obj["Body"].read() == b"jpeg data"
+    assert obj["ContentType"] == "image/jpeg"
+    assert url == uploader.url_for("detections/a.jpg")
+    assert spooled(tmp_path) == []
+    uploader.shutdown()
+
+def test_submit_copies_buffer(s3, bucket, tmp_path):
+    uploader = make_uploader(bucket, tmp_path)
+    data = bytearray(b"first")
+    future = uploader.submit(memoryview(data), "detections/b.jpg")
+    data[:] = b"later"
+
+    assert future.result(timeout=10) == uploader.url_for("detections/b.jpg")
+    assert s3.get_object(Bucket=bucket, Key="detections/b.jpg")["Body"].read() == b"first"
+    uploader.shutdown()
+
+def test_multipart_upload(s3, bucket, tmp_path):
+    uploader = make_uploader(bucket, tmp_path, multipart_threshold=5 * 1024 * 1024)
+    data = os.urandom(11 * 1024 * 1024)
+    uploader.upload_bytes(data, "detections/big.bin")
+
+    assert s3.get_object(Bucket=bucket, Key="detections/big.bin")["Body"].read() == data
+    uploader.shutdown()
+
+def test_failed_upload_is_spooled_and_retried(s3, bucket, tmp_path):
+    uploader = make_uploader(bucket + "-missing", tmp_path)
+    uploader.upload_bytes(b"one", "detections/2024/01/02/c.jpg")
+    assert spooled(tmp_path) == ["detections/2024/01/02/c.jpg"]
+
+    # Still unreachable: the file stays for the next round
+    assert uploader.retry_spooled() == 0
+    assert spooled(tmp_path) == ["detections/2024/01/02/c.jpg"]
+
+    uploader.bucket = bucket
+    assert uploader.retry_spooled() == 1
+    assert spooled(tmp_path) == []
+    assert s3.get_object(Bucket=bucket, Key="detections/2024/01/02/c.jpg")["Body"].read() == b"one"
+    uploader.shutdown()
+
+def test_full_queue_spools(s3, bucket, tmp_path):
+    uploader = make_uploader(bucket, tmp_path, max_pending=1)
+    assert uploader._slots.acquire(blocking=False)  # Take the only slot, as a stuck upload would
+
+    future = uploader.submit(b"overflow", "detections/d.jpg")
+    assert future.result(timeout=1) == uploader.url_for("detections/d.jpg")
+    assert spooled(tmp_path) == ["detections/d.jpg"]
+    assert "Contents" not in s3.list_objects_v2(Bucket=bucket)
+
+    uploader._slots.release()
+    assert uploader.retry_spooled() == 1
+    uploader.shutdown()
+
+def test_missing_bucket_raises(tmp_path):
+    uploader = make_uploader("", tmp_path)
+    with pytest.raises(ValueError):
+        uploader.upload_bytes(b"data", "detections/e.jpg")
+    with pytest.raises(ValueError):
+        uploader.submit(b"data", "detections/e.jpg").result(timeout=10)
+    uploader.shutdown()
+
+@pytest.fixture
+def shared_uploader(monkeypatch):
+    def use(uploader):
+        monkeypatch.setattr(save_image, "_s3_uploader", uploader)
+        return uploader
+    return use
+
+def test_save_image_s3(s3, bucket, tmp_path, shared_uploader):
+    uploader = shared_uploader(make_uploader(bucket, tmp_path))
+    image = np.zeros((32, 32, 3), dtype=np.uint8)
+
+    url = save_image.save_image_s3(image, "f.jpg")
+    uploader.shutdown()
+
+    keys = [obj["Key"] for obj in s3.list_objects_v2(Bucket=bucket)["Contents"]]
+    assert len(keys) == 1 and url == uploader.url_for(keys[0])
+    assert keys[0].startswith("detections/") and keys[0].endswith("/f.jpg")
+    assert s3.get_object(Bucket=bucket, Key=keys[0])["Body"].read()[:2] == b"\xff\xd8"
+
+def test_save_image_s3_logs_failure(tmp_path, shared_uploader, caplog):
+    uploader = shared_uploader(make_uploader("", tmp_path))
+    image = np.zeros((32, 32, 3), dtype=np.uint8)
+
+    with caplog.at_level(logging.ERROR, logger=save_image.logger.name):
+        save_image.save_image_s3(image, "g.jpg")
+        uploader.shutdown()
+
+    assert any("g.jpg failed" in r.getMessage() and "S3_BUCKET_NAME" in r.getMessage() for r in caplog.records)
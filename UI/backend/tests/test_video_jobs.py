@@ -0,0 +1,32 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from stream_utils import video_jobs
+from stream_utils.video_jobs import VideoJobManager
+
+def test_jobs_cancelled_at_shutdown_resume(tmp_path, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def run_job(jobs_dir, job_id, batch_size):
+        started.set()
+        release.wait(5)
+        return "done"
+
+    monkeypatch.setattr(video_jobs, "_run_video_job", run_job)
+    manager = VideoJobManager(jobs_dir=str(tmp_path), max_workers=1)
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(manager, "_pool", lambda: pool)
+
+    running = manager.submit("a.mp4")
+    started.wait(5)
+    waiting = manager.submit("b.mp4")
+    pool.shutdown(wait=False, cancel_futures=True)
+    release.set()
+    pool.shutdown(wait=True)
+
+    assert manager.get(running)["status"] == "queued"  # The job itself would have set it
+    assert manager.get(waiting)["status"] == "cancelled"
+
+    scheduled = []
+    monkeypatch.setattr(manager, "_schedule", scheduled.append)
+    assert manager.resume_incomplete() == 2
+    assert waiting in scheduled
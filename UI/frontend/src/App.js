@@ -58,89 +58,121 @@ function App() {
     }));
   };
 
-  useEffect(() => {
-    // Keep-alive function to maintain the stream
-    const keepAlive = async () => {
-      try {
-        const response = await fetch(`${API_URL}/video/keep-alive`);
-        if (response.ok) {
-          setConnectionError(false);
-          setIsStreaming(true);
-        } else {
-          setConnectionError(true);
-          setIsStreaming(false);
-        }
-      } catch (error) {
-        console.error('Keep-alive error:', error);
-        setConnectionError(true);
-        setIsStreaming(false);
+  // Update the alert, log and stats from a pushed detection event
+  const handleDetections = (detections) => {
+    if (detections && detections.length > 0) {
+      const dangerous = detections.filter(detection => 
+        DANGEROUS_CLASSES.some(className => 
+          detection.class_name.toLowerCase().includes(className)
+        )
+      );
+      
+      if (dangerous.length > 0) {
+        const currentTime = new Date();
+        setDangerousDetections(dangerous);
+        setLastDetectionTime(currentTime);
+        
+        // Update detection log
+        setDetectionLog(prev => {
+          const newLog = [
+            ...dangerous.map(detection => ({
+              ...detection,
+              timestamp: currentTime
+            })),
+            ...prev
+          ].slice(0, 50); // Keep last 50 detections
+          return newLog;
+        });
+
+        setStats(prev => ({
+          highestThreatLevel: Math.max(prev.highestThreatLevel, 
+            Math.max(...dangerous.map(d => d.confidence * 100))
+          ),
+          lastHourDetections: prev.lastHourDetections + dangerous.length,
+        }));
+      } else {
+        setDangerousDetections([]);
+        setPreviousDetections([]);
       }
+    } else {
+      setDangerousDetections([]);
+      setPreviousDetections([]);
+    }
+  };
+
+  useEffect(() => {
+    // Subscribe to pushed detections. An open subscription also keeps the
+    // backend stream alive, so no polling or keep-alive requests are needed.
+    let socket = null;
+    let eventSource = null;
+    let reconnectTimer = null;
+    let closed = false;
+
+    const onConnected = () => {
+      setConnectionError(false);
+      setIsStreaming(true);
     };
 
-    // Call keep-alive immediately
-    keepAlive();
+    const onDisconnected = () => {
+      setConnectionError(true);
+      setIsStreaming(false);
+      if (!closed) {
+        reconnectTimer = setTimeout(connect, 5000);
+      }
+    };
 
-    // Set up interval to call keep-alive every 30 seconds
-    const keepAliveInterval = setInterval(keepAlive, 30000);
+    const onMessage = (data) => {
+      if (data.type === 'detections') {
+        handleDetections(data.detections);
+      }
+    };
 
-    // Set up polling for detections
-    const detectionsInterval = setInterval(async () => {
-      if (isStreaming) {
-        try {
-          const response = await fetch(`${API_URL}/latest-detections`);
-          if (response.ok) {
-            const data = await response.json();
-            if (data.detections && data.detections.length > 0) {
-              const dangerous = data.detections.filter(detection => 
-                DANGEROUS_CLASSES.some(className => 
-                  detection.class_name.toLowerCase().includes(className)
-                )
-              );
-              
-              if (dangerous.length > 0) {
-                const currentTime = new Date();
-                setDangerousDetections(dangerous);
-                setLastDetectionTime(currentTime);
-                
-                // Update detection log
-                setDetectionLog(prev => {
-                  const newLog = [
-                    ...dangerous.map(detection => ({
-                      ...detection,
-                      timestamp: currentTime
-                    })),
-                    ...prev
-                  ].slice(0, 50); // Keep last 50 detections
-                  return newLog;
-                });
+    // Server-Sent Events fallback when WebSockets are unavailable
+    const connectEventSource = () => {
+      eventSource = new EventSource(`${API_URL}/detections/events`);
+      eventSource.onopen = onConnected;
+      eventSource.addEventListener('detections', (event) => onMessage(JSON.parse(event.data)));
+      eventSource.onerror = () => {
+        eventSource.close();
+        eventSource = null;
+        onDisconnected();
+      };
+    };
 
-                setStats(prev => ({
-                  highestThreatLevel: Math.max(prev.highestThreatLevel, 
-                    Math.max(...dangerous.map(d => d.confidence * 100))
-                  ),
-                  lastHourDetections: prev.lastHourDetections + dangerous.length,
-                }));
-              } else {
-                setDangerousDetections([]);
-                setPreviousDetections([]);
-              }
-            } else {
-              setDangerousDetections([]);
-              setPreviousDetections([]);
-            }
-          }
-        } catch (error) {
-          console.error('Failed to fetch detections:', error);
-        }
+    const connect = () => {
+      if (!('WebSocket' in window)) {
+        connectEventSource();
+        return;
       }
-    }, 1000); // Poll every second
+      let opened = false;
+      socket = new WebSocket(`${API_URL.replace(/^http/, 'ws')}/detections/ws`);
+      socket.onopen = () => {
+        opened = true;
+        onConnected();
+      };
+      socket.onmessage = (event) => onMessage(JSON.parse(event.data));
+      socket.onclose = () => {
+        socket = null;
+        if (closed) return;
+        if (!opened) {
+          // WebSocket blocked (e.g. by a proxy), fall back to SSE
+          connectEventSource();
+        } else {
+          onDisconnected();
+        }
+      };
+    };
+
+    connect();
 
     // Clean up on component unmount
     return () => {
-      clearInterval(keepAliveInterval);
-      clearInterval(detectionsInterval);
+      closed = true;
+      clearTimeout(reconnectTimer);
+      if (socket) socket.close();
+      if (eventSource) eventSource.close();
     };
-  }, [isStreaming]);
+  }, []);
 
   // Calculate if notification should be shown (show for 5 minutes after detection)
   const shouldShowNotification = lastDetectionTime && 
@@ -0,0 +1,120 @@
+"""
+Benchmark time to first output for a short clip: a fresh
+`python videoToImage.py videoShots ...` per run (how the app used to run
+jobs) against jobs sent to a running curation_daemon.py, both its first
+(cold) job and a later (warm) one.
+
+"first output" is the first progress event, i.e. the first batch of frames
+has gone through the model.
+
+Usage:
+    python bench_daemon.py /path/to/folder_with_a_short_clip [--runs 3] [--frame-interval 10]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def first_output_spawn(folder, out, classes, frame_interval):
+    # Returns (seconds to the first progress event, seconds to exit)
+    start = time.perf_counter()
+    py = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "videoToImage.py"), "videoShots", "False",
+         folder, out, *classes, str(frame_interval), "0.55"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    first = None
+    for line in py.stdout:
+        if first is None and line.startswith('{"event": "progress"'):
+            first = time.perf_counter() - start
+    py.wait()
+    return first, time.perf_counter() - start
+
+class Daemon:
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "curation_daemon.py")],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        self._next_id = 0
+        self._wait_for(lambda event: event.get("event") == "ready")
+
+    def _wait_for(self, match):
+        for line in self.proc.stdout:
+            event = json.loads(line)
+            if match(event):
+                return event
+        raise RuntimeError("Curation daemon exited")
+
+    def run(self, folder, out, classes, frame_interval):
+        self._next_id += 1
+        job_id = str(self._next_id)
+        start = time.perf_counter()
+        self.proc.stdin.write(json.dumps({
+            "id": job_id, "command": "run", "mode": "videoShots", "draw_boxes": False,
+            "input_folder": folder, "output_folder": out, "classes": classes,
+            "frame_interval": frame_interval, "confidence_level": 0.55,
+        }) + "\n")
+        self.proc.stdin.flush()
+        self._wait_for(lambda event: event.get("id") == job_id and event.get("event") == "progress")
+        first = time.perf_counter() - start
+        result = self._wait_for(lambda event: event.get("id") == job_id and event.get("event") == "result")
+        if result["status"] != "done":
+            raise RuntimeError(result["message"])
+        return first, time.perf_counter() - start
+
+    def close(self):
+        self.proc.stdin.write(json.dumps({"command": "shutdown"}) + "\n")
+        self.proc.stdin.close()
+        self.proc.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", help="Folder with a short clip")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--frame-interval", type=int, default=10)
+    parser.add_argument("--classes", nargs="+", default=["pistol", "gun"])
+    args = parser.parse_args()
+
+    def fresh_output():
+        out = tempfile.mkdtemp()
+        outputs.append(out)
+        return out
+
+    outputs = []
+    try:
+        spawn = [first_output_spawn(args.folder, fresh_output(), args.classes, args.frame_interval)
+                 for _ in range(args.runs)]
+
+        start = time.perf_counter()
+        daemon = Daemon()
+        ready = time.perf_counter() - start
+        try:
+            cold = daemon.run(args.folder, fresh_output(), args.classes, args.frame_interval)
+            warm = [daemon.run(args.folder, fresh_output(), args.classes, args.frame_interval)
+                    for _ in range(args.runs)]
+        finally:
+            daemon.close()
+
+        def row(name, results):
+            first = sum(r[0] for r in results) / len(results)
+            total = sum(r[1] for r in results) / len(results)
+            print(f"  {name:14s} first output {first:6.2f}s  total {total:6.2f}s  ({len(results)} runs)")
+
+        print(f"{args.folder}: videoShots, every {args.frame_interval}th frame")
+        row("spawn", spawn)
+        print(f"  {'daemon start':14s} ready        {ready:6.2f}s")
+        row("daemon cold", [cold])
+        row("daemon warm", warm)
+    finally:
+        for out in outputs:
+            shutil.rmtree(out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark near-duplicate removal on a copy of an image folder:
+
+  hash cold      hash every image, no sidecar cache
+  hash cached    rerun with the sidecar cache in place
+  index          Hamming-radius query of every image against all others,
+                 against a linear scan (timed on a sample, scaled up)
+  dedupe         the whole dedupe_images run, duplicates moved aside
+
+and how many images the byte-identical MD5 check would have removed.
+
+Usage:
+    python bench_dedupe.py /path/to/images [--max-distance 6] [--hash dhash]
+"""
+import argparse
+import glob
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+import dedupe
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder")
+    parser.add_argument("--max-distance", type=int, default=6)
+    parser.add_argument("--hash", choices=dedupe.HASH_METHODS, default="dhash")
+    parser.add_argument("--linear-sample", type=int, default=200)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    try:
+        folder = os.path.join(work, "images")
+        shutil.copytree(args.folder, folder, ignore=shutil.ignore_patterns(dedupe.CACHE_NAME))
+
+        hashes, cold = timed(dedupe.hash_folder, folder, method=args.hash)
+        _, cached = timed(dedupe.hash_folder, folder, method=args.hash)
+        count = len(hashes)
+
+        def query_all():
+            index = dedupe.HammingIndex()
+            for name, (image_hash, _) in hashes.items():
+                index.add(image_hash, name)
+            return sum(len(index.search(image_hash, args.max_distance)) > 1 for image_hash, _ in hashes.values())
+        with_neighbors, index_time = timed(query_all)
+
+        values = [image_hash for image_hash, _ in hashes.values()]
+        sample = values[:args.linear_sample]
+        _, linear = timed(lambda: [[h for h in values if dedupe.hamming(q, h) <= args.max_distance] for q in sample])
+        linear *= count / max(1, len(sample))
+
+        exact = set()
+        for path in glob.glob(os.path.join(folder, "*.jpg")):
+            with open(path, "rb") as f:
+                exact.add(hashlib.md5(f.read()).hexdigest())
+
+        with redirect_stdout(io.StringIO()):
+            stats, total = timed(dedupe.dedupe_images, folder, max_distance=args.max_distance,
+                                 move_to=os.path.join(work, "duplicates"), method=args.hash)
+
+        print(f"{args.folder}: {count} images, {args.hash}, max distance {args.max_distance}")
+        print(f"  hash cold      {cold:8.2f}s  ({count / cold:7.0f} images/s)")
+        print(f"  hash cached    {cached:8.2f}s")
+        print(f"  index          {index_time:8.2f}s  ({with_neighbors} images have a near-duplicate)")
+        print(f"  linear scan    {linear:8.2f}s  (estimated from {len(sample)} queries)")
+        print(f"  dedupe         {total:8.2f}s  ({stats['duplicates']} near-duplicates removed, "
+              f"MD5 would remove {count - len(exact)})")
+    finally:
+        shutil.rmtree(work)
+
+if __name__ == "__main__":
+    main()
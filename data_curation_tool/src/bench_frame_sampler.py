@@ -0,0 +1,70 @@
+"""
+Benchmark scene-change sampling against every-nth-frame sampling on a
+local video:
+
+  frames inferred   frames that go through the model
+  redundant         sampled frames within 4 dHash bits of the previous sample
+  sampling          frames/s of the sampling alone, without the model
+  process_video     the full run, model included
+
+Usage:
+    python bench_frame_sampler.py /path/to/video.mp4 [--frame-interval 10] [--min-gap 5] [--max-gap 300]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+import cv2
+import dedupe
+import frame_sampler
+import videoToImage
+
+def sampled(video, scene_options, frame_interval):
+    cap = cv2.VideoCapture(video)
+    start = time.perf_counter()
+    if scene_options is None:
+        frames = videoToImage._sampled_frames(cap, frame_interval)
+    else:
+        frames = frame_sampler.scene_frames(cap, frame_sampler.SceneChangeSampler(**scene_options))
+    hashes = [dedupe.dhash(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)) for _, frame in frames]
+    seconds = time.perf_counter() - start
+    cap.release()
+    redundant = sum(dedupe.hamming(a, b) <= 4 for a, b in zip(hashes, hashes[1:]))
+    return len(hashes), redundant, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video")
+    parser.add_argument("--frame-interval", type=int, default=10)
+    parser.add_argument("--min-gap", type=int, default=5)
+    parser.add_argument("--max-gap", type=int, default=300)
+    parser.add_argument("--change-threshold", type=float, default=0.06)
+    parser.add_argument("--classes", nargs="+", default=["pistol", "gun"])
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.video)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    ok, first = cap.read()
+    cap.release()
+    if not ok:
+        raise SystemExit(f"Could not read {args.video}")
+    # Warm up the model so neither run pays for initialization
+    videoToImage.get_model()(first, verbose=False)
+
+    scene_options = dict(min_gap=args.min_gap, max_gap=args.max_gap, change_threshold=args.change_threshold)
+    print(f"{args.video}: {total} frames")
+    for name, options in ((f"every {args.frame_interval}th", None), ("scene changes", scene_options)):
+        inferred, redundant, seconds = sampled(args.video, options, args.frame_interval)
+        out = tempfile.mkdtemp()
+        try:
+            start = time.perf_counter()
+            saved = videoToImage.process_video(args.video, out, args.classes, args.frame_interval, False,
+                                               progress=lambda *_: None, scene_options=options)
+            full = time.perf_counter() - start
+        finally:
+            shutil.rmtree(out)
+        print(f"  {name:14s} frames inferred {inferred:6d}  redundant {redundant:6d}  "
+              f"sampling {total / seconds:7.1f} frames/s  process_video {full:6.2f}s ({saved} saved)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark the inference cache on an image folder (nothing is deleted):
+
+  no cache       decode and run the model on every image, as filterImages did
+  cache, cold    same, storing the raw detections
+  cache, warm    a rerun over the unchanged folder, served from the cache
+
+and check that the warm run keeps the same images as the uncached one at a
+few confidence thresholds.
+
+Usage:
+    python bench_inference_cache.py /path/to/images [--classes pistol gun] [--batch-size 16]
+"""
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import inference_cache
+import videoToImage
+
+def run(paths, batch_size, cache):
+    model = videoToImage.get_model()
+    start = time.perf_counter()
+    boxes = {path: b for path, b, _ in inference_cache.detect_images(model, videoToImage.MODEL_PATH, paths,
+                                                                     batch_size=batch_size, cache=cache)}
+    return boxes, time.perf_counter() - start
+
+def kept(boxes, valid_ids, threshold):
+    return {path for path, b in boxes.items()
+            if b is not None and np.any((b[:, 4] >= threshold) & np.isin(b[:, 5].astype(int), valid_ids))}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder")
+    parser.add_argument("--classes", nargs="+", default=["pistol", "gun"])
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.folder, "*.jpg")))
+    model = videoToImage.get_model()
+    valid_ids = videoToImage._valid_class_ids(model, args.classes)
+    # Warm up the model so no run pays for initialization
+    run(paths[:1], 1, None)
+
+    work = tempfile.mkdtemp()
+    try:
+        cache = inference_cache.InferenceCache(os.path.join(work, "inference.sqlite"))
+        uncached, plain = run(paths, args.batch_size, None)
+        _, cold = run(paths, args.batch_size, cache)
+        warm_boxes, warm = run(paths, args.batch_size, cache)
+        size_mb = cache.size_bytes() / 1e6
+        cache.close()
+
+        print(f"{args.folder}: {len(paths)} images, batch size {args.batch_size}")
+        print(f"  no cache      {plain:8.2f}s  ({len(paths) / plain:7.1f} images/s)")
+        print(f"  cache, cold   {cold:8.2f}s")
+        print(f"  cache, warm   {warm:8.2f}s  ({len(paths) / warm:7.1f} images/s, cache ~{size_mb:.1f} MB)")
+        for threshold in (0.25, 0.55, 0.8):
+            same = kept(uncached, valid_ids, threshold) == kept(warm_boxes, valid_ids, threshold)
+            print(f"  same images kept at conf {threshold}: {same}")
+    finally:
+        shutil.rmtree(work)
+
+if __name__ == "__main__":
+    main()
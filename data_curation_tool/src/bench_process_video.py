@@ -0,0 +1,78 @@
+"""
+Benchmark process_video on a local MP4: the previous loop (decode every
+frame, one model call per sampled frame, JPEG writes inline) against the
+current one (grab() for skipped frames, batched inference, writer thread).
+
+Usage:
+    python bench_process_video.py /path/to/video.mp4 [--frame-interval 10] [--batch-size 16]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import cv2
+import videoToImage
+
+def legacy_process_video(video_path, save_folder, valid_classes, frame_interval, draw_boxes):
+    # process_video as it was before the fast path
+    cap = cv2.VideoCapture(video_path)
+    frame_count = 0
+    saved_count = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_count % frame_interval == 0:
+            annotated_images = videoToImage.annotate_image(
+                frame, valid_classes=valid_classes, conf_threshold=0.55, draw_boxes=draw_boxes
+            )
+            for i, img in enumerate(annotated_images):
+                video_name = os.path.splitext(os.path.basename(video_path))[0]
+                cv2.imwrite(os.path.join(save_folder, f"{video_name}_frame{frame_count}_detection{i}.jpg"), img)
+                saved_count += 1
+        frame_count += 1
+    cap.release()
+    return frame_count
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video")
+    parser.add_argument("--frame-interval", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--classes", nargs="+", default=["pistol", "gun"])
+    parser.add_argument("--no-boxes", action="store_true")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.video)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    ok, first = cap.read()
+    cap.release()
+    if not ok:
+        raise SystemExit(f"Could not read {args.video}")
+    draw = not args.no_boxes
+
+    # Warm up the model so neither run pays for initialization
+    videoToImage.get_model()(first, verbose=False)
+
+    before_dir, after_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+    try:
+        before = timed(legacy_process_video, args.video, before_dir, args.classes, args.frame_interval, draw)
+        after = timed(videoToImage.process_video, args.video, after_dir, args.classes, args.frame_interval, draw,
+                      batch_size=args.batch_size)
+        saved_before, saved_after = sorted(os.listdir(before_dir)), sorted(os.listdir(after_dir))
+        print(f"{args.video}: {total} frames, every {args.frame_interval}th sampled, batch size {args.batch_size}")
+        print(f"  before  {total / before:8.1f} frames/s  ({before:.2f}s, {len(saved_before)} images)")
+        print(f"  after   {total / after:8.1f} frames/s  ({after:.2f}s, {len(saved_after)} images)")
+        print(f"  same images saved: {saved_before == saved_after}")
+    finally:
+        shutil.rmtree(before_dir)
+        shutil.rmtree(after_dir)
+
+if __name__ == "__main__":
+    main()
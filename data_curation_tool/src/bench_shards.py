@@ -0,0 +1,92 @@
+"""
+Benchmark tar shards against loose JPEGs, on the images of a folder:
+
+  write          encode and write every image (with its metadata for shards)
+                 on the writer thread, as process_video does
+  read           read back every image and its metadata sequentially
+  random read    read a sample of images by key, through the shard index
+
+with the number of files each layout leaves on disk. Read the images from a
+different disk or share than /tmp with --work to see what the file count costs.
+
+Usage:
+    python bench_shards.py /path/to/images [--shard-mb 256] [--work /mnt/share/tmp]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import cv2
+import shards
+import videoToImage
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def write_loose(folder, images):
+    writer = videoToImage.ImageWriter()
+    for key, image in images:
+        writer.write(os.path.join(folder, key + ".jpg"), image)
+        writer.write_text(os.path.join(folder, key + ".json"), json.dumps({"key": key}))
+    writer.close()
+
+def write_shards(folder, images, max_bytes):
+    writer = shards.ShardWriter(folder, "bench", max_bytes=max_bytes)
+    for key, image in images:
+        writer.write(key, image, {"key": key})
+    writer.close()
+
+def read_loose(folder):
+    count = 0
+    for path in sorted(glob.glob(os.path.join(folder, "*.jpg"))):
+        with open(path, "rb") as f:
+            f.read()
+        with open(os.path.splitext(path)[0] + ".json") as f:
+            json.load(f)
+        count += 1
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder")
+    parser.add_argument("--shard-mb", type=float, default=256)
+    parser.add_argument("--work", default=None, help="Folder to write to, a temporary one by default")
+    parser.add_argument("--random-sample", type=int, default=500)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.folder, "*.jpg")))
+    images = [(os.path.splitext(os.path.basename(p))[0], cv2.imread(p)) for p in paths]
+    images = [(key, image) for key, image in images if image is not None]
+
+    work = tempfile.mkdtemp(dir=args.work)
+    try:
+        loose, sharded = os.path.join(work, "loose"), os.path.join(work, "shards")
+        os.makedirs(loose)
+        _, loose_write = timed(write_loose, loose, images)
+        _, shard_write = timed(write_shards, sharded, images, int(args.shard_mb * 1024 * 1024))
+
+        loose_count, loose_read = timed(read_loose, loose)
+        shard_count, shard_read = timed(lambda: sum(1 for _ in shards.iter_samples(sharded, decode=False)))
+
+        indexes = {path: shards.load_index(path) for path in shards.shard_paths(sharded)}
+        keys = [(path, key) for path, index in indexes.items() for key in index]
+        sample = random.Random(0).sample(keys, min(args.random_sample, len(keys)))
+        _, random_read = timed(lambda: [shards.read_sample(path, key, indexes[path], decode=False) for path, key in sample])
+
+        print(f"{args.folder}: {len(images)} images, shards of {args.shard_mb:g} MB")
+        print(f"  {'':14}{'loose':>10}{'shards':>10}")
+        print(f"  {'files':14}{len(os.listdir(loose)):>10}{len(os.listdir(sharded)):>10}")
+        print(f"  {'write':14}{loose_write:>9.2f}s{shard_write:>9.2f}s")
+        print(f"  {'read':14}{loose_read:>9.2f}s{shard_read:>9.2f}s  ({loose_count} / {shard_count} samples)")
+        print(f"  random read   {len(sample)} samples through the index in {random_read:.3f}s")
+    finally:
+        shutil.rmtree(work)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Long-running curation worker for the Electron app. Models stay loaded
+between runs, so a job does not pay for interpreter start, the torch import
+and model load every time.
+
+Jobs are JSON lines on stdin, answers are JSON lines on stdout.
+
+Requests:
+  {"id": "1", "command": "run", "mode": "videoShots", "input_folder": "...", "output_folder": "...",
+   "classes": ["pistol", "gun"], "frame_interval": 10, "confidence_level": 0.55, "draw_boxes": true,
+   "workers": 1, "model": "best.pt"}
+  {"id": "2", "command": "run", "mode": "dedupe", "input_folder": "...", "output_folder": "",
+   "max_distance": 6, "keep": "sharpest", "hash": "dhash"}
+  {"id": "1", "command": "cancel"}
+  {"command": "shutdown"}
+
+Modes are the same as videoToImage.py's (videoShots, sceneShots,
+filterImages, dedupe). For sceneShots, frame_interval is the minimum gap and
+"max_gap" and "change_threshold" can be given. "export_yolo": true writes a
+YOLO dataset from videoShots/sceneShots ("val_fraction", "include_negatives")
+and label files from filterImages. videoShots/sceneShots resume from the
+manifest of an earlier run in output_folder unless "resume" is false, and
+include subfolders unless "recursive" is false. "shards": true writes their
+detection images to tar shards of about "shard_mb" MB instead of loose JPEGs. For dedupe, output_folder is
+where duplicates are moved ("" deletes them).
+With "workers" > 1, the worker processes are kept between jobs, one pool
+per model, so only the first such job pays for starting them and loading
+the model in each. Changing the worker count for a model restarts its pool.
+Jobs run one at a time in arrival order and any number can be queued.
+Cancelling a queued job drops it, cancelling the running one stops it after
+its current batch.
+
+Answers, tagged with the job id:
+  {"event": "ready"}                             once, at startup
+  {"id", "event": "queued", "position"}
+  {"id", "event": "started"}
+  {"id", "event": "log", "message"}             a line the job printed
+  {"id", "event": "progress" | "video_done" | "error" | "done" | "cancelled", ...}
+                                                 videoShots/sceneShots progress, as in spawn mode
+  {"id", "event": "result", "status": "done" | "cancelled" | "error", "message"}
+
+Usage:
+    python curation_daemon.py
+"""
+import os
+import io
+import sys
+import json
+import threading
+import traceback
+from collections import deque
+from contextlib import redirect_stdout
+import videoToImage
+import inference_cache
+
+MODES = ("videoShots", "sceneShots", "filterImages", "dedupe")
+
+class _Job:
+    def __init__(self, job_id, request):
+        self.id = job_id
+        self.request = request
+        self.cancel_event = threading.Event()
+
+class _LogWriter(io.TextIOBase):
+    """
+    Turn what a job prints into log events.
+    """
+    def __init__(self, daemon, job_id):
+        self._daemon = daemon
+        self._job_id = job_id
+        self._partial = ""
+
+    def write(self, text):
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._daemon.send(id=self._job_id, event="log", message=line)
+        return len(text)
+
+    def flush(self):
+        if self._partial:
+            self._daemon.send(id=self._job_id, event="log", message=self._partial)
+            self._partial = ""
+
+class CurationDaemon:
+    def __init__(self, out):
+        """
+        :param out: Text stream the JSON answers are written to
+        """
+        self._out = out
+        self._out_lock = threading.Lock()
+        self._queue = deque()
+        self._current = None
+        self._stopping = False
+        self._pools = {}  # Model path -> videoToImage.WorkerPool, kept between jobs
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run_jobs, daemon=True)
+
+    def send(self, **fields):
+        with self._out_lock:
+            self._out.write(json.dumps(fields) + "\n")
+            self._out.flush()
+
+    def submit(self, request):
+        job_id = request.get("id")
+        mode = request.get("mode")
+        if mode not in MODES:
+            self.send(id=job_id, event="result", status="error", message=f"Unknown mode '{mode}'! Use one of {', '.join(MODES)}.")
+            return
+        with self._cond:
+            self._queue.append(_Job(job_id, request))
+            position = len(self._queue) + (self._current is not None)
+            self._cond.notify()
+        self.send(id=job_id, event="queued", position=position)
+
+    def cancel(self, job_id=None):
+        """
+        Cancel a job by id, or every job when job_id is None.
+        """
+        with self._cond:
+            dropped = [job for job in self._queue if job_id is None or job.id == job_id]
+            for job in dropped:
+                self._queue.remove(job)
+            if self._current is not None and (job_id is None or self._current.id == job_id):
+                self._current.cancel_event.set()
+        for job in dropped:
+            self.send(id=job.id, event="result", status="cancelled", message="Cancelled before it started.")
+
+    def _run_jobs(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                job = self._current = self._queue.popleft()
+            try:
+                self._run(job)
+            finally:
+                with self._cond:
+                    self._current = None
+
+    def _run(self, job):
+        self.send(id=job.id, event="started")
+        log = _LogWriter(self, job.id)
+        try:
+            with redirect_stdout(log):
+                completed = self._dispatch(job)
+            log.flush()
+            status = "done" if completed else "cancelled"
+            self.send(id=job.id, event="result", status=status, message=f"{job.request['mode']} {status}.")
+        except Exception as e:
+            log.flush()
+            traceback.print_exc(file=sys.stderr)
+            self.send(id=job.id, event="result", status="error", message=str(e))
+
+    def _worker_pool(self, model_path, workers):
+        """
+        The worker pool for a model, started on first use and replaced if it
+        has the wrong size or was left unusable by a cancel.
+        """
+        pool = self._pools.get(model_path)
+        if pool is not None and (pool.broken or pool.workers != workers):
+            pool.close()
+            pool = None
+        if pool is None:
+            pool = self._pools[model_path] = videoToImage.WorkerPool(workers)
+        return pool
+
+    def _dispatch(self, job):
+        r = job.request
+        classes = r.get("classes") or ["pistol", "gun"]
+        conf = float(r.get("confidence_level", 0.55))
+        model_path = r.get("model")
+        if r["mode"] in ("videoShots", "sceneShots"):
+            scene_options = None
+            if r["mode"] == "sceneShots":
+                scene_options = dict(
+                    min_gap=int(r.get("frame_interval", 10)),
+                    max_gap=int(r.get("max_gap", os.getenv("SCENE_MAX_GAP", "300"))),
+                    change_threshold=float(r.get("change_threshold", os.getenv("SCENE_CHANGE", "0.06"))),
+                )
+            export_options = None
+            if r.get("export_yolo"):
+                export_options = dict(
+                    val_fraction=float(r.get("val_fraction", os.getenv("VAL_FRACTION", "0.2"))),
+                    include_negatives=bool(r.get("include_negatives", False)),
+                    cache_path=inference_cache.DEFAULT_PATH,
+                )
+            workers = int(r.get("workers", 1))
+            shard_options = None
+            if r.get("shards"):
+                shard_options = dict(max_bytes=int(float(r.get("shard_mb", os.getenv("SHARD_MB", "256"))) * 1024 * 1024))
+            return videoToImage.process_videos_in_folder(
+                r["input_folder"], r["output_folder"],
+                valid_classes=classes,
+                frame_interval=int(r.get("frame_interval", 10)),
+                draw_boxes=bool(r.get("draw_boxes", True)),
+                conf_threshold=conf,
+                batch_size=int(r.get("batch_size", os.getenv("BATCH_SIZE", "16"))),
+                workers=workers,
+                chunk_frames=int(r.get("chunk_frames", os.getenv("CHUNK_FRAMES", "9000"))),
+                cancel_event=job.cancel_event,
+                on_event=lambda event: self.send(id=job.id, **event),
+                model_path=model_path,
+                scene_options=scene_options,
+                export_options=export_options,
+                recursive=bool(r.get("recursive", True)),
+                resume=bool(r.get("resume", True)),
+                shard_options=shard_options,
+                pool=self._worker_pool(model_path, workers) if workers > 1 else None,
+            )
+        if r["mode"] == "filterImages":
+            return videoToImage.filter_images(
+                r["input_folder"], valid_classes=classes, conf_threshold=conf,
+                cancel_event=job.cancel_event, model_path=model_path,
+                batch_size=int(r.get("batch_size", os.getenv("BATCH_SIZE", "16"))),
+                write_labels=bool(r.get("export_yolo", False)),
+            )
+        return videoToImage.dedupe_images(
+            r["input_folder"],
+            max_distance=int(r.get("max_distance", os.getenv("DEDUPE_DISTANCE", "6"))),
+            keep=r.get("keep", os.getenv("DEDUPE_KEEP", "sharpest")),
+            move_to=r.get("output_folder") or None,
+            method=r.get("hash", os.getenv("DEDUPE_HASH", "dhash")),
+            valid_classes=classes, cancel_event=job.cancel_event, model_path=model_path,
+        ) is not None
+
+    def serve(self, lines):
+        """
+        Handle requests until shutdown or the end of input, then cancel what
+        is left and wait for the running job to stop.
+        """
+        self._thread.start()
+        self.send(event="ready")
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self.send(event="error", message=f"Not JSON: {line[:200]}")
+                continue
+            command = request.get("command")
+            if command == "run":
+                self.submit(request)
+            elif command == "cancel":
+                self.cancel(request.get("id"))
+            elif command == "shutdown":
+                break
+            else:
+                self.send(id=request.get("id"), event="error", message=f"Unknown command '{command}'")
+        self.cancel()
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
+        for pool in self._pools.values():
+            pool.close()
+
+def main():
+    # Answers get their own copy of stdout. Anything else written to stdout
+    # (libraries, stray prints) goes to stderr so it can't break the protocol.
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    CurationDaemon(protocol).serve(sys.stdin)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""
+Perceptual near-duplicate removal for image folders.
+
+Every image gets a 64-bit dHash or pHash, computed on a reduced decode in a
+thread pool and cached in a sidecar file (.dedupe_hashes.json) so reruns
+only hash new or changed files. Images within max_distance differing bits of
+each other are duplicates; of each such group the best one is kept (the
+sharpest, or the highest confidence when a score function is given) and the
+rest are deleted or moved.
+"""
+import os
+import cv2
+import glob
+import json
+import time
+import shutil
+import numpy as np
+from itertools import combinations
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_METHODS = ("dhash", "phash")
+KEEP_MODES = ("sharpest", "confidence")
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+CACHE_NAME = ".dedupe_hashes.json"
+CACHE_VERSION = 1
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+def dhash(gray):
+    """
+    64-bit difference hash: is each pixel of a 9x8 thumbnail brighter than its right neighbour.
+    """
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+def phash(gray):
+    """
+    64-bit perceptual hash: the 8x8 lowest frequencies of a 32x32 DCT against their median.
+    """
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    # The DC term is the mean brightness, leave it out of the median
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+def _hash_image(path, method):
+    # JPEGs are decoded at 1/4 size straight from the DCT, a fraction of a full decode
+    gray = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        return None
+    image_hash = dhash(gray) if method == "dhash" else phash(gray)
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_32F).var())
+    return image_hash, sharpness
+
+class HammingIndex:
+    def __init__(self, blocks=4, bits=64):
+        """
+        Multi-index hash tables for Hamming-radius queries over 64-bit hashes.
+
+        Each hash is split into `blocks` blocks with one table per block. Two
+        hashes within radius r agree within r // blocks bits on at least one
+        block, so a query only looks at the buckets of its own blocks with up
+        to r // blocks bits flipped, instead of every stored hash.
+
+        :param blocks: Number of blocks (and tables)
+        :param bits: Hash length
+        """
+        self.width = bits // blocks
+        self.mask = (1 << self.width) - 1
+        self.tables = [{} for _ in range(blocks)]
+        self.hashes = []
+        self.items = []
+        self._flips = {}
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def add(self, image_hash, item):
+        index = len(self.hashes)
+        self.hashes.append(image_hash)
+        self.items.append(item)
+        for block, table in enumerate(self.tables):
+            table.setdefault((image_hash >> (block * self.width)) & self.mask, []).append(index)
+
+    def _block_flips(self, bits):
+        flips = self._flips.get(bits)
+        if flips is None:
+            flips = [0]
+            for n in range(1, bits + 1):
+                flips.extend(sum(1 << b for b in combo) for combo in combinations(range(self.width), n))
+            self._flips[bits] = flips
+        return flips
+
+    def search(self, image_hash, radius):
+        """
+        :return: List of (distance, item) for every stored hash within radius
+        """
+        flips = self._block_flips(radius // len(self.tables))
+        seen = set()
+        found = []
+        for block, table in enumerate(self.tables):
+            key = (image_hash >> (block * self.width)) & self.mask
+            for flip in flips:
+                for index in table.get(key ^ flip, ()):
+                    if index in seen:
+                        continue
+                    seen.add(index)
+                    distance = hamming(image_hash, self.hashes[index])
+                    if distance <= radius:
+                        found.append((distance, self.items[index]))
+        return found
+
+def _load_cache(folder, method):
+    try:
+        with open(os.path.join(folder, CACHE_NAME)) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != CACHE_VERSION or cache.get("method") != method:
+        return {}
+    return cache.get("entries", {})
+
+def _save_cache(folder, method, entries):
+    # Write then rename, so an interrupted run never leaves a truncated cache
+    path = os.path.join(folder, CACHE_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump({"version": CACHE_VERSION, "method": method, "entries": entries}, f)
+    os.replace(path + ".tmp", path)
+
+def hash_folder(folder, method="dhash", workers=None, cancel_event=None):
+    """
+    Hash every image in 'folder', reusing the sidecar cache for files whose
+    size and modification time did not change.
+
+    :return: Dict of file name -> (hash, sharpness), or None if cancelled
+    """
+    names = sorted({os.path.basename(p) for pattern in IMAGE_PATTERNS for p in glob.glob(os.path.join(folder, pattern))})
+    cached = _load_cache(folder, method)
+    entries, stale = {}, []
+    for name in names:
+        stat = os.stat(os.path.join(folder, name))
+        entry = cached.get(name)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            entries[name] = entry
+        else:
+            stale.append((name, stat))
+
+    print(f"Hashing {len(stale)} of {len(names)} images ({len(names) - len(stale)} cached).")
+    cancelled = False
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        # Submitted in slices so a cancel does not wait for the whole folder
+        for start in range(0, len(stale), 1024):
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                break
+            batch = stale[start:start + 1024]
+            results = pool.map(lambda item: _hash_image(os.path.join(folder, item[0]), method), batch)
+            for (name, stat), result in zip(batch, results):
+                if result is None:
+                    print(f"Skipped {name} (could not decode).")
+                    continue
+                image_hash, sharpness = result
+                entries[name] = [stat.st_size, stat.st_mtime_ns, f"{image_hash:016x}", round(sharpness, 3)]
+
+    _save_cache(folder, method, entries)
+    if cancelled:
+        return None
+    return {name: (int(entry[2], 16), entry[3]) for name, entry in entries.items()}
+
+def dedupe_images(folder, max_distance=6, keep="sharpest", move_to=None, method="dhash",
+                  workers=None, score_fn=None, cancel_event=None):
+    """
+    Remove perceptual near-duplicates from 'folder'.
+
+    Images with no other image within max_distance are kept as they are.
+    The rest are ranked (by score_fn when keep="confidence", else by
+    sharpness) and taken best first: an image is kept unless an already kept
+    one is within max_distance. Kept images are therefore always more than
+    max_distance apart, and a slow pan is thinned out rather than collapsed
+    into a single image.
+
+    :param folder: Folder with .jpg/.jpeg/.png images
+    :param max_distance: Differing hash bits (out of 64) that still count as a duplicate
+    :param keep: "sharpest" or "confidence"
+    :param move_to: Folder to move duplicates to, they are deleted if None
+    :param method: "dhash" or "phash"
+    :param workers: Hashing threads, defaults to the CPU count
+    :param score_fn: Called with a list of image paths, returns a score per path. Needed for keep="confidence"
+    :param cancel_event: Optional threading.Event, stops the run (before anything is removed) when set
+    :return: Dict with images, duplicates and seconds, or None if cancelled
+    """
+    if method not in HASH_METHODS:
+        raise ValueError(f"method must be one of {HASH_METHODS}")
+    if keep not in KEEP_MODES:
+        raise ValueError(f"keep must be one of {KEEP_MODES}")
+    if keep == "confidence" and score_fn is None:
+        raise ValueError('keep="confidence" needs a score_fn')
+    started = time.time()
+    folder = os.path.abspath(os.path.normpath(folder))
+
+    hashes = hash_folder(folder, method=method, workers=workers, cancel_event=cancel_event)
+    if hashes is None:
+        return None
+
+    index = HammingIndex()
+    for name, (image_hash, _) in hashes.items():
+        index.add(image_hash, name)
+    candidates = [name for name, (image_hash, _) in hashes.items()
+                  if len(index.search(image_hash, max_distance)) > 1]
+    if cancel_event is not None and cancel_event.is_set():
+        return None
+
+    if keep == "confidence" and candidates:
+        scores = dict(zip(candidates, score_fn([os.path.join(folder, name) for name in candidates])))
+    else:
+        scores = {name: hashes[name][1] for name in candidates}
+    # Best first, ties go to the sharper image, then to the earlier name
+    candidates.sort(key=lambda name: (-scores[name], -hashes[name][1], name))
+
+    kept = HammingIndex()
+    duplicates = []
+    for name in candidates:
+        image_hash = hashes[name][0]
+        if kept.search(image_hash, max_distance):
+            duplicates.append(name)
+        else:
+            kept.add(image_hash, name)
+    if cancel_event is not None and cancel_event.is_set():
+        return None
+
+    if move_to:
+        os.makedirs(move_to, exist_ok=True)
+    for name in duplicates:
+        path = os.path.join(folder, name)
+        if move_to:
+            shutil.move(path, os.path.join(move_to, name))
+            print(f"Moved duplicate: {path}")
+        else:
+            os.remove(path)
+            print(f"Deleted duplicate: {path}")
+
+    # Keep the cache in step with the folder
+    entries = _load_cache(folder, method)
+    for name in duplicates:
+        entries.pop(name, None)
+    _save_cache(folder, method, entries)
+
+    return {"images": len(hashes), "duplicates": len(duplicates), "seconds": round(time.time() - started, 2)}
@@ -0,0 +1,110 @@
+"""
+Adaptive frame sampling for dataset extraction.
+
+Instead of every nth frame, a frame is sampled when the picture has changed
+enough since the last sampled one, on a cut, or at a motion peak, with a
+minimum and maximum gap between samples. Long static stretches then yield a
+handful of frames while short fast actions are not stepped over. The
+decision is made on a small grayscale thumbnail, so it costs far less than
+running the model on the frame.
+"""
+import cv2
+
+class SceneChangeSampler:
+    def __init__(self, min_gap=5, max_gap=300, change_threshold=0.06, cut_threshold=0.4,
+                 motion_threshold=0.02, thumb_width=64):
+        """
+        :param min_gap: Frames at least between two samples
+        :param max_gap: Frames at most between two samples, even if nothing changes
+        :param change_threshold: Mean absolute difference (0-1) from the last sampled frame that triggers a sample
+        :param cut_threshold: Histogram (Bhattacharyya) distance between consecutive frames that counts as a cut
+        :param motion_threshold: Frame-to-frame mean absolute difference (0-1) for a motion peak to count
+        :param thumb_width: Width of the thumbnail the decision is made on
+        """
+        self.min_gap = max(1, min_gap)
+        self.max_gap = max(self.min_gap, max_gap)
+        self.change_threshold = change_threshold
+        self.cut_threshold = cut_threshold
+        self.motion_threshold = motion_threshold
+        self.thumb_width = thumb_width
+        self.frames_seen = 0
+        self.frames_sampled = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the previous frames, e.g. before jumping to another position.
+        """
+        self._sampled_thumb = None
+        self._sampled_index = None
+        self._prev_thumb = None
+        self._prev_hist = None
+        self._motion = (0.0, 0.0)  # Frame-to-frame difference of the two previous frames
+        self._pending_cut = False
+
+    def _thumbnail(self, frame):
+        height = max(1, round(frame.shape[0] * self.thumb_width / frame.shape[1]))
+        small = cv2.resize(frame, (self.thumb_width, height), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def should_sample(self, index, frame):
+        """
+        Decide whether to sample a frame. Call it for every frame, in order.
+
+        :param index: Frame index in the video
+        :param frame: BGR frame
+        :return: True to sample the frame
+        """
+        thumb = self._thumbnail(frame)
+        hist = cv2.calcHist([thumb], [0], None, [32], [0, 256])
+        cv2.normalize(hist, hist)
+        self.frames_seen += 1
+
+        motion = 0.0
+        if self._prev_thumb is not None:
+            motion = cv2.absdiff(thumb, self._prev_thumb).mean() / 255.0
+            if cv2.compareHist(hist, self._prev_hist, cv2.HISTCMP_BHATTACHARYYA) >= self.cut_threshold:
+                self._pending_cut = True
+        # The previous frame was a local maximum of motion: sample right after the peak
+        before, peak = self._motion
+        motion_peak = peak >= self.motion_threshold and peak > before and motion <= peak
+        self._prev_thumb, self._prev_hist, self._motion = thumb, hist, (peak, motion)
+
+        if self._sampled_index is None:
+            sample = True
+        else:
+            gap = index - self._sampled_index
+            if gap >= self.max_gap:
+                sample = True
+            elif gap < self.min_gap:
+                sample = False
+            else:
+                change = cv2.absdiff(thumb, self._sampled_thumb).mean() / 255.0
+                sample = self._pending_cut or motion_peak or change >= self.change_threshold
+        if sample:
+            self._sampled_thumb, self._sampled_index = thumb, index
+            self._pending_cut = False
+            self.frames_sampled += 1
+        return sample
+
+def scene_frames(cap, sampler, start_frame=0, end_frame=None):
+    """
+    Yield (frame_index, frame) for the frames the sampler picks. Every frame
+    has to be decoded to be looked at, unlike the fixed-interval sampling.
+
+    :param cap: Opened cv2.VideoCapture
+    :param sampler: SceneChangeSampler
+    :param start_frame: First frame of the range
+    :param end_frame: End of the range (exclusive), None for the end of the video
+    """
+    frame_count = start_frame
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    sampler.reset()
+    while end_frame is None or frame_count < end_frame:
+        ret, frame = cap.read()
+        if not ret:
+            return
+        if sampler.should_sample(frame_count, frame):
+            yield frame_count, frame
+        frame_count += 1
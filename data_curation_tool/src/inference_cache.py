@@ -0,0 +1,253 @@
+"""
+Persistent cache of raw YOLO detections, so reruns over the same images
+(e.g. filterImages with another threshold or class list) skip inference.
+
+Entries are keyed by (image content hash, model weights hash, inference
+size) and hold the image size and every box the model returned as float32
+rows of x1, y1, x2, y2, conf, cls. Confidence and class filtering is left to the
+caller. Entries of weights that were replaced at the same path are dropped,
+and the least recently used ones go once the cache grows past its size
+limit.
+"""
+import os
+import cv2
+import time
+import sqlite3
+import hashlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared by all folders, set INFERENCE_CACHE to another file or to "" to disable caching
+DEFAULT_PATH = os.getenv("INFERENCE_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "data_curation", "inference.sqlite"))
+MAX_MB = float(os.getenv("INFERENCE_CACHE_MB", "512"))
+
+# Bump when the table layout changes, older caches are then emptied
+SCHEMA_VERSION = 2
+
+# Rough per-row overhead (keys, index, page slack) on top of the box data
+_ROW_OVERHEAD = 120
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class InferenceCache:
+    def __init__(self, path=DEFAULT_PATH, max_mb=MAX_MB):
+        """
+        :param path: SQLite file, created with its folder if missing
+        :param max_mb: Approximate size limit, least recently used entries are evicted beyond it
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._model_hashes = {}
+        # Worker processes may write at the same time, wait for each other's transactions
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS detections")
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS detections (
+                image_hash TEXT NOT NULL,
+                model_hash TEXT NOT NULL,
+                imgsz TEXT NOT NULL,
+                height INTEGER NOT NULL,
+                width INTEGER NOT NULL,
+                boxes BLOB NOT NULL,
+                used REAL NOT NULL,
+                PRIMARY KEY (image_hash, model_hash, imgsz)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS detections_used ON detections (used);
+            CREATE TABLE IF NOT EXISTS models (
+                path TEXT PRIMARY KEY,
+                model_hash TEXT NOT NULL
+            );
+        """)
+
+    def model_hash(self, model_path):
+        """
+        Hash of the weights file, so entries are never served for other
+        weights. Replacing the weights at a path drops the old entries.
+        Weights that are not a local file (e.g. downloaded by name) are keyed by name.
+        """
+        if os.path.isfile(model_path):
+            model_path = os.path.abspath(model_path)
+            stat = os.stat(model_path)
+            key = (model_path, stat.st_size, stat.st_mtime_ns)
+        else:
+            key = (model_path,)
+        if key not in self._model_hashes:
+            model_hash = file_hash(model_path) if len(key) > 1 else content_hash(model_path.encode())
+            row = self._db.execute("SELECT model_hash FROM models WHERE path = ?", (model_path,)).fetchone()
+            if row and row[0] != model_hash:
+                in_use = self._db.execute("SELECT 1 FROM models WHERE model_hash = ? AND path != ?",
+                                          (row[0], model_path)).fetchone()
+                if not in_use:
+                    self._db.execute("DELETE FROM detections WHERE model_hash = ?", (row[0],))
+            self._db.execute("INSERT OR REPLACE INTO models (path, model_hash) VALUES (?, ?)", (model_path, model_hash))
+            self._db.commit()
+            self._model_hashes[key] = model_hash
+        return self._model_hashes[key]
+
+    def get_many(self, image_hashes, model_hash, imgsz):
+        """
+        :return: Dict of image hash -> ((n, 6) float32 boxes, (height, width)), for the cached ones
+        """
+        found = {}
+        unique = list(dict.fromkeys(image_hashes))
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT image_hash, boxes, height, width FROM detections WHERE model_hash = ? AND imgsz = ? "
+                f"AND image_hash IN ({','.join('?' * len(chunk))})",
+                (model_hash, imgsz, *chunk),
+            ).fetchall()
+            for image_hash, blob, height, width in rows:
+                found[image_hash] = (np.frombuffer(blob, dtype=np.float32).reshape(-1, 6), (height, width))
+        if found:
+            now = time.time()
+            self._db.executemany("UPDATE detections SET used = ? WHERE image_hash = ? AND model_hash = ? AND imgsz = ?",
+                                 [(now, image_hash, model_hash, imgsz) for image_hash in found])
+            self._db.commit()
+        self.hits += sum(h in found for h in image_hashes)
+        self.misses += sum(h not in found for h in image_hashes)
+        return found
+
+    def put_many(self, entries, model_hash, imgsz):
+        """
+        :param entries: (image hash, ((n, 6) boxes, (height, width))) pairs
+        """
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO detections (image_hash, model_hash, imgsz, height, width, boxes, used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(image_hash, model_hash, imgsz, int(shape[0]), int(shape[1]), np.asarray(boxes, dtype=np.float32).tobytes(), now)
+             for image_hash, (boxes, shape) in entries],
+        )
+        self._db.commit()
+        self.prune()
+
+    def size_bytes(self):
+        rows, data = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(boxes)), 0) FROM detections").fetchone()
+        return data + rows * _ROW_OVERHEAD
+
+    def prune(self):
+        """
+        Evict least recently used entries down to 90% of the size limit.
+        """
+        size = self.size_bytes()
+        if size <= self.max_bytes:
+            return
+        excess = size - int(self.max_bytes * 0.9)
+        victims, freed = [], 0
+        cursor = self._db.execute("SELECT image_hash, model_hash, imgsz, LENGTH(boxes) FROM detections ORDER BY used")
+        for image_hash, model_hash, imgsz, length in cursor:
+            victims.append((image_hash, model_hash, imgsz))
+            freed += length + _ROW_OVERHEAD
+            if freed >= excess:
+                break
+        cursor.close()
+        self._db.executemany("DELETE FROM detections WHERE image_hash = ? AND model_hash = ? AND imgsz = ?", victims)
+        self._db.commit()
+
+    def clear(self):
+        self._db.execute("DELETE FROM detections")
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+def default_imgsz(model):
+    """
+    The inference size a model uses when none is given: the one it was trained with.
+    """
+    return getattr(model, "overrides", {}).get("imgsz", 640)
+
+def boxes_array(result):
+    """
+    All boxes of an Ultralytics result as (n, 6) float32 rows of x1, y1, x2, y2, conf, cls.
+    """
+    if result.boxes is None or len(result.boxes) == 0:
+        return np.empty((0, 6), dtype=np.float32)
+    return np.concatenate([
+        result.boxes.xyxy.cpu().numpy().reshape(-1, 4),
+        result.boxes.conf.cpu().numpy().reshape(-1, 1),
+        result.boxes.cls.cpu().numpy().reshape(-1, 1),
+    ], axis=1).astype(np.float32)
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None, None
+    return data, content_hash(data)
+
+def _decode(data):
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def detect_images(model, model_path, image_paths, imgsz=None, batch_size=16, cache=None,
+                  workers=None, chunk_size=256, cancel_event=None):
+    """
+    Run the model over image files, serving what it can from the cache.
+
+    Files are read and hashed, and the uncached ones decoded, in a thread
+    pool. Only cache misses go through the model, in batches.
+
+    :param model: Loaded YOLO model
+    :param model_path: Its weights file, for the cache key
+    :param image_paths: Image files
+    :param imgsz: Inference size, defaults to the one the model was trained with
+    :param batch_size: Images per inference call
+    :param cache: InferenceCache, or None to always run the model
+    :param workers: Read/decode threads, defaults to the CPU count
+    :param chunk_size: Images looked up and inferred per step
+    :param cancel_event: Optional threading.Event, checked between steps
+    :return: Generator of (path, (n, 6) float32 boxes of x1, y1, x2, y2, conf, cls, (height, width)),
+        in input order. Boxes and size are None for files that could not be read or decoded.
+    """
+    if imgsz is None:
+        # What the model would use anyway, made explicit for the cache key
+        imgsz = default_imgsz(model)
+    model_hash = cache.model_hash(model_path) if cache is not None else None
+    size_key = str(imgsz)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for start in range(0, len(image_paths), chunk_size):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            paths = image_paths[start:start + chunk_size]
+            files = list(pool.map(_read, paths))
+            found = {}
+            if cache is not None:
+                found = cache.get_many([h for _, h in files if h is not None], model_hash, size_key)
+
+            # Identical files in one chunk are inferred once
+            missing = list({h: i for i, (data, h) in reversed(list(enumerate(files)))
+                            if data is not None and h not in found}.values())
+            computed = {}
+            for b in range(0, len(missing), batch_size):
+                # Decoded per batch, so only one batch of full images is in memory
+                decoded = zip(missing[b:b + batch_size], pool.map(lambda i: _decode(files[i][0]), missing[b:b + batch_size]))
+                batch = [(i, image) for i, image in decoded if image is not None]
+                if not batch:
+                    continue
+                results = model([image for _, image in batch], imgsz=imgsz, verbose=False)
+                for (i, image), result in zip(batch, results):
+                    computed[files[i][1]] = (boxes_array(result), image.shape[:2])
+            if cache is not None and computed:
+                cache.put_many(computed.items(), model_hash, size_key)
+
+            for path, (data, h) in zip(paths, files):
+                boxes, shape = found.get(h, computed.get(h, (None, None)))
+                yield path, boxes, shape
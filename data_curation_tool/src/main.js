@@ -4,7 +4,6 @@ const path = require('path');
 const { spawn } = require('child_process');
 
 let mainWindow = null;
-let currentPyProcess = null; // reference to the currently running python process, if any
 
 function createWindow() {
   mainWindow = new BrowserWindow({
@@ -55,85 +54,138 @@ ipcMain.handle('select-folder', async () => {
   return null;
 });
 
-// 2) Spawn Python with arguments for videoToImage.py
+// 2) Run a job on the curation daemon (curation_daemon.py). It is started on
+// the first job and kept alive, so later jobs skip Python start-up and model loading.
+let daemon = null;
+let nextJobId = 1;
+const jobs = new Map(); // job id -> { resolve, reject, output }
+
+function startDaemon() {
+  console.log('Starting curation daemon...');
+  const py = spawn('python', [path.join(__dirname, 'curation_daemon.py')]);
+  let partialLine = '';
+  let stderrData = '';
+
+  py.stdout.on('data', (data) => {
+    const lines = (partialLine + data.toString()).split('\n');
+    partialLine = lines.pop();
+    for (const line of lines) {
+      handleDaemonLine(line);
+    }
+  });
+
+  py.stderr.on('data', (data) => {
+    stderrData += data.toString();
+    console.error(data.toString());
+  });
+
+  py.on('close', (code) => {
+    if (daemon === py) {
+      daemon = null; // The next job starts a new one
+    }
+    // Jobs still pending will never get a result
+    for (const job of jobs.values()) {
+      job.reject(new Error(stderrData.slice(-2000) || `Curation daemon exited with code: ${code}`));
+    }
+    jobs.clear();
+  });
+
+  return py;
+}
+
+function handleDaemonLine(line) {
+  let message;
+  try {
+    message = JSON.parse(line);
+  } catch (error) {
+    console.log(line);
+    return;
+  }
+  const job = jobs.get(message.id);
+  if (!job) {
+    return;
+  }
+  if (message.event === 'log') {
+    job.output += message.message + '\n';
+  } else if (message.event === 'result') {
+    jobs.delete(message.id);
+    if (message.status === 'done') {
+      job.resolve(job.output.trim() || 'Python script finished successfully.');
+    } else if (message.status === 'cancelled') {
+      console.log('Python process was terminated by the user.');
+      job.resolve('Python process was terminated by the user.');
+    } else {
+      job.reject(new Error(message.message));
+    }
+  } else if (message.event !== 'queued' && message.event !== 'started' && mainWindow) {
+    // Progress events for the renderer
+    mainWindow.webContents.send('python-progress', message);
+  }
+}
+
 ipcMain.handle('run-python', (event, {
-  mode,           // e.g. "videoShots" or "filterImages"
+  mode,           // e.g. "videoShots", "sceneShots", "filterImages" or "dedupe"
   drawBoxes,      // true/false
   inputFolder,    // folder for videos/images
-  outputFolder,   // used if mode=videoShots
+  outputFolder,   // used if mode=videoShots/sceneShots (or dedupe)
   classes,        // array of classes, e.g. ["pistol", "gun"]
   frameInterval,  // integer
-  confidenceLevel // float
+  confidenceLevel, // float
+  workers,        // number of worker processes for videoShots
+  maxDistance,    // dedupe: differing hash bits that still count as a duplicate
+  keep,           // dedupe: "sharpest" or "confidence"
+  exportYolo,     // write YOLO labels (and a dataset for videoShots/sceneShots)
+  shardOutput     // videoShots/sceneShots: tar shards instead of one JPEG per detection
 }) => {
   return new Promise((resolve, reject) => {
-    // Convert boolean drawBoxes to string ("True"/"False")
-    const drawArg = drawBoxes ? "True" : "False";
+    if (!daemon) {
+      daemon = startDaemon();
+    }
+    const id = String(nextJobId++);
+    jobs.set(id, { resolve, reject, output: '' });
 
-    // Build the arguments array for your script:
-    const pythonArgs = [
-      path.join(__dirname, 'videoToImage.py'),
+    const request = {
+      id,
+      command: 'run',
       mode,
-      drawArg,
-      inputFolder,
-      outputFolder || '',
-      ...classes,
-      String(frameInterval || 10),
-      String(confidenceLevel || 0.55) // Add confidence level
-    ];
-
-    console.log('Spawning Python with args:', pythonArgs);
-
-    // Spawn the Python process
-    const py = spawn('python', pythonArgs);
-
-    // SAVE REFERENCE so we can cancel later
-    currentPyProcess = py;
-
-    let stdoutData = '';
-    let stderrData = '';
-
-    py.stdout.on('data', (data) => {
-      stdoutData += data.toString();
-    });
-
-    py.stderr.on('data', (data) => {
-      stderrData += data.toString();
-    });
-
-    py.on('close', (code) => {
-      // Clear reference once the process ends
-      currentPyProcess = null;
-
-      console.log('=== Python stderr ===\n', stderrData);
-
-      // Handle cases where the process was terminated without an exit code
-      if (code === null) {
-        console.log('Python process was terminated by the user.');
-        resolve('Python process was terminated by the user.');
-      } else if (code === 0) {
-        resolve(stdoutData.trim() || 'Python script finished successfully.');
-      } else {
-        reject(new Error(stderrData || `Script exited with code: ${code}`));
-      }
-    });
+      draw_boxes: Boolean(drawBoxes),
+      input_folder: inputFolder,
+      output_folder: outputFolder || '',
+      classes,
+      frame_interval: frameInterval || 10,
+      confidence_level: confidenceLevel || 0.55,
+      workers: workers || 1,
+      max_distance: Number.isInteger(maxDistance) ? maxDistance : 6,
+      keep: keep || 'sharpest',
+      export_yolo: Boolean(exportYolo),
+      shards: Boolean(shardOutput)
+    };
+    console.log('Sending job to curation daemon:', request);
+    daemon.stdin.write(JSON.stringify(request) + '\n');
   });
 });
 
-// 3) Cancel the currently running Python process
+// 3) Cancel the running and queued jobs
 ipcMain.handle('cancel-python', async () => {
-  if (currentPyProcess) {
-    console.log('Cancelling Python process...');
-    try {
-      // Attempt to kill the process
-      currentPyProcess.kill('SIGTERM');
-      currentPyProcess = null;
-      return 'Python process cancelled.';
-    } catch (error) {
-      console.error('Error while cancelling Python process:', error.message);
-      currentPyProcess = null; // Clear the reference even if an error occurs
-      return `Failed to cancel Python process: ${error.message}`;
-    }
-  } else {
+  if (!daemon || jobs.size === 0) {
     return 'No Python process running.';
   }
+  console.log('Cancelling Python jobs...');
+  try {
+    // The running job stops after its current batch, queued ones are dropped
+    for (const id of jobs.keys()) {
+      daemon.stdin.write(JSON.stringify({ id, command: 'cancel' }) + '\n');
+    }
+    return 'Python process cancelled.';
+  } catch (error) {
+    console.error('Error while cancelling Python jobs:', error.message);
+    return `Failed to cancel Python process: ${error.message}`;
+  }
+});
+
+// Closing its stdin lets the daemon cancel what is left and exit
+app.on('will-quit', () => {
+  if (daemon) {
+    daemon.stdin.end();
+  }
 });
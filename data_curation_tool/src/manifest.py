@@ -0,0 +1,181 @@
+"""
+Manifest of a curation run, kept in the output folder so an interrupted or
+cancelled run can be picked up where it stopped.
+
+For every video (keyed by its path relative to the input folder) it records
+the status, the frame ranges still to process and how many files were
+written so far:
+
+  {"version": 2, "settings": {...}, "videos": {"cam1/clip.mp4": {
+      "size", "mtime_ns", "status": "pending" | "partial" | "done" | "error",
+      "remaining": [[next frame, end frame or null], ...], "saved", "output_count"}}}
+
+The files themselves are appended to a log per video in OUTPUTS_DIR (one
+path relative to the output folder per line, see outputs()), so a
+checkpoint writes only what is new instead of every path of the run.
+
+A range starts at the first frame whose outputs may not be on disk yet, so
+resuming from it never leaves a gap. Videos that changed on disk, and all
+videos when the run settings changed, start over. The file is replaced
+atomically, a crash leaves either the previous or the new version.
+"""
+import os
+import json
+import time
+
+MANIFEST_NAME = ".curation_manifest.json"
+OUTPUTS_DIR = ".curation_outputs"
+VERSION = 2
+
+def video_key(videos_folder, video_path):
+    return os.path.relpath(video_path, videos_folder).replace(os.sep, "/")
+
+class Manifest:
+    def __init__(self, output_folder, settings, resume=True, save_interval=2.0):
+        """
+        :param output_folder: Folder the manifest is kept in
+        :param settings: JSON-serializable run settings, a saved manifest with other settings is not resumed
+        :param resume: False to ignore a saved manifest and start over
+        :param save_interval: Seconds at least between two checkpoint writes, status changes are written at once
+        """
+        self.output_folder = output_folder
+        self.path = os.path.join(output_folder, MANIFEST_NAME)
+        # Round-trip, so tuples and lists compare equal to what was loaded
+        self.settings = json.loads(json.dumps(settings))
+        self.save_interval = save_interval
+        self.videos = {}
+        self._chunks = {}  # chunk_id -> (key, its range in "remaining")
+        self._saved_at = 0.0
+        if resume:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Could not read {self.path} ({e}), starting over.")
+            return
+        if data.get("version") != VERSION or data.get("settings") != self.settings:
+            # Videos start over one by one in remaining(), which also clears their output logs
+            print(f"Settings changed since the last run in '{self.output_folder}', starting over.")
+            return
+        self.videos = data.get("videos", {})
+
+    def remaining(self, key, video_path):
+        """
+        The (start_frame, end_frame) ranges of a video still to process:
+        none when it is done, the whole video when it is new or changed.
+        """
+        stat = os.stat(video_path)
+        entry = self.videos.get(key)
+        if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            entry = self.videos[key] = dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns, status="pending",
+                                            remaining=[[0, None]], saved=0, output_count=0)
+            # Starting over, the files of an earlier run are overwritten or no longer belong to it
+            if os.path.exists(self._outputs_path(key)):
+                os.remove(self._outputs_path(key))
+        if entry["status"] == "done":
+            return []
+        return [tuple(r) for r in entry["remaining"]]
+
+    def plan(self, chunks, keys):
+        """
+        Track the chunks of this run: each video's remaining ranges become
+        the ranges of its chunks.
+
+        :param chunks: (chunk_id, video, start_frame, end_frame) work units
+        :param keys: Video path -> manifest key
+        """
+        ranges = {}
+        for chunk_id, video, start_frame, end_frame in chunks:
+            r = [start_frame, end_frame]
+            ranges.setdefault(keys[video], []).append(r)
+            self._chunks[chunk_id] = (keys[video], r)
+        for key, rs in ranges.items():
+            self.videos[key]["remaining"] = rs
+        self.save(force=True)
+
+    def checkpoint(self, chunk_id, next_frame, saved, outputs, finished=False):
+        """
+        Record the progress of a chunk.
+
+        :param next_frame: First frame whose outputs may not be on disk yet
+        :param saved: Detections saved since the previous checkpoint
+        :param outputs: Files written since the previous checkpoint
+        :param finished: The chunk's whole range was processed
+        """
+        key, r = self._chunks[chunk_id]
+        entry = self.videos[key]
+        entry["saved"] += saved
+        if outputs:
+            self._append_outputs(key, outputs)
+            entry["output_count"] += len(outputs)
+        # A late checkpoint of a chunk that was already finished only adds outputs
+        if any(x is r for x in entry["remaining"]):
+            if finished:
+                entry["remaining"] = [x for x in entry["remaining"] if x is not r]
+            else:
+                r[0] = next_frame
+        status = "done" if not entry["remaining"] else "partial"
+        changed = entry["status"] != status
+        entry["status"] = status
+        entry.pop("error", None)
+        self.save(force=changed)
+
+    def _outputs_path(self, key):
+        return os.path.join(self.output_folder, OUTPUTS_DIR, key.replace("/", "__") + ".txt")
+
+    def _append_outputs(self, key, outputs):
+        """
+        Add files to the video's output log, on disk before the manifest
+        that counts them.
+        """
+        path = self._outputs_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as f:
+            f.writelines(os.path.relpath(p, self.output_folder).replace(os.sep, "/") + "\n" for p in outputs)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def outputs(self, key):
+        """
+        Files written for a video so far, relative to the output folder. A
+        file rewritten after resuming from a crash is listed once.
+        """
+        try:
+            with open(self._outputs_path(key)) as f:
+                return list(dict.fromkeys(line.rstrip("\n") for line in f if line.strip()))
+        except FileNotFoundError:
+            return []
+
+    def finish(self, chunk_id):
+        """
+        Mark a chunk that ran to the end as done.
+        """
+        key, r = self._chunks[chunk_id]
+        self.checkpoint(chunk_id, r[1], 0, [], finished=True)
+
+    def error(self, chunk_id, message):
+        """
+        Mark a video as failed, a rerun retries it from its last checkpoint.
+        """
+        key, _ = self._chunks[chunk_id]
+        self.videos[key]["status"] = "error"
+        self.videos[key]["error"] = message
+        self.save(force=True)
+
+    def save(self, force=False):
+        now = time.time()
+        if not force and now - self._saved_at < self.save_interval:
+            return
+        self._saved_at = now
+        os.makedirs(self.output_folder, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": VERSION, "settings": self.settings, "videos": self.videos}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
@@ -6,5 +6,7 @@ const { contextBridge, ipcRenderer } = require('electron');
 contextBridge.exposeInMainWorld('electronAPI', {
   selectFolder: () => ipcRenderer.invoke('select-folder'),
   runPythonScript: (args) => ipcRenderer.invoke('run-python', args),
-  cancelPythonScript: () => ipcRenderer.invoke('cancel-python')
+  cancelPythonScript: () => ipcRenderer.invoke('cancel-python'),
+  // Progress events (parsed JSON lines) while a script runs
+  onPythonProgress: (callback) => ipcRenderer.on('python-progress', (_event, progress) => callback(progress))
 });
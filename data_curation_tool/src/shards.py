@@ -0,0 +1,231 @@
+"""
+WebDataset-style tar shards, as an alternative to one loose JPEG per
+detection. Network shares and sync tools handle a few large files much
+better than hundreds of thousands of small ones.
+
+Layout:
+
+  <folder>/<prefix>-000000.tar        <key>.jpg and <key>.json members, in pairs
+  <folder>/<prefix>-000000.idx.json   {"<key>": {"jpg": [offset, size], "json": [offset, size]}}
+
+A shard is closed once it would grow past max_bytes. The json member holds
+the sample's metadata (source video, frame index, detections). The index
+gives the byte range of every member for random access without scanning
+the tar, and only lists samples that are completely on disk: samples
+written after the last sync of an interrupted run are ignored by the readers.
+It also lets iter_samples read a shard without parsing tar headers.
+"""
+import os
+import io
+import cv2
+import json
+import glob
+import queue
+import tarfile
+import threading
+import numpy as np
+
+SHARD_SUFFIX = ".tar"
+INDEX_SUFFIX = ".idx.json"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+def index_path(shard_path):
+    return shard_path[:-len(SHARD_SUFFIX)] + INDEX_SUFFIX
+
+def _write_json(path, data):
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+class ShardWriter:
+    """
+    Write samples to size-capped tar shards on a background thread, so JPEG
+    encoding and disk writes overlap with decoding and inference. The queue
+    is bounded to keep memory flat if the disk is slow.
+    """
+    def __init__(self, folder, prefix, max_bytes=DEFAULT_MAX_BYTES, max_pending=64):
+        """
+        :param folder: Where the shards are written
+        :param prefix: Shard file name prefix, unique per writer
+        :param max_bytes: Size a shard is kept under (a single larger sample gets a shard of its own)
+        :param max_pending: Samples queued at most before write() blocks
+        """
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.paths = []  # Shards opened so far, in order
+        self._tar = None
+        self._index = {}
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    self._close_shard()
+                    return
+                if item == "sync":
+                    self._sync()
+                else:
+                    self._write(*item)
+            except Exception as e:
+                print(f"Error: Could not write to shard {self.paths[-1] if self.paths else self.prefix}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, key, image, metadata):
+        ok, encoded = cv2.imencode(".jpg", image)
+        if not ok:
+            print(f"Error: Could not encode {key}")
+            return
+        members = [("jpg", encoded.tobytes()), ("json", json.dumps(metadata).encode())]
+        # Each member takes a 512-byte header plus its data padded to 512 bytes
+        size = sum(512 + -(-len(data) // 512) * 512 for _, data in members)
+        if self._tar is not None and self._tar.offset + size > self.max_bytes - 1024:
+            self._close_shard()
+        if self._tar is None:
+            path = os.path.join(self.folder, f"{self.prefix}-{len(self.paths):06d}{SHARD_SUFFIX}")
+            self.paths.append(path)
+            self._tar = tarfile.open(path, "w")
+            self._index = {}
+        entry = {}
+        for ext, data in members:
+            info = tarfile.TarInfo(f"{key}.{ext}")
+            info.size = len(data)
+            self._tar.addfile(info, io.BytesIO(data))
+            # The data is followed by padding to the next 512-byte block
+            entry[ext] = [self._tar.offset - -(-len(data) // 512) * 512, len(data)]
+        self._index[key] = entry
+
+    def _sync(self):
+        """
+        Flush the open shard and write its index, so what was written so far
+        survives a crash.
+        """
+        if self._tar is not None:
+            self._tar.fileobj.flush()
+            os.fsync(self._tar.fileobj.fileno())
+            _write_json(index_path(self.paths[-1]), self._index)
+
+    def _close_shard(self):
+        if self._tar is not None:
+            self._tar.close()
+            _write_json(index_path(self.paths[-1]), self._index)
+            self._tar = None
+
+    def write(self, key, image, metadata):
+        """
+        :param key: Sample name, unique within the writer (readers take what follows the last dot as the extension)
+        :param image: BGR image, stored as <key>.jpg
+        :param metadata: JSON-serializable dict, stored as <key>.json
+        """
+        self._queue.put((key, image, metadata))
+
+    def wait(self):
+        """
+        Block until everything queued so far is written and indexed.
+        """
+        self._queue.put("sync")
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+def shard_paths(folder):
+    return sorted(glob.glob(os.path.join(folder, "*" + SHARD_SUFFIX)))
+
+def load_index(shard_path):
+    """
+    :return: Key -> {extension: [offset, size]}, or None if the shard has no index
+    """
+    try:
+        with open(index_path(shard_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _decode(ext, data, decode):
+    if ext == "json":
+        return json.loads(data)
+    if decode and ext == "jpg":
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return data
+
+def _iter_indexed(f, index, decode):
+    """
+    Samples in file order by the index: skip each header and read the data,
+    all served from the read buffer.
+    """
+    position = 0
+    for key, entry in index.items():
+        sample = {}
+        for ext, (offset, size) in sorted(entry.items(), key=lambda item: item[1][0]):
+            f.read(offset - position)
+            data = f.read(size)
+            if len(data) < size:
+                return
+            position = offset + size
+            sample[ext] = _decode(ext, data, decode)
+        yield key, sample
+
+def _iter_tar(f, decode):
+    """
+    Samples of a shard without an index, by parsing the tar stream.
+    """
+    key, sample = None, {}
+    try:
+        with tarfile.open(fileobj=f, mode="r|") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                member_key, _, ext = member.name.rpartition(".")
+                if member_key != key:
+                    if sample:
+                        yield key, sample
+                    key, sample = member_key, {}
+                sample[ext] = _decode(ext, tar.extractfile(member).read(), decode)
+    except tarfile.ReadError:
+        # Truncated, the last sample may be missing a member
+        return
+    if sample:
+        yield key, sample
+
+def iter_samples(paths, decode=True, buffer_size=8 * 1024 * 1024):
+    """
+    Iterate the samples of shards sequentially. Each shard is read front to
+    back through a large buffer, so reading costs a few syscalls per shard
+    rather than several per sample. Shards with an index are read by it (only
+    samples completely on disk), others by parsing the tar.
+
+    :param paths: Shard files, or a folder of shards
+    :param decode: Decode images to BGR arrays, False to get the JPEG bytes
+    :param buffer_size: Read buffer per shard
+    :return: Generator of (key, {"jpg": image, "json": metadata})
+    """
+    if isinstance(paths, str):
+        paths = shard_paths(paths)
+    for path in paths:
+        index = load_index(path)
+        with open(path, "rb", buffering=buffer_size) as f:
+            yield from (_iter_indexed(f, index, decode) if index is not None else _iter_tar(f, decode))
+
+def read_sample(shard_path, key, index=None, decode=True):
+    """
+    Read one sample by key, seeking straight to its members.
+
+    :param index: The shard's index (see load_index), loaded when not given
+    :return: {"jpg": image, "json": metadata}
+    """
+    if index is None:
+        index = load_index(shard_path)
+    sample = {}
+    with open(shard_path, "rb") as f:
+        for ext, (offset, size) in index[key].items():
+            f.seek(offset)
+            sample[ext] = _decode(ext, f.read(size), decode)
+    return sample
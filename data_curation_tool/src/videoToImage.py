@@ -6,11 +6,40 @@ import numpy as np
 from ultralytics import YOLO
 import hashlib
 import sys
+import json
+import time
+import queue
+import signal
+import threading
+import multiprocessing
+import dedupe
+import inference_cache
+import frame_sampler
+import yolo_export
+import manifest
+import shards
 
-# Load your model on CPU. Adjust "best.pt" path if needed.
-model = YOLO("best.pt")
+# Default model. Adjust "best.pt" path if needed (or set MODEL_PATH).
+MODEL_PATH = os.getenv("MODEL_PATH", "best.pt")
 
-def annotate_image(image, valid_classes=None, conf_threshold=0.55, draw_boxes=True):
+# Loaded models by path, so a long-running process loads each one only once
+_models = {}
+_models_lock = threading.Lock()
+
+def get_model(model_path=None):
+    """
+    Load a YOLO model on first use and reuse it afterwards.
+
+    :param model_path: Path to the weights, defaults to MODEL_PATH
+    :return: The loaded model
+    """
+    model_path = model_path or MODEL_PATH
+    with _models_lock:
+        if model_path not in _models:
+            _models[model_path] = YOLO(model_path)
+        return _models[model_path]
+
+def annotate_image(image, valid_classes=None, conf_threshold=0.55, draw_boxes=True, model_path=None):
     """
     Run detection on an image. If a valid detection is found:
       - If draw_boxes is True, draw bounding boxes & labels on the image
@@ -21,10 +50,12 @@ def annotate_image(image, valid_classes=None, conf_threshold=0.55, draw_boxes=Tr
     :param valid_classes: List of valid classes (e.g. ["pistol", "gun"])
     :param conf_threshold: Float confidence threshold.
     :param draw_boxes: Boolean to indicate if bounding boxes/labels should be drawn.
+    :param model_path: Weights to use, defaults to MODEL_PATH
     :return: [annotated_image] if detection found, else [].
     """
     if valid_classes is None:
         valid_classes = ["pistol", "gun"]
+    model = get_model(model_path)
 
     # Load image if a file path is provided
     if isinstance(image, str):
@@ -79,61 +110,525 @@ def annotate_image(image, valid_classes=None, conf_threshold=0.55, draw_boxes=Tr
         return [annotated_image]
     return []
 
-def process_video(video_path, save_folder, valid_classes=None, frame_interval=10, draw_boxes=True):
+def _valid_class_ids(model, valid_classes):
+    """
+    Map class names to the model's class ids, once instead of per box.
+    """
+    return np.array([i for i, name in model.names.items() if name in valid_classes], dtype=int)
+
+def _valid_boxes(result, valid_ids, conf_threshold):
+    """
+    Indices of the boxes in a result that pass the confidence and class check.
+    One transfer of all confidences and classes instead of one per box.
+    """
+    if result.boxes is None or len(result.boxes) == 0:
+        return np.empty(0, dtype=int)
+    conf = result.boxes.conf.cpu().numpy()
+    cls = result.boxes.cls.cpu().numpy().astype(int)
+    return np.flatnonzero((conf >= conf_threshold) & np.isin(cls, valid_ids))
+
+def _draw_first_box(model, image, result, index):
+    """
+    Draw the box and label of one detection, like annotate_image does for the
+    first valid detection.
+    """
+    x1, y1, x2, y2 = result.boxes.xyxy[index].cpu().numpy().astype(int)
+    conf = float(result.boxes.conf[index])
+    label = f"{model.names.get(int(result.boxes.cls[index]), '')} {conf:.2f}"
+    cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+    cv2.putText(image, label, (x1, max(y1 - 10, 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    return image
+
+def _sampled_frames(cap, frame_interval, start_frame=0, end_frame=None):
+    """
+    Yield (frame_index, frame) for every nth frame. Skipped frames are only
+    grabbed, never converted to BGR images.
+
+    Frame indices count from the start of the video, so a range starting at
+    a multiple of frame_interval samples the same frames as a full pass.
+    """
+    frame_count = start_frame
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    while end_frame is None or frame_count < end_frame:
+        if frame_count % frame_interval == 0:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            yield frame_count, frame
+        elif not cap.grab():
+            return
+        frame_count += 1
+
+class ImageWriter:
+    """
+    Write JPEGs (and label text files) on a background thread so encoding
+    overlaps with decoding and inference. The queue is bounded to keep memory
+    flat if the disk is slow.
+
+    With hash_images, the content hash of every JPEG written is kept in
+    `hashes` (path -> hash), to key the inference cache.
+    """
+    def __init__(self, max_pending=64, hash_images=False):
+        self.hashes = {} if hash_images else None
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._write(*item)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, path, data):
+        if isinstance(data, str):
+            yolo_export.write_label(path, data)
+        elif self.hashes is not None:
+            ok, encoded = cv2.imencode(".jpg", data)
+            if not ok:
+                print(f"Error: Could not write {path}")
+                return
+            with open(path, "wb") as f:
+                f.write(encoded.tobytes())
+            self.hashes[path] = inference_cache.content_hash(encoded.tobytes())
+        elif not cv2.imwrite(path, data):
+            print(f"Error: Could not write {path}")
+
+    def write(self, path, image):
+        self._queue.put((path, image))
+
+    def write_text(self, path, text):
+        self._queue.put((path, text))
+
+    def wait(self):
+        """
+        Block until everything queued so far is written.
+        """
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+def process_video(video_path, save_folder, valid_classes=None, frame_interval=10, draw_boxes=True,
+                  conf_threshold=0.55, batch_size=16, start_frame=0, end_frame=None,
+                  progress=None, cancel_event=None, model_path=None, scene_options=None, export_options=None,
+                  name=None, checkpoint=None, checkpoint_interval=2.0, shard_options=None):
     """
     Process a single video file, saving frames (with or without bounding boxes)
     if they contain at least one valid detection.
-    
+
+    Only every nth frame is decoded to an image, or with scene_options the
+    frames a frame_sampler.SceneChangeSampler picks. Sampled frames are run
+    through the model in batches and saved on a writer thread.
+
+    With export_options, frames with a valid detection are also written
+    without drawn boxes to a YOLO dataset in save_folder (see yolo_export),
+    with a label file built from the same detections. Without draw_boxes
+    those are the only images written. Their raw detections are also stored
+    in the inference cache, so a later filterImages run over the dataset
+    does not run the model again. They are the detections of the frame
+    before JPEG encoding.
+
     :param video_path: Path to the video file
     :param save_folder: Where detection images will be saved
     :param valid_classes: Which classes to detect
     :param frame_interval: Only save every nth frame
     :param draw_boxes: Boolean to toggle bounding boxes
+    :param conf_threshold: Float confidence threshold.
+    :param batch_size: Number of sampled frames per inference call
+    :param start_frame: First frame of the range to process
+    :param end_frame: End of the range (exclusive), None for the end of the video
+    :param progress: Called as progress(frames_done, saved_count, frames_inferred) after every batch
+    :param cancel_event: Stop after the current batch once this event is set
+    :param model_path: Weights to use, defaults to MODEL_PATH
+    :param scene_options: SceneChangeSampler arguments to sample on scene changes instead of every nth frame
+    :param export_options: Dict to export a YOLO dataset: val_fraction (0.2), include_negatives (False)
+        to also export sampled frames without detections with empty labels, and cache_path
+        (the inference cache, None to skip it)
+    :param name: Prefix of the saved file names, defaults to the video file name
+    :param checkpoint: Called as checkpoint(next_frame, saved, outputs, finished) at most every
+        checkpoint_interval seconds and at the end, once the outputs before next_frame are on disk.
+        saved and outputs (file paths) are the ones since the previous call, finished is True
+        when the whole range was processed.
+    :param checkpoint_interval: Seconds at least between two checkpoints
+    :param shard_options: Dict to write detection images to tar shards in save_folder instead of
+        loose JPEGs (see shards): max_bytes per shard (256 MB). Each image is stored with its
+        source video, frame index and valid detections.
+    :return: Number of saved detection images
     """
     if valid_classes is None:
         valid_classes = ["pistol", "gun"]
+    model = get_model(model_path)
 
-    if not os.path.exists(save_folder):
-        os.makedirs(save_folder)
+    os.makedirs(save_folder, exist_ok=True)
 
+    valid_ids = _valid_class_ids(model, valid_classes)
+    video_name = name or os.path.splitext(os.path.basename(video_path))[0]
     cap = cv2.VideoCapture(video_path)
-    frame_count = 0
     saved_count = 0
+    inferred_count = 0
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    export = export_options is not None
+    cache_entries = []  # (image path, boxes, shape) of exported images
+    if export:
+        class_map = yolo_export.class_index_map(model.names, valid_classes)
+        split = yolo_export.split_for(video_name, export_options.get("val_fraction", 0.2))
+        include_negatives = export_options.get("include_negatives", False)
+        cache_path = export_options.get("cache_path")
+        os.makedirs(os.path.join(save_folder, "images", split), exist_ok=True)
+    writer = ImageWriter(hash_images=export and bool(cache_path))
+    shard_writer = None
+    if shard_options is not None:
+        # One set of shards per range, so parallel chunks and resumed runs never share a file
+        shard_writer = shards.ShardWriter(save_folder, f"{video_name}-{start_frame:09d}",
+                                          max_bytes=shard_options.get("max_bytes", shards.DEFAULT_MAX_BYTES))
+    outputs = []  # Written since the last checkpoint
+    checkpointed = (time.time(), 0, 0)
 
-        # Process every nth frame
-        if frame_count % frame_interval == 0:
-            annotated_images = annotate_image(
-                frame,
-                valid_classes=valid_classes,
-                conf_threshold=0.55,
-                draw_boxes=draw_boxes
-            )
-            for i, img in enumerate(annotated_images):
-                video_name = os.path.splitext(os.path.basename(video_path))[0]
-                out_path = os.path.join(save_folder, f"{video_name}_frame{frame_count}_detection{i}.jpg")
-                cv2.imwrite(out_path, img)
+    def save_checkpoint(next_frame, finished=False):
+        nonlocal outputs, checkpointed
+        if shard_writer is not None:
+            # Shards and their indexes are rewritten in place, report each once
+            for path in shard_writer.paths[checkpointed[2]:]:
+                outputs += [path, shards.index_path(path)]
+        checkpoint(next_frame, saved_count - checkpointed[1], outputs, finished)
+        outputs = []
+        checkpointed = (time.time(), saved_count, len(shard_writer.paths) if shard_writer is not None else 0)
+
+    def write(path, data):
+        if isinstance(data, str):
+            writer.write_text(path, data)
+        else:
+            writer.write(path, data)
+        if checkpoint is not None:
+            outputs.append(path)
+
+    def flush(batch):
+        nonlocal saved_count, inferred_count
+        inferred_count += len(batch)
+        results = model([frame for _, frame in batch], verbose=False)
+        for (frame_count, frame), result in zip(batch, results):
+            keep = _valid_boxes(result, valid_ids, conf_threshold)
+            if export and (len(keep) or include_negatives):
+                path = yolo_export.image_path(save_folder, split, f"{video_name}_frame{frame_count}")
+                boxes = inference_cache.boxes_array(result)
+                write(path, frame)
+                write(yolo_export.label_path(path), yolo_export.label_lines(boxes[keep], frame.shape, class_map))
+                cache_entries.append((path, boxes, frame.shape[:2]))
+            if len(keep) == 0:
+                continue
+            if export and not draw_boxes:
+                # The dataset image is the output
                 saved_count += 1
+                continue
+            # The exported frame is still queued, draw on a copy
+            image = _draw_first_box(model, frame.copy() if export else frame, result, keep[0]) if draw_boxes else frame
+            if shard_writer is not None:
+                shard_writer.write(f"{video_name}_frame{frame_count}", image, dict(
+                    video=video_path, frame=frame_count, width=frame.shape[1], height=frame.shape[0],
+                    detections=[dict(cls=model.names[int(cls)], confidence=round(float(conf), 4),
+                                     box=[round(float(v), 1) for v in (x1, y1, x2, y2)])
+                                for x1, y1, x2, y2, conf, cls in inference_cache.boxes_array(result)[keep]],
+                ))
+            else:
+                write(os.path.join(save_folder, f"{video_name}_frame{frame_count}_detection0.jpg"), image)
+            saved_count += 1
+        next_frame = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if progress is not None:
+            progress(next_frame - start_frame, saved_count, inferred_count)
+        if checkpoint is not None and time.time() - checkpointed[0] >= checkpoint_interval:
+            writer.wait()
+            if shard_writer is not None:
+                shard_writer.wait()
+            save_checkpoint(next_frame)
 
-        frame_count += 1
+    if scene_options is not None:
+        frames = frame_sampler.scene_frames(cap, frame_sampler.SceneChangeSampler(**scene_options), start_frame, end_frame)
+    else:
+        frames = _sampled_frames(cap, frame_interval, start_frame, end_frame)
+    finished = False
+    try:
+        batch = []
+        for item in frames:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+        else:
+            if batch:
+                flush(batch)
+            finished = True
+        next_frame = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        frames_read = next_frame - start_frame
+    finally:
+        cap.release()
+        writer.close()
+        if shard_writer is not None:
+            shard_writer.close()
+    if checkpoint is not None:
+        save_checkpoint(next_frame, finished)
+    if writer.hashes:
+        cache = inference_cache.InferenceCache(cache_path)
+        try:
+            cache.put_many([(writer.hashes[path], (boxes, shape)) for path, boxes, shape in cache_entries
+                            if path in writer.hashes],
+                           cache.model_hash(model_path or MODEL_PATH), str(inference_cache.default_imgsz(model)))
+        finally:
+            cache.close()
+    if progress is None:
+        print(f"Processed '{video_path}': ran the model on {inferred_count} of {frames_read} frames, "
+              f"saved {saved_count} detections.")
+    return saved_count
+
+class ProgressReporter:
+    """
+    Aggregate per-chunk progress into per-video progress and print it to
+    stdout as newline-delimited JSON events, for the Electron UI:
+
+      {"event": "progress", "video", "frames_done", "frames_total", "frames_inferred", "detections_saved", "fps", "eta_seconds"}
+      {"event": "video_done", "video", "status": "done" or "error", "failed_chunks", "frames_done", "frames_inferred", "detections_saved", "seconds"}
+      {"event": "error", "video", "message"}
+      {"event": "done" or "cancelled", "videos", "frames_inferred", "detections_saved", "seconds"}
+
+    video_done is emitted once every chunk of the video has finished or
+    failed, with status "error" if any of them failed.
+
+    frames_inferred counts the frames that went through the model, the rest
+    were skipped by the sampling.
+
+    Progress events are throttled to one per video every `interval` seconds.
+    Pass on_event to receive the events as dicts instead of printing them.
+    """
+    def __init__(self, chunks, totals, interval=0.5, on_event=None):
+        self.interval = interval
+        self.on_event = on_event
+        self.started = time.time()
+        self._video = {chunk_id: video for chunk_id, video, _, _ in chunks}
+        self._pending = {}
+        for chunk_id, video, _, _ in chunks:
+            self._pending[video] = self._pending.get(video, 0) + 1
+        self._totals = totals
+        self._frames = {}
+        self._saved = {}
+        self._inferred = {}
+        self._video_started = {}
+        self._emitted = {}
+        self._failed = {}
+
+    def _video_counts(self, video):
+        chunk_ids = [c for c, v in self._video.items() if v == video]
+        return (sum(self._frames.get(c, 0) for c in chunk_ids), sum(self._saved.get(c, 0) for c in chunk_ids),
+                sum(self._inferred.get(c, 0) for c in chunk_ids))
+
+    def update(self, chunk_id, frames_done, saved, inferred=0):
+        video = self._video[chunk_id]
+        now = time.time()
+        self._video_started.setdefault(video, now)
+        self._frames[chunk_id] = frames_done
+        self._saved[chunk_id] = saved
+        self._inferred[chunk_id] = inferred
+        # Late updates from a worker may arrive after its result
+        if self._pending[video] == 0 or now - self._emitted.get(video, 0) < self.interval:
+            return
+        self._emitted[video] = now
+        frames, detections, inferred = self._video_counts(video)
+        total = self._totals.get(video)
+        elapsed = now - self._video_started[video]
+        fps = frames / elapsed if elapsed > 0 else None
+        eta = (total - frames) / fps if fps and total else None
+        self.emit("progress", video=os.path.basename(video), frames_done=frames, frames_total=total,
+                  frames_inferred=inferred, detections_saved=detections, fps=round(fps, 1) if fps else None,
+                  eta_seconds=round(max(0.0, eta), 1) if eta is not None else None)
+
+    def finish(self, chunk_id, saved):
+        self._saved[chunk_id] = saved
+        self._settle(self._video[chunk_id])
+
+    def error(self, chunk_id, message):
+        video = self._video[chunk_id]
+        self.emit("error", video=os.path.basename(video), message=message)
+        self._failed[video] = self._failed.get(video, 0) + 1
+        self._settle(video)
+
+    def _settle(self, video):
+        """
+        Count one chunk of the video as finished or failed, and report the
+        video once it has no chunks left
+        """
+        self._video_started.setdefault(video, time.time())
+        self._pending[video] -= 1
+        if self._pending[video] == 0:
+            frames, detections, inferred = self._video_counts(video)
+            failed = self._failed.get(video, 0)
+            self.emit("video_done", video=os.path.basename(video), status="error" if failed else "done",
+                      failed_chunks=failed, frames_done=frames, frames_inferred=inferred,
+                      detections_saved=detections,
+                      seconds=round(time.time() - self._video_started[video], 2))
+
+    def summary(self, event):
+        self.emit(event, videos=len(self._pending), frames_inferred=sum(self._inferred.values()),
+                  detections_saved=sum(self._saved.values()),
+                  seconds=round(time.time() - self.started, 2))
+
+    def emit(self, event, **fields):
+        if self.on_event is not None:
+            self.on_event({"event": event, **fields})
+        else:
+            print(json.dumps({"event": event, **fields}), flush=True)
+
+def _plan_chunks(video_files, frame_interval, chunk_frames, remaining=None):
+    """
+    Split videos into (chunk_id, video, start_frame, end_frame) work units.
+    Long videos are cut into ranges of about chunk_frames frames. Sampling
+    counts frames from the start of the video, so the same frames are
+    sampled as in one pass.
+
+    :param remaining: Video -> (start_frame, end_frame) ranges still to process, for
+        resumed runs. Videos not in it are processed whole.
+    :return: The chunks, and the number of frames to process per video (None if unknown)
+    """
+    ranges, totals = [], {}
+    for video in video_files:
+        cap = cv2.VideoCapture(video)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        todo = 0
+        for start, end in (remaining or {}).get(video, [(0, None)]):
+            stop = total if end is None else end
+            todo += max(0, stop - start)
+            if chunk_frames and stop - start > chunk_frames:
+                step = -(-chunk_frames // frame_interval) * frame_interval
+                starts = list(range(start, stop, step))
+                # The last range runs to the end in case the frame count is an estimate
+                ranges.extend(zip([video] * len(starts), starts, starts[1:] + [end]))
+            else:
+                ranges.append((video, start, end))
+        totals[video] = todo if total > 0 else None
+    # Numbered once planned: progress, results and the manifest are keyed by chunk id
+    return [(chunk_id, *r) for chunk_id, r in enumerate(ranges)], totals
 
-    cap.release()
-    print(f"Processed '{video_path}': saved {saved_count} detections.")
+def _find_videos(videos_folder, recursive=True, exclude=None):
+    """
+    Video files in a folder (and its subfolders when recursive), in a stable order.
+    The exclude folder (e.g. the output folder) is not searched.
+    """
+    # We only match these four extensions, case-insensitive
+    valid_exts = {'.mp4', '.avi', '.mov', '.mkv'}
+    video_files = []
+    for root, dirs, files in os.walk(videos_folder):
+        dirs[:] = sorted(d for d in dirs if recursive and os.path.join(root, d) != exclude)
+        for item in sorted(files):
+            if os.path.splitext(item)[1].lower() in valid_exts:
+                video_files.append(os.path.join(root, item))
+    return video_files
+
+# Set in each pool worker by _init_worker
+_worker_progress = None
+_worker_cancel = None
+
+def _init_worker(progress_queue, cancel_event):
+    global _worker_progress, _worker_cancel
+    _worker_progress = progress_queue
+    _worker_cancel = cancel_event
+    # Cancellation goes through cancel_event, so the current batch is finished and saved
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _run_chunk(run_id, chunk_id, video, start_frame, end_frame, save_folder, options, name):
+    if _worker_cancel.is_set():
+        return 0
+    return process_video(
+        video, save_folder, start_frame=start_frame, end_frame=end_frame,
+        progress=lambda frames, saved, inferred: _worker_progress.put(("progress", run_id, chunk_id, frames, saved, inferred)),
+        cancel_event=_worker_cancel, name=name,
+        checkpoint=lambda *args: _worker_progress.put(("checkpoint", run_id, chunk_id, *args)), **options
+    )
+
+class WorkerPool:
+    """
+    Spawned worker processes for process_videos_in_folder that can be reused
+    across runs. Each worker imports torch and loads a model once, on its
+    first chunk, and keeps it for later runs, so a long-running caller (the
+    curation daemon) pays for that only once.
+    """
+    def __init__(self, workers):
+        """
+        :param workers: Number of worker processes
+        """
+        ctx = multiprocessing.get_context("spawn")
+        self.workers = workers
+        self.progress_queue = ctx.Queue()
+        self.cancel_event = ctx.Event()
+        self.pool = ctx.Pool(workers, initializer=_init_worker, initargs=(self.progress_queue, self.cancel_event))
+        # Set once chunks are still running after a cancel timed out, the pool must not be reused
+        self.broken = False
+        self._runs = 0
+
+    def next_run(self):
+        """
+        :return: Id tagging the progress messages of a run, so stragglers of an earlier run are ignored
+        """
+        self._runs += 1
+        self.cancel_event.clear()
+        return self._runs
+
+    def close(self):
+        if self.broken:
+            self.pool.terminate()
+        else:
+            self.pool.close()
+        self.pool.join()
+
+def _output_name(key):
+    """
+    File name prefix for a video: its path below the input folder, without
+    the extension, so videos of the same name in different folders don't clash.
+    """
+    return os.path.splitext(key)[0].replace("/", "_")
 
 def process_videos_in_folder(videos_folder, output_folder, valid_classes=None,
-                             frame_interval=10, draw_boxes=True):
+                             frame_interval=10, draw_boxes=True, conf_threshold=0.55, batch_size=16,
+                             workers=1, chunk_frames=9000, cancel_event=None, on_event=None, model_path=None,
+                             scene_options=None, export_options=None, recursive=True, resume=True, shard_options=None,
+                             pool=None):
     """
     Process all videos in a folder, saving detection frames to output_folder.
 
+    With workers > 1, videos (and ranges of long videos) are spread across a
+    pool of processes that each load the model once. Progress is printed as
+    JSON lines (see ProgressReporter). SIGTERM, or cancel_event when given,
+    stops all workers after their current batch.
+
+    Progress is checkpointed to a manifest in output_folder (see manifest).
+    Rerunning with the same settings skips the videos that are done, resumes
+    the others from their last checkpoint and picks up videos added since.
+
     :param videos_folder: Folder containing video files
     :param output_folder: Folder where detection frames are saved
     :param valid_classes: Which classes to detect
     :param frame_interval: Save every nth frame
     :param draw_boxes: Boolean to toggle bounding boxes
+    :param conf_threshold: Float confidence threshold.
+    :param batch_size: Number of sampled frames per inference call
+    :param workers: Number of worker processes
+    :param chunk_frames: Split videos longer than this into ranges of this many frames (0 to never split)
+    :param cancel_event: Event to cancel from another thread, instead of handling SIGTERM
+    :param on_event: Receives progress events as dicts instead of printing them
+    :param model_path: Weights to use, defaults to MODEL_PATH
+    :param scene_options: SceneChangeSampler arguments to sample on scene changes instead of every nth frame
+    :param export_options: Export a YOLO dataset (with data.yaml) to output_folder, see process_video
+    :param recursive: Also process videos in subfolders. Their output names are prefixed with the subfolder path.
+    :param resume: Continue from the manifest of a previous run, False to start over
+    :param shard_options: Write detection images to tar shards instead of loose JPEGs, see process_video
+    :param pool: WorkerPool to run on with workers > 1, instead of starting one for this run
+    :return: False if cancelled, True otherwise
     """
     if valid_classes is None:
         valid_classes = ["pistol", "gun"]
@@ -142,77 +637,245 @@ def process_videos_in_folder(videos_folder, output_folder, valid_classes=None,
     videos_folder = os.path.abspath(os.path.normpath(videos_folder))
     output_folder = os.path.abspath(os.path.normpath(output_folder))
 
-    # We only match these four extensions, case-insensitive
-    valid_exts = {'.mp4', '.avi', '.mov', '.mkv'}
+    video_files = _find_videos(videos_folder, recursive, exclude=output_folder)
+    if not video_files:
+        print(f"No video files found in '{videos_folder}'.")
+        return True
 
-    # Gather top-level items
-    all_items = os.listdir(videos_folder)
-    #print("DEBUG: Found these top-level items in folder:", all_items)
+    options = dict(valid_classes=valid_classes, frame_interval=frame_interval, draw_boxes=draw_boxes,
+                   conf_threshold=conf_threshold, batch_size=batch_size, model_path=model_path,
+                   scene_options=scene_options, export_options=export_options, shard_options=shard_options)
+    # Outputs of runs with other settings would not match, those start over
+    run_manifest = manifest.Manifest(output_folder, dict(
+        options, batch_size=None, export_options=export_options and {k: v for k, v in export_options.items() if k != "cache_path"},
+    ), resume=resume)
+    keys = {video: manifest.video_key(videos_folder, video) for video in video_files}
+    remaining = {video: run_manifest.remaining(keys[video], video) for video in video_files}
+    done = [video for video in video_files if not remaining[video]]
+    if done:
+        print(f"Skipping {len(done)} of {len(video_files)} videos, already processed.")
+    video_files = [video for video in video_files if remaining[video]]
 
-    video_files = []
-    for item in all_items:
-        item_path = os.path.join(videos_folder, item)
-        # Check if it's a file (not a folder)
-        if os.path.isfile(item_path):
-            # Check extension in a case-insensitive way
-            ext = os.path.splitext(item)[1].lower()
-            if ext in valid_exts:
-                video_files.append(item_path)
+    chunks, totals = _plan_chunks(video_files, frame_interval, chunk_frames if workers > 1 else 0, remaining)
+    run_manifest.plan(chunks, keys)
+    reporter = ProgressReporter(chunks, totals, on_event=on_event)
 
-    if not video_files:
-        print(f"No video files found in '{videos_folder}'.")
-        return
+    # Cancel (Electron's cancel-python sends SIGTERM) after the current batch
+    cancelled = cancel_event if cancel_event is not None else threading.Event()
+    previous_handler = None
+    if cancel_event is None:
+        previous_handler = signal.signal(signal.SIGTERM, lambda signum, frame: cancelled.set())
+    try:
+        if workers <= 1:
+            for chunk_id, video, start_frame, end_frame in chunks:
+                if cancelled.is_set():
+                    break
+                try:
+                    saved = process_video(
+                        video, output_folder, start_frame=start_frame, end_frame=end_frame,
+                        progress=lambda frames, saved, inferred, c=chunk_id: reporter.update(c, frames, saved, inferred),
+                        cancel_event=cancelled, name=_output_name(keys[video]),
+                        checkpoint=lambda *args, c=chunk_id: run_manifest.checkpoint(c, *args), **options
+                    )
+                except Exception as e:
+                    reporter.error(chunk_id, str(e))
+                    run_manifest.error(chunk_id, str(e))
+                    continue
+                reporter.finish(chunk_id, saved)
+        elif chunks:
+            _process_chunks_parallel(chunks, output_folder, options, workers, reporter, cancelled,
+                                     run_manifest, {video: _output_name(key) for video, key in keys.items()},
+                                     pool=pool)
+    finally:
+        if previous_handler is not None:
+            signal.signal(signal.SIGTERM, previous_handler)
+        run_manifest.save(force=True)
+
+    if export_options is not None:
+        # Also after a cancel, what was exported so far is usable
+        yolo_export.write_data_yaml(output_folder, valid_classes)
+    reporter.summary("cancelled" if cancelled.is_set() else "done")
+    return not cancelled.is_set()
+
+def _process_chunks_parallel(chunks, output_folder, options, workers, reporter, cancelled, run_manifest, names,
+                             cancel_timeout=30, pool=None):
+    owned = pool is None
+    if owned:
+        pool = WorkerPool(min(workers, len(chunks)))
+    run_id = pool.next_run()
+    pending = {
+        chunk_id: pool.pool.apply_async(_run_chunk, (run_id, chunk_id, video, start_frame, end_frame, output_folder,
+                                                     options, names[video]))
+        for chunk_id, video, start_frame, end_frame in chunks
+    }
+
+    def drain(timeout):
+        try:
+            while True:
+                kind, message_run, *message = pool.progress_queue.get(timeout=timeout)
+                if message_run != run_id:
+                    continue
+                if kind == "checkpoint":
+                    run_manifest.checkpoint(*message)
+                else:
+                    reporter.update(*message)
+                timeout = 0
+        except queue.Empty:
+            pass
 
-    #print("DEBUG: Final list of recognized video files:", video_files)
+    try:
+        while pending and not cancelled.is_set():
+            drain(0.2)
+            for chunk_id in [c for c, r in pending.items() if r.ready()]:
+                try:
+                    reporter.finish(chunk_id, pending.pop(chunk_id).get())
+                except Exception as e:
+                    reporter.error(chunk_id, str(e))
+                    run_manifest.error(chunk_id, str(e))
+                else:
+                    if not cancelled.is_set():
+                        # Its last checkpoint may still be in the queue
+                        run_manifest.finish(chunk_id)
+        if cancelled.is_set():
+            # Let every worker finish and save its current batch
+            pool.cancel_event.set()
+            deadline = time.time() + cancel_timeout
+            for result in pending.values():
+                result.wait(max(0.0, deadline - time.time()))
+            pool.broken = not all(result.ready() for result in pending.values())
+            # Collect their last checkpoints
+            drain(0.5)
+        else:
+            drain(0)
+    except BaseException:
+        pool.broken = True
+        raise
+    finally:
+        if owned:
+            pool.close()
 
-    for video_file in video_files:
-        process_video(video_file, output_folder, valid_classes, frame_interval, draw_boxes)
+def _open_cache(cache_path):
+    """
+    The inference cache at cache_path, or None if caching is off (no path).
+    """
+    return inference_cache.InferenceCache(cache_path) if cache_path else None
 
-def filter_images(folder, valid_classes=None, conf_threshold=0.55):
+def filter_images(folder, valid_classes=None, conf_threshold=0.55, cancel_event=None, model_path=None,
+                  batch_size=16, cache_path=inference_cache.DEFAULT_PATH, write_labels=False):
     """
     Go through each .jpg image in 'folder'. Delete if it has no valid detections.
 
+    Detections come from the inference cache where possible, so rerunning
+    with another threshold or class list does not run the model again.
+
     :param folder: Folder of images
     :param valid_classes: Classes to keep (if not found, image is deleted)
     :param conf_threshold: Confidence threshold to consider a detection valid
+    :param cancel_event: Stop before the next batch of images once this event is set
+    :param model_path: Weights to use, defaults to MODEL_PATH
+    :param batch_size: Images per inference call
+    :param cache_path: Inference cache file, None to always run the model
+    :param write_labels: Write a YOLO label file for each retained image (see yolo_export.label_path)
+        and delete the label file of each deleted image. Class indices follow the data.yaml of the
+        dataset the folder belongs to, or valid_classes if there is none.
+    :return: False if cancelled, True otherwise
     """
 
     folder = os.path.abspath(os.path.normpath(folder))
     
     if valid_classes is None:
         valid_classes = ["pistol", "gun"]
+    model = get_model(model_path)
+    valid_ids = _valid_class_ids(model, valid_classes)
+    class_map = None
+    if write_labels:
+        # Labels have to agree with the dataset's names, whatever order valid_classes is in
+        class_map = yolo_export.class_index_map(model.names, valid_classes,
+                                                yolo_export.dataset_class_names(folder, valid_classes))
+    cache = _open_cache(cache_path)
 
     image_paths = glob.glob(os.path.join(folder, "*.jpg"))
-    for image_path in image_paths:
-        image = cv2.imread(image_path)
-        if image is None:
-            print(f"Could not load {image_path}. Skipping...")
-            continue
+    try:
+        for image_path, boxes, shape in inference_cache.detect_images(model, model_path or MODEL_PATH, image_paths,
+                                                               batch_size=batch_size, cache=cache,
+                                                               cancel_event=cancel_event):
+            if boxes is None:
+                print(f"Could not load {image_path}. Skipping...")
+                continue
 
-        results = model(image)
-        detection_found = False
+            valid = (boxes[:, 4] >= conf_threshold) & np.isin(boxes[:, 5].astype(int), valid_ids)
+            detection_found = bool(np.any(valid))
 
-        for result in results:
-            if result.boxes is None:
-                continue
-            for box in result.boxes:
-                conf = float(box.conf.cpu().numpy()[0])
-                cls = int(box.cls.cpu().numpy()[0])
-                if conf >= conf_threshold and model.names.get(cls, "") in valid_classes:
-                    detection_found = True
-                    break
-            if detection_found:
-                break
+            if not detection_found:
+                os.remove(image_path)
+                if write_labels and os.path.exists(yolo_export.label_path(image_path)):
+                    os.remove(yolo_export.label_path(image_path))
+                print(f"Deleted {image_path} (no valid detection).")
+            else:
+                if write_labels:
+                    yolo_export.write_label(yolo_export.label_path(image_path),
+                                            yolo_export.label_lines(boxes[valid], shape, class_map))
+                print(f"Retained {image_path} (valid detection found).")
+        if cache is not None:
+            print(f"Inference cache: {cache.hits} hits, {cache.misses} misses.")
+    finally:
+        if cache is not None:
+            cache.close()
+    return not (cancel_event is not None and cancel_event.is_set())
 
-        if not detection_found:
-            os.remove(image_path)
-            print(f"Deleted {image_path} (no valid detection).")
-        else:
-            print(f"Retained {image_path} (valid detection found).")
+def image_confidences(image_paths, valid_classes=None, batch_size=16, model_path=None,
+                      cache_path=inference_cache.DEFAULT_PATH):
+    """
+    Highest confidence of a valid detection in each image, e.g. to rank
+    near-duplicates. Images without one (or that can't be read) score 0.
+
+    :param image_paths: Image files
+    :param valid_classes: Classes that count
+    :param batch_size: Images per inference call
+    :param model_path: Weights to use, defaults to MODEL_PATH
+    :param cache_path: Inference cache file, None to always run the model
+    :return: List of confidences, in the order of image_paths
+    """
+    if valid_classes is None:
+        valid_classes = ["pistol", "gun"]
+    model = get_model(model_path)
+    valid_ids = _valid_class_ids(model, valid_classes)
+    cache = _open_cache(cache_path)
+
+    scores = []
+    try:
+        for _, boxes, _ in inference_cache.detect_images(model, model_path or MODEL_PATH, image_paths,
+                                                      batch_size=batch_size, cache=cache):
+            valid = boxes[np.isin(boxes[:, 5].astype(int), valid_ids), 4] if boxes is not None else []
+            scores.append(float(valid.max()) if len(valid) else 0.0)
+    finally:
+        if cache is not None:
+            cache.close()
+    return scores
+
+def dedupe_images(folder, max_distance=6, keep="sharpest", move_to=None, method="dhash", valid_classes=None,
+                  cancel_event=None, model_path=None):
+    """
+    Remove near-duplicate images from 'folder' (see dedupe.dedupe_images).
+    With keep="confidence" the image with the most confident valid detection
+    of each group is kept, only images that have a near-duplicate are run
+    through the model.
+
+    :return: Dict with images, duplicates and seconds, or None if cancelled
+    """
+    score_fn = None
+    if keep == "confidence":
+        score_fn = lambda paths: image_confidences(paths, valid_classes=valid_classes, model_path=model_path)
+    stats = dedupe.dedupe_images(folder, max_distance=max_distance, keep=keep, move_to=move_to, method=method,
+                                 score_fn=score_fn, cancel_event=cancel_event)
+    if stats is not None:
+        print(f"{stats['duplicates']} of {stats['images']} images were near-duplicates ({stats['seconds']}s).")
+    return stats
 
 def remove_duplicate_images(folder):
     """
     Compute an MD5 hash for each .jpg image in 'folder' and delete duplicates.
+    Only catches byte-identical files, see dedupe_images for near-duplicates.
     """
     folder = os.path.abspath(os.path.normpath(folder))
 
@@ -239,13 +902,30 @@ if __name__ == '__main__':
       2) Filter images in a folder (no bounding boxes, just deletion):
          python videoToImage.py filterImages False /path/to/images /unused pistol 10 0.55
          # In this example, output_folder is not used, so pass anything ("/unused").
+
+      3) Sample frames on scene changes and motion instead of every nth frame; frame_interval is
+         then the minimum gap between samples (SCENE_MAX_GAP is the maximum, SCENE_CHANGE the threshold):
+         python videoToImage.py sceneShots True /path/to/videos /path/to/output pistol gun 5 0.55
+
+      Videos in subfolders are included (RECURSIVE=0 for the top level only). Progress is kept in
+      a manifest in output_folder: rerunning skips finished videos and resumes interrupted ones
+      (RESUME=0 starts over).
+
+      With SHARD_OUTPUT=1, videoShots/sceneShots write the detection images to tar shards of about
+      SHARD_MB (default 256) in output_folder instead of one JPEG each, see shards.py.
+
+      With EXPORT_YOLO=1, videoShots/sceneShots also write a YOLO dataset (images/, labels/, data.yaml)
+      to output_folder, and filterImages writes label files for the images it keeps.
+
+      4) Remove near-duplicate images, moving them to output_folder (pass "" to delete them):
+         DEDUPE_DISTANCE=6 DEDUPE_KEEP=sharpest python videoToImage.py dedupe False /path/to/images /path/to/duplicates pistol 10 0.55
     """
 
     if len(sys.argv) < 6:
         print("Usage: videoToImage.py <mode> <draw_boxes> <input_folder> <output_folder> <class1> [class2 ...] <frame_interval> <confidence_level>")
         sys.exit(1)
 
-    mode = sys.argv[1]         # "videoShots" or "filterImages"
+    mode = sys.argv[1]         # "videoShots", "sceneShots", "filterImages" or "dedupe"
     draw_boxes_arg = sys.argv[2].lower()  # "true" or "false"
     input_folder = sys.argv[3]
     output_folder = sys.argv[4]
@@ -261,6 +941,33 @@ if __name__ == '__main__':
         frame_interval = 10
         confidence_level = 0.55
 
+    # Sampled frames per inference call, larger batches use more memory
+    batch_size = int(os.getenv("BATCH_SIZE", "16"))
+    # Worker processes for videoShots, each loads its own copy of the model
+    workers = int(os.getenv("WORKERS", "1"))
+    chunk_frames = int(os.getenv("CHUNK_FRAMES", "9000"))
+    # dedupe: differing hash bits (out of 64) that still count as a duplicate,
+    # which image of a group to keep ("sharpest" or "confidence") and the hash ("dhash" or "phash")
+    dedupe_distance = int(os.getenv("DEDUPE_DISTANCE", "6"))
+    dedupe_keep = os.getenv("DEDUPE_KEEP", "sharpest")
+    dedupe_hash = os.getenv("DEDUPE_HASH", "dhash")
+    # sceneShots: most frames between two samples, and how much the picture
+    # (mean absolute difference, 0-1) must change since the last sample
+    scene_max_gap = int(os.getenv("SCENE_MAX_GAP", "300"))
+    scene_change = float(os.getenv("SCENE_CHANGE", "0.06"))
+    # Export a YOLO dataset (images/, labels/, data.yaml) from the same detections,
+    # with this share of videos in val, optionally with frames without detections
+    export_yolo = os.getenv("EXPORT_YOLO", "0").lower() in ["true", "1", "yes"]
+    val_fraction = float(os.getenv("VAL_FRACTION", "0.2"))
+    export_negatives = os.getenv("EXPORT_NEGATIVES", "0").lower() in ["true", "1", "yes"]
+    # videoShots/sceneShots: continue from the manifest in output_folder (RESUME=0 starts over),
+    # and also look for videos in subfolders (RECURSIVE=0 for the top level only)
+    resume = os.getenv("RESUME", "1").lower() in ["true", "1", "yes"]
+    recursive = os.getenv("RECURSIVE", "1").lower() in ["true", "1", "yes"]
+    # videoShots/sceneShots: write detection images to tar shards of about SHARD_MB instead of loose JPEGs
+    shard_output = os.getenv("SHARD_OUTPUT", "0").lower() in ["true", "1", "yes"]
+    shard_mb = float(os.getenv("SHARD_MB", "256"))
+
     # Convert bounding-box arg to boolean
     if draw_boxes_arg in ["true", "1", "yes"]:
         draw_boxes = True
@@ -276,34 +983,75 @@ if __name__ == '__main__':
     print(f"Mode: {mode}")
     print(f"Draw boxes: {draw_boxes}")
     print(f"Input folder: {input_folder}")
-    if mode == "videoShots":
+    if mode in ("videoShots", "sceneShots"):
         print(f"Output folder: {output_folder}")
+    elif mode == "dedupe":
+        print(f"Duplicates moved to: {output_folder or 'Not moved, deleted'}")
     else:
         print("Output folder: Not applicable for filterImages mode")
     print(f"Classes: {valid_classes}")
     print(f"Frame interval: {frame_interval}")
     print(f"Confidence level: {confidence_level}")
+    print(f"Batch size: {batch_size}")
+    print(f"Workers: {workers}")
+    print(f"Export YOLO labels: {export_yolo}")
+    if mode in ("videoShots", "sceneShots"):
+        print(f"Resume: {resume}")
+        print(f"Recursive: {recursive}")
+        print(f"Tar shards: {shard_output}")
 
-    if mode == "videoShots":
-        process_videos_in_folder(
+    if mode in ("videoShots", "sceneShots"):
+        scene_options = None
+        if mode == "sceneShots":
+            scene_options = dict(min_gap=frame_interval, max_gap=scene_max_gap, change_threshold=scene_change)
+        export_options = None
+        if export_yolo:
+            export_options = dict(val_fraction=val_fraction, include_negatives=export_negatives,
+                                  cache_path=inference_cache.DEFAULT_PATH)
+        completed = process_videos_in_folder(
             input_folder,
             output_folder,
             valid_classes=valid_classes,
             frame_interval=frame_interval,
-            draw_boxes=draw_boxes
+            draw_boxes=draw_boxes,
+            conf_threshold=confidence_level,
+            batch_size=batch_size,
+            workers=workers,
+            chunk_frames=chunk_frames,
+            scene_options=scene_options,
+            export_options=export_options,
+            recursive=recursive,
+            resume=resume,
+            shard_options=dict(max_bytes=int(shard_mb * 1024 * 1024)) if shard_output else None
         )
+        if not completed:
+            print("Cancelled.")
+            sys.exit(128 + signal.SIGTERM)
         print("Finished processing videos into screenshots.")
 
     elif mode == "filterImages":
         filter_images(
             folder=input_folder,
             valid_classes=valid_classes,
-            conf_threshold=confidence_level
+            conf_threshold=confidence_level,
+            batch_size=batch_size,
+            write_labels=export_yolo
         )
         print("Finished filtering images.")
 
+    elif mode == "dedupe":
+        dedupe_images(
+            input_folder,
+            max_distance=dedupe_distance,
+            keep=dedupe_keep,
+            move_to=output_folder or None,
+            method=dedupe_hash,
+            valid_classes=valid_classes
+        )
+        print("Finished removing near-duplicates.")
+
     else:
-        print(f"Unknown mode '{mode}'! Use 'videoShots' or 'filterImages'.")
+        print(f"Unknown mode '{mode}'! Use 'videoShots', 'sceneShots', 'filterImages' or 'dedupe'.")
         sys.exit(1)
 
     print("Done.")
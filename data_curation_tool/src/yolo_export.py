@@ -0,0 +1,139 @@
+"""
+YOLO-format dataset export, written from the detections the curation run
+already computed instead of a second inference pass.
+
+Layout (what Ultralytics expects, labels are found by swapping /images/ for /labels/):
+
+  <root>/images/train/<name>.jpg    <root>/labels/train/<name>.txt
+  <root>/images/val/<name>.jpg      <root>/labels/val/<name>.txt
+  <root>/data.yaml
+
+Each label line is "<class index> <x center> <y center> <width> <height>",
+normalized to the image size. Class indices follow the order of the class
+list given to the run, which is also the names list in data.yaml. Labels
+written later into an existing dataset (filterImages) follow its data.yaml.
+"""
+import os
+import json
+import hashlib
+import numpy as np
+
+SPLITS = ("train", "val")
+
+def split_for(name, val_fraction=0.2):
+    """
+    Deterministic train/val split by name. Split by video rather than by
+    frame, so near-identical frames of one video never end up on both sides.
+    """
+    digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+    return "val" if int.from_bytes(digest, "big") / 2 ** 64 < val_fraction else "train"
+
+def image_path(root, split, name):
+    return os.path.join(root, "images", split, name + ".jpg")
+
+def label_path(image_path):
+    """
+    The label file of an image: under labels/ instead of images/ when the
+    image is in an images/ folder, next to the image otherwise.
+    """
+    head, tail = os.path.split(image_path)
+    parts = head.split(os.sep)
+    if "images" in parts:
+        i = len(parts) - 1 - parts[::-1].index("images")
+        parts[i] = "labels"
+        head = os.sep.join(parts)
+    return os.path.join(head, os.path.splitext(tail)[0] + ".txt")
+
+def class_index_map(model_names, class_names, dataset_names=None):
+    """
+    Model class id -> class index in the dataset, for the classes that are exported.
+
+    :param class_names: Classes to export
+    :param dataset_names: The dataset's class order, defaults to class_names
+    """
+    dataset_names = class_names if dataset_names is None else dataset_names
+    return {i: dataset_names.index(name) for i, name in model_names.items() if name in class_names}
+
+def find_data_yaml(folder):
+    """
+    The data.yaml of the dataset a folder belongs to: in the folder itself or
+    in one of its parents (e.g. for <root>/images/train), None if there is none.
+    """
+    folder = os.path.abspath(folder)
+    while True:
+        path = os.path.join(folder, "data.yaml")
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+
+def read_class_names(data_yaml):
+    """
+    The names list of a data.yaml, in class index order.
+    """
+    # PyYAML is installed with ultralytics
+    import yaml
+    with open(data_yaml) as f:
+        names = (yaml.safe_load(f) or {}).get("names") or []
+    if isinstance(names, dict):
+        names = [names[i] for i in sorted(names)]
+    return [str(name) for name in names]
+
+def dataset_class_names(folder, class_names):
+    """
+    The class order labels in a folder have to follow: the names of its
+    dataset's data.yaml if there is one, class_names otherwise.
+
+    :raises ValueError: If class_names has classes the data.yaml does not list
+    """
+    data_yaml = find_data_yaml(folder)
+    if data_yaml is None:
+        return list(class_names)
+    names = read_class_names(data_yaml)
+    missing = [name for name in class_names if name not in names]
+    if missing:
+        raise ValueError(f"{', '.join(missing)} not in the classes of {data_yaml} ({', '.join(names)}). "
+                         f"Export a new dataset to use other classes.")
+    return names
+
+def label_lines(boxes, shape, class_map):
+    """
+    :param boxes: (n, 6) rows of x1, y1, x2, y2, conf, cls in pixels
+    :param shape: Image (height, width)
+    :param class_map: Model class id -> exported class index, boxes of other classes are left out
+    :return: Label text, one line per box
+    """
+    height, width = shape[:2]
+    lines = []
+    for x1, y1, x2, y2, _, cls in np.asarray(boxes, dtype=np.float64).reshape(-1, 6):
+        index = class_map.get(int(cls))
+        if index is None:
+            continue
+        x1, x2 = np.clip((x1, x2), 0, width)
+        y1, y2 = np.clip((y1, y2), 0, height)
+        lines.append(f"{index} {(x1 + x2) / 2 / width:.6f} {(y1 + y2) / 2 / height:.6f} "
+                     f"{(x2 - x1) / width:.6f} {(y2 - y1) / height:.6f}")
+    return "".join(line + "\n" for line in lines)
+
+def write_label(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+def write_data_yaml(root, class_names):
+    """
+    Write <root>/data.yaml for Ultralytics training.
+    """
+    root = os.path.abspath(root)
+    for split in SPLITS:
+        os.makedirs(os.path.join(root, "images", split), exist_ok=True)
+    # JSON strings are valid YAML scalars, so paths and names need no further quoting
+    lines = [f"path: {json.dumps(root)}", "train: images/train", "val: images/val", "names:"]
+    lines += [f"  {i}: {json.dumps(name)}" for i, name in enumerate(class_names)]
+    path = os.path.join(root, "data.yaml")
+    with open(path + ".tmp", "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(path + ".tmp", path)
+    return path
@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+import pytest
+
+# videoToImage loads the detection stack on import
+pytest.importorskip("torch")
+pytest.importorskip("ultralytics")
+import videoToImage
+
+def write_video(path, frames):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48))
+    for i in range(frames):
+        writer.write(np.full((48, 64, 3), i % 256, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+def covered(chunks, video, total):
+    frames = []
+    for _, v, start, end in chunks:
+        if v == video:
+            frames.extend(range(start, total if end is None else end))
+    return sorted(frames)
+
+def test_chunk_ids_unique_and_ranges_cover_videos(tmp_path):
+    long_video = write_video(tmp_path / "long.avi", 100)
+    short_video = write_video(tmp_path / "short.avi", 10)
+    chunks, totals = videoToImage._plan_chunks([long_video, short_video], frame_interval=5, chunk_frames=24)
+
+    assert [c[0] for c in chunks] == list(range(len(chunks)))
+    assert len([c for c in chunks if c[1] == long_video]) == 4
+    assert covered(chunks, long_video, 100) == list(range(100))
+    assert covered(chunks, short_video, 10) == list(range(10))
+    # Ranges start on sampled frames, so chunked runs sample the same frames as one pass
+    assert all(start % 5 == 0 for _, _, start, _ in chunks)
+    assert totals == {long_video: 100, short_video: 10}
+
+def test_resumed_ranges(tmp_path):
+    video = write_video(tmp_path / "a.avi", 100)
+    chunks, totals = videoToImage._plan_chunks([video], frame_interval=5, chunk_frames=24,
+                                               remaining={video: [(40, None)]})
+
+    assert [c[0] for c in chunks] == list(range(len(chunks)))
+    assert covered(chunks, video, 100) == list(range(40, 100))
+    assert totals == {video: 60}
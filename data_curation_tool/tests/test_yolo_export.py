@@ -0,0 +1,29 @@
+import os
+import pytest
+import yolo_export
+
+MODEL_NAMES = {0: "person", 1: "gun", 2: "pistol", 3: "knife"}
+
+def test_labels_follow_the_dataset_class_order(tmp_path):
+    yolo_export.write_data_yaml(str(tmp_path), ["pistol", "gun"])
+    folder = os.path.join(tmp_path, "images", "train")
+
+    # A rerun with the classes reordered, or only some of them, keeps the dataset's indices
+    names = yolo_export.dataset_class_names(folder, ["gun", "pistol"])
+    assert names == ["pistol", "gun"]
+    assert yolo_export.class_index_map(MODEL_NAMES, ["gun", "pistol"], names) == {1: 1, 2: 0}
+    assert yolo_export.class_index_map(MODEL_NAMES, ["gun"], yolo_export.dataset_class_names(folder, ["gun"])) == {1: 1}
+
+def test_classes_missing_from_the_dataset_are_refused(tmp_path):
+    yolo_export.write_data_yaml(str(tmp_path), ["pistol", "gun"])
+    with pytest.raises(ValueError, match="knife"):
+        yolo_export.dataset_class_names(os.path.join(tmp_path, "images", "val"), ["gun", "knife"])
+
+def test_without_data_yaml_labels_follow_the_class_list(tmp_path):
+    assert yolo_export.dataset_class_names(str(tmp_path), ["gun", "pistol"]) == ["gun", "pistol"]
+    assert yolo_export.class_index_map(MODEL_NAMES, ["gun", "pistol"]) == {1: 0, 2: 1}
+
+def test_names_with_special_characters_round_trip(tmp_path):
+    classes = ["hand gun", "rifle: long", '"quoted"']
+    yolo_export.write_data_yaml(str(tmp_path), classes)
+    assert yolo_export.read_class_names(os.path.join(tmp_path, "data.yaml")) == classes